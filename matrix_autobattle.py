@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - auto-battle ===
+# Plays a whole ambush through Engine.step in one call under a policy, so a
+# player can skip the weapon picking and a bot can clear fights without a
+# screen. A policy is a plain dict:
+#
+#   rank       'damage' fires guns by expected damage per round (acc * dmg),
+#              'cost' by expected damage per credit of ammo
+#   run_below  run instead of firing while life is at or below this
+#   kung_fu    fall back to Kung Fu (Elite Operator) once out of ammo,
+#              otherwise run
+#   min_win    run from the start if the exact odds of winning the fight
+#              (matrix_battle_odds) are below this; 0 skips the solve
+#
+# resolve() returns a summary of the fight for summary_lines() to show.
+import argparse
+import time
+from matrix_engine import WEAPONS, AMMO_PRICES, AMMO_PACK, Engine, new_state
+from matrix_battle_odds import battle_odds
+
+POLICIES = {
+    'damage':  {'rank':'damage', 'run_below':25, 'kung_fu':True, 'min_win':0.0},
+    'thrifty': {'rank':'cost',   'run_below':25, 'kung_fu':True, 'min_win':0.0},
+    'careful': {'rank':'damage', 'run_below':40, 'kung_fu':True, 'min_win':0.5},
+    'brawler': {'rank':'damage', 'run_below':0,  'kung_fu':True, 'min_win':0.0},
+    'runner':  {'rank':'damage', 'run_below':100,'kung_fu':False,'min_win':0.0},
+}
+DEFAULT_POLICY = 'damage'
+MAX_ACTIONS = 10000     # a fight that runs this long is given up on
+
+RANKS = {
+    'damage': sorted(WEAPONS, key=lambda g: -WEAPONS[g]['acc'] * WEAPONS[g]['dmg']),
+    'cost':   sorted(WEAPONS, key=lambda g: -WEAPONS[g]['acc'] * WEAPONS[g]['dmg'] * AMMO_PACK
+                                            / AMMO_PRICES[WEAPONS[g]['ammo']]),
+}
+
+def policy_of(policy):
+    # A policy name or dict; missing keys come from the default policy
+    if isinstance(policy, str):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown battle policy {policy!r}")
+        return POLICIES[policy]
+    return {**POLICIES[DEFAULT_POLICY], **policy}
+
+def choose(engine, policy):
+    # The next battle action under a policy
+    s = engine.state
+    if s['life'] <= policy['run_below']:
+        return ('run',)
+    for g in RANKS[policy['rank']]:
+        if g in s['weapons'] and s['ammo'].get(WEAPONS[g]['ammo'], 0) > 0:
+            return ('attack', g)
+    if policy['kung_fu'] and 'Kung Fu' in engine.battle_options():
+        return ('attack', 'Kung Fu')
+    return ('run',)
+
+def resolve(engine, policy=DEFAULT_POLICY):
+    # Fight the current battle to the end; returns the summary
+    policy = policy_of(policy)
+    s, b = engine.state, engine.battle
+    out = {'smith':b['smith'], 'outcome':None, 'actions':0, 'shots':{}, 'hits':0,
+           'dmg_dealt':0, 'life_lost':s['life'], 'armor_lost':s['armor'], 'escape_tries':0,
+           'gain':0, 'drop':None, 'events':[]}
+    flee = policy['min_win'] > 0 and \
+        battle_odds(s, b['hp'], b['smith'], run_below=policy['run_below'])['win'] < policy['min_win']
+    while engine.phase == 'battle' and out['actions'] < MAX_ACTIONS:
+        action = ('run',) if flee else choose(engine, policy)
+        events = engine.step(action)
+        out['actions'] += 1
+        out['events'] += events
+        for e in events:
+            t = e['type']
+            if t in ('escaped', 'escape_failed'):
+                out['escape_tries'] += 1
+            elif t in ('player_hit', 'player_miss'):
+                out['shots'][e['weapon']] = out['shots'].get(e['weapon'], 0) + 1
+                if t == 'player_hit':
+                    out['hits'] += 1
+                    out['dmg_dealt'] += e['dmg']
+            elif t == 'victory':
+                out['gain'], out['drop'] = e['gain'], e['drop']
+        last = events[-1]['type']
+        if last in ('escaped', 'victory', 'killed'):
+            out['outcome'] = {'escaped':'escaped', 'victory':'won', 'killed':'killed'}[last]
+    out['life_lost'] -= s['life']
+    out['armor_lost'] -= s['armor']
+    return out
+
+def summary_lines(r):
+    foe = 'SMITH' if r['smith'] else 'AGENT'
+    head = {'won':f"{foe} DOWN!", 'escaped':f"ESCAPED THE {foe}", 'killed':f"KILLED BY THE {foe}",
+            None:f"{foe} FIGHT ABANDONED"}[r['outcome']]
+    shots = sum(r['shots'].values())
+    lines = [f"=== AUTO-BATTLE: {head} ===",
+             f"Rounds: {r['actions']}   Shots: {shots}   Hits: {r['hits']}   Damage dealt: {r['dmg_dealt']}"]
+    if r['shots']:
+        lines.append('Fired: ' + ', '.join(f"{g} x{n}" for g, n in r['shots'].items()))
+    if r['escape_tries']:
+        lines.append(f"Escape attempts: {r['escape_tries']}")
+    lines.append(f"Life -{r['life_lost']}%   Armor -{r['armor_lost']}%")
+    if r['outcome'] == 'won':
+        lines.append(f"Smith defeated! +{r['gain']}cr +1 RootKit" if r['smith']
+                     else f"Found {r['drop']}, +{r['gain']}cr")
+    return lines
+
+# === Bench ===
+def fight(policy, battles, smith=False, seed=0):
+    # Outcome counts and battles/sec over fresh fights with a stocked
+    # starting loadout
+    eng = Engine(new_state(), seed=seed)
+    counts = {'won':0, 'escaped':0, 'killed':0, None:0}
+    t = time.perf_counter()
+    for _ in range(battles):
+        s = eng.state
+        s.update(life=100, armor=50, weapons={'Beretta 92FS':1, 'M4 Carbine':1},
+                 ammo={a: 10 for a in AMMO_PRICES}, perks=['Elite Operator'])
+        eng.phase, eng.battle = 'turn', None
+        eng._start_battle(smith, [])
+        counts[resolve(eng, policy)['outcome']] += 1
+    return counts, battles / (time.perf_counter() - t)
+
+if __name__=='__main__':
+    ap = argparse.ArgumentParser(description='Auto-battle policies of The MATRIX 1984')
+    ap.add_argument('-n', type=int, default=20000, help='battles per policy')
+    ap.add_argument('--smith', action='store_true', help='fight Smith instead of Agents')
+    args = ap.parse_args()
+    for name in POLICIES:
+        counts, rate = fight(name, args.n, args.smith)
+        print(f"{name:<8} won {counts['won']/args.n:6.1%}  escaped {counts['escaped']/args.n:6.1%}  "
+              f"killed {counts['killed']/args.n:6.1%}  {rate:,.0f} battles/s")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - exact battle odds ===
+# battle_screen is a small Markov chain, so instead of sampling it we solve
+# it. After the opening state only three things change: total damage taken
+# (armor soaks first, then life), the opponent's HP and the number of shots
+# fired. The chance of being at each (damage, hp) is pushed forward one shot
+# at a time with NumPy, and whatever ends on a shot (a win, a death, an
+# escape) is banked. Fights end fast, so the walk stops once less than TOL
+# of the probability is still in play instead of running through every
+# round of ammo held; only a fight that really does empty the guns goes on
+# to the Kung Fu / running tail, which is solved backwards. Results are
+# cached per configuration, cheap enough to show on every battle screen.
+from functools import lru_cache
+import numpy as np
+from matrix_engine import (WEAPONS, ESCAPE_CHANCE, SMITH_DODGE, KUNG_FU_DMG)
+
+WIN, DEATH, ESCAPE, AMMO, LIFE = range(5)
+ENEMY_DMG = np.arange(5, 16)
+TOL = 1e-10   # chance still in play below which the walk stops
+
+# Guns ranked by expected damage per round, best first
+GUN_RANK = sorted(WEAPONS, key=lambda g: -WEAPONS[g]['acc'] * WEAPONS[g]['dmg'])
+
+def fire_order(state, weapon='best'):
+    # The guns a strategy will empty, in order, as (acc, dmg, rounds)
+    names = GUN_RANK if weapon == 'best' else [weapon]
+    order = []
+    for g in names:
+        rounds = state['ammo'].get(WEAPONS[g]['ammo'], 0) if g in state['weapons'] else 0
+        if rounds > 0:
+            order.append((WEAPONS[g]['acc'], WEAPONS[g]['dmg'], rounds))
+    return tuple(order)
+
+def battle_odds(state, hp, smith=False, weapon='best', run_below=0):
+    # Outcome of the fight from here if the player fires `weapon` ('best'
+    # empties guns by expected damage), tries to run first while life is at
+    # or below `run_below`, and falls back to Kung Fu (Elite Operator) or
+    # running once out of ammo.
+    return solve(state['life'], state['armor'], hp, fire_order(state, weapon), smith,
+                 'Elite Operator' in state['perks'], run_below)
+
+@lru_cache(maxsize=4096)
+def solve(life, armor, hp, guns, smith, elite, run_below=0):
+    if life <= 0:
+        return {'win':0.0, 'death':1.0, 'escape':0.0, 'ammo':0.0, 'life_lost':0.0}
+    dodge = SMITH_DODGE if smith else 0.0
+    dmax = life + armor              # damage that kills
+    lost = np.clip(np.arange(dmax + 1) - armor, 0, life).astype(float)
+    runs = life - lost[:dmax] <= run_below   # rows where the strategy runs first
+    shots = [(acc, dmg) for acc, dmg, n in guns for _ in range(n)]
+    total = len(shots)
+    out = np.zeros(5)
+
+    def bank(kind, rows, s, lose=lost[:dmax]):
+        # rows: chance of ending as `kind` after s shots, per damage row
+        m = rows.sum()
+        out[kind] += m; out[AMMO] += m * s; out[LIFE] += rows @ lose
+
+    # p[d, h]: chance the fight is still on with d damage taken and h hp left
+    p = np.zeros((dmax, hp + 1))
+    p[0, hp] = 1.0
+    hit_p = (1 - dodge) / len(ENEMY_DMG)
+    for s, (acc, dmg) in enumerate(shots):
+        if p.sum() < TOL:
+            break
+        if runs.any():
+            bank(ESCAPE, ESCAPE_CHANCE * p[runs].sum(axis=1), s, lost[:dmax][runs])
+            p[runs] *= 1 - ESCAPE_CHANCE
+        bank(WIN, acc * p[:, 1:dmg + 1].sum(axis=1), s + 1)
+        q = (1 - acc) * p
+        if dmg < hp:
+            q[:, 1:hp + 1 - dmg] += acc * p[:, dmg + 1:]
+        # The opponent fires back; damage past dmax is a death
+        p = dodge * q
+        rows = q.sum(axis=1)
+        for k in ENEMY_DMG:
+            if k < dmax:
+                p[k:] += hit_p * q[:dmax - k]
+            dead = rows[max(dmax - k, 0):].sum()
+            out[DEATH] += hit_p * dead
+            out[AMMO] += hit_p * dead * (s + 1)
+            out[LIFE] += hit_p * dead * life
+    else:
+        out += np.einsum('kdh,dh->k', _out_of_ammo(life, armor, hp, total, dodge, elite, run_below), p)
+    return {'win':float(out[WIN]), 'death':float(out[DEATH]), 'escape':float(out[ESCAPE]),
+            'ammo':float(out[AMMO]), 'life_lost':float(out[LIFE])}
+
+def _out_of_ammo(life, armor, hp, total, dodge, elite, run_below):
+    # Value of every live (damage, hp) once all `total` shots are gone:
+    # Kung Fu always lands for 20, otherwise run until it works
+    dmax = life + armor
+    lost = np.clip(np.arange(dmax + 1) - armor, 0, life).astype(float)
+    runs = life - lost <= run_below
+
+    def terminal(kind):
+        t = np.zeros((5, dmax + 1, 1))
+        t[kind] = 1.0; t[AMMO] = total; t[LIFE] = lost[:, None]
+        return t
+
+    def enemy(v):
+        # Expected value after the opponent fires, v shaped (5, damage, ...)
+        pad = np.concatenate([v] + [v[:, -1:]] * ENEMY_DMG[-1], axis=1)
+        hit = sum(pad[:, k:k + dmax + 1] for k in ENEMY_DMG) / len(ENEMY_DMG)
+        return dodge * v + (1 - dodge) * hit
+
+    def run_first(v):
+        v = np.where(runs[None, :, None], ESCAPE_CHANCE * terminal(ESCAPE) + (1 - ESCAPE_CHANCE) * v, v)
+        v[:, dmax] = terminal(DEATH)[:, dmax]
+        return v
+
+    if elite:
+        v = np.zeros((5, dmax + 1, hp + 1))
+        for h in range(1, hp + 1):
+            col = terminal(WIN) if h <= KUNG_FU_DMG else enemy(v[:, :, h - KUNG_FU_DMG:h - KUNG_FU_DMG + 1])
+            v[:, :, h:h + 1] = run_first(col)
+    else:
+        v = np.broadcast_to(terminal(ESCAPE), (5, dmax + 1, hp + 1)).copy()
+    return v[:, :dmax]
+
+def odds_line(state, hp, smith=False):
+    o = battle_odds(state, hp, smith)
+    return f"Odds Win {o['win']:.0%} Die {o['death']:.0%} Run {o['escape']:.0%} | ~{o['ammo']:.0f} ammo, -{o['life_lost']:.0f}% life"
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - cross-version benchmark ===
+# Loads every thematrix1984_betav*.py, drives its curses_sim loop headlessly
+# on a matrix_headless screen with scripted keys, and reports turns/sec,
+# draw_screen and save_game cost and peak memory side by side.
+import argparse
+import contextlib
+import glob
+import importlib.util
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from matrix_headless import FakeScreen, patched_curses
+from matrix_profile import profile_game
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Keys and line input the scripted player picks from. Picks are drawn from
+# a seeded RNG rather than cycled, so a screen that eats a fixed number of
+# keys per loop can't lock onto the same answer forever.
+KEYS = 'NNNDUJWERRFF'
+LINES = ['1', '1', '2', '3', '5', 'Q']
+
+class BenchDone(Exception):
+    pass
+
+# === Scripted Player ===
+class _BenchScreen(FakeScreen):
+    def __init__(self, budget, seed=0):
+        super().__init__()
+        self.budget = budget
+        self.rng = random.Random(seed)
+
+    def _spend(self):
+        self.budget -= 1
+        if self.budget < 0:
+            raise BenchDone
+    def getkey(self, *yx):
+        self._spend()
+        return self.rng.choice(KEYS)
+    def getstr(self, *args):
+        self._spend()
+        self.feed(self.rng.choice(LINES))
+        return super().getstr(*args)
+
+# === Versions ===
+def find_versions():
+    files = glob.glob(os.path.join(HERE, 'thematrix1984_betav*.py'))
+    def key(p):
+        return tuple(int(x) for x in re.findall(r'v(\d+)\.(\d+)\.py$', p)[0])
+    return sorted(files, key=key)
+
+def version_name(path):
+    return re.search(r'(v\d+\.\d+)\.py$', path).group(1)
+
+def load_version(path):
+    spec = importlib.util.spec_from_file_location('bench_' + version_name(path).replace('.', '_'), path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+class Timer:
+    def __init__(self, fn):
+        self.fn = fn
+        self.calls = 0
+        self.total = 0.0
+    def __call__(self, *a, **k):
+        t = time.perf_counter()
+        try:
+            return self.fn(*a, **k)
+        finally:
+            self.total += time.perf_counter() - t
+            self.calls += 1
+
+# === Benchmark ===
+# Everything a betav game writes to its working directory
+ARTIFACTS = ('matrix_wars_save.json', 'matrix_1984_save.json', 'matrix_1984_save.bin',
+             'matrix_1984.db', 'matrix_1984.db-wal', 'matrix_1984.db-shm', 'matrix_1984_*.journal',
+             'matrix_1984_*.journal.old', 'matrix_1984_replay.json', 'matrix_1984_profile.json')
+
+def clear_saves():
+    # A dead player's save must not carry over into the next game
+    for pattern in ARTIFACTS:
+        for f in glob.glob(pattern):
+            os.unlink(f)
+
+@contextlib.contextmanager
+def scratch_dir():
+    # Games save into the working directory; play them in a temporary one
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            os.chdir(cwd)
+
+def fresh_game(path):
+    clear_saves()
+    mod = load_version(path)
+    if hasattr(mod, 'open_store'):
+        mod.open_store()
+    if hasattr(mod, 'reset_full'):
+        mod.reset_full()
+    return mod
+
+def play(path, scr, on_load=None):
+    # Play back-to-back games on one input budget, in a scratch directory;
+    # each game gets a freshly loaded module, since v0.1/v0.2 keep their
+    # state in plain globals
+    error = None
+    elapsed = 0.0
+    mods = []
+    with scratch_dir():
+        while True:
+            mod = fresh_game(path)
+            if on_load:
+                on_load(mod)
+            mods.append(mod)
+            t = time.perf_counter()
+            try:
+                mod.curses_sim(scr)
+            except BenchDone:
+                break
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                break
+            finally:
+                elapsed += time.perf_counter() - t
+                if hasattr(mod, 'flush_save'):
+                    mod.flush_save()
+    return mods, elapsed, error
+
+def bench_version(path, games, budget, seed=0):
+    timers = {'draw': [], 'save': []}
+    def wrap(mod):
+        mod.draw_screen = Timer(mod.draw_screen)
+        timers['draw'].append(mod.draw_screen)
+        if hasattr(mod, 'save_game'):
+            mod.save_game = Timer(mod.save_game)
+            timers['save'].append(mod.save_game)
+    elapsed = 0.0
+    error = None
+    played = 0
+    for g in range(games):
+        random.seed(seed + g)
+        mods, t, err = play(path, _BenchScreen(budget, seed + g), wrap)
+        elapsed += t
+        played += len(mods)
+        error = error or err
+    draws = sum(d.calls for d in timers['draw'])
+    saves = sum(s.calls for s in timers['save'])
+    # Peak memory of one budget's worth of play, measured apart from the timing runs
+    random.seed(seed)
+    tracemalloc.start()
+    play(path, _BenchScreen(budget, seed))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'version': version_name(path), 'games': played, 'turns': draws,
+            'turns_s': draws / elapsed if elapsed else 0.0,
+            'draw_us': sum(d.total for d in timers['draw']) / draws * 1e6 if draws else 0.0,
+            'save_us': sum(s.total for s in timers['save']) / saves * 1e6 if saves else None,
+            'peak_kb': peak / 1024, 'error': error}
+
+def profile_version(path, budget, seed=0):
+    # Where one budget's worth of play spends its time, phase by phase
+    random.seed(seed)
+    prof = profile_game({})
+    try:
+        play(path, prof.screen(_BenchScreen(budget, seed)), lambda mod: profile_game(vars(mod), prof))
+    finally:
+        prof.restore()
+    return prof.lines()
+
+def table(rows):
+    out = [f"{'version':<8}{'games':>7}{'turns':>8}{'turns/s':>11}{'draw us':>10}{'save us':>10}{'peak KB':>10}  notes"]
+    for r in rows:
+        save = f"{r['save_us']:>10.1f}" if r['save_us'] is not None else f"{'-':>10}"
+        out.append(f"{r['version']:<8}{r['games']:>7}{r['turns']:>8}{r['turns_s']:>11.0f}{r['draw_us']:>10.1f}"
+                   f"{save}{r['peak_kb']:>10.0f}  {r['error'] or ''}")
+    return '\n'.join(out)
+
+if __name__=='__main__':
+    ap = argparse.ArgumentParser(description='Benchmark every betav version headlessly')
+    ap.add_argument('--games', type=int, default=3, help='timed passes per version')
+    ap.add_argument('--keys', type=int, default=2000, help='input budget per game')
+    ap.add_argument('--only', nargs='*', help='versions to run, e.g. v0.13 v0.14')
+    ap.add_argument('--profile', action='store_true', help='also break each version down by phase')
+    args = ap.parse_args()
+    rows, profiles = [], []
+    with patched_curses():
+        for path in find_versions():
+            if args.only and version_name(path) not in args.only:
+                continue
+            rows.append(bench_version(path, args.games, args.keys))
+            if args.profile:
+                profiles.append((version_name(path), profile_version(path, args.keys)))
+    print(table(rows))
+    for name, lines in profiles:
+        print(f"\n{name}")
+        print('\n'.join(lines))
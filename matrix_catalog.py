@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - content catalog ===
+# Nodes, warez, weapons, ammo, useables and perks live in matrix_catalog.json
+# (or the file MATRIX_CATALOG names) instead of literals in the code. The
+# first load validates the file and compiles it into a binary index next to
+# it:
+#
+#   magic 'MXCI' | u8 version | sha256 of the source | u16 count per table
+#   | u32 length + names and perk texts, '\n'-separated | typed arrays
+#
+# Every item gets an integer id (its position in its table) and the numbers
+# go into flat arrays: node multipliers, ware price ranges, gun stats and
+# prices. Later loads only hash the source and read the index back; an index
+# that doesn't match the source is rebuilt. The arrays are in native byte
+# order, which goes into the hash, so an index is never read on a machine
+# that wrote it the other way round.
+#
+# Run it as a script to check a catalog and time both ways of loading it.
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from matrix_saver import write_atomic
+
+CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'matrix_catalog.json')
+MAGIC   = b'MXCI'
+VERSION = 1
+TABLES  = ('nodes', 'warez', 'weapons', 'ammo', 'useables', 'perks')
+HEADER  = struct.Struct(f'<4sB32s{len(TABLES)}HI')
+
+class CatalogError(ValueError):
+    pass
+
+# Fields of each table's entries (besides 'name'); float fields take ints too
+SCHEMA = {
+    'nodes':    {'mult':float},
+    'warez':    {'lo':int, 'hi':int},
+    'weapons':  {'price':int, 'acc':float, 'dmg':int, 'ammo':str, 'mag':int},
+    'ammo':     {'price':int},
+    'useables': {'price':int},
+    'perks':    {'info':str},
+}
+# Names the rules refer to directly
+REQUIRED = {'warez': ('RootKit',), 'useables': ('Health Pack', 'Armor Kit'),
+            'perks': ('Heavily Armed', 'Edge Runner', 'Data Broker', 'Elite Operator')}
+# Tables whose items share one namespace (the engine looks them up by name)
+ITEM_TABLES = ('warez', 'weapons', 'ammo', 'useables')
+# (attribute, typecode, table, field) of every compiled array
+ARRAYS = (('node_mult', 'd', 'nodes', 'mult'),
+          ('ware_lo', 'q', 'warez', 'lo'), ('ware_hi', 'q', 'warez', 'hi'),
+          ('gun_price', 'q', 'weapons', 'price'), ('gun_acc', 'd', 'weapons', 'acc'),
+          ('gun_dmg', 'q', 'weapons', 'dmg'), ('gun_mag', 'q', 'weapons', 'mag'),
+          ('gun_ammo', 'q', 'weapons', 'ammo'),
+          ('ammo_price', 'q', 'ammo', 'price'), ('use_price', 'q', 'useables', 'price'))
+
+# === Catalog ===
+class Catalog:
+    # names[table] lists the items in id order, ids[table] maps them back;
+    # the ARRAYS attributes hold one number per item. `layout` is a sha256 of
+    # the names in order: anything that stores items by id (a save) keeps
+    # it to tell whether those ids still mean the same items
+    def __init__(self, names, perk_info, arrays):
+        self.names = names
+        self.ids = {t: {n: i for i, n in enumerate(names[t])} for t in TABLES}
+        self.layout = hashlib.sha256('\n\n'.join('\n'.join(names[t]) for t in TABLES).encode()).digest()
+        self.perk_info = perk_info
+        for attr, *_ in ARRAYS:
+            setattr(self, attr, arrays[attr])
+
+    def tables(self):
+        # NODES, WAREZ, WEAPONS, AMMO_PRICES, USEABLES, PERK_INFO as the
+        # engine has always had them
+        n = self.names
+        ammo = n['ammo']
+        return ({k: self.node_mult[i] for i, k in enumerate(n['nodes'])},
+                {k: (self.ware_lo[i], self.ware_hi[i]) for i, k in enumerate(n['warez'])},
+                {k: {'price':self.gun_price[i], 'acc':self.gun_acc[i], 'dmg':self.gun_dmg[i],
+                     'ammo':ammo[self.gun_ammo[i]], 'mag':self.gun_mag[i]}
+                 for i, k in enumerate(n['weapons'])},
+                {k: self.ammo_price[i] for i, k in enumerate(ammo)},
+                {k: self.use_price[i] for i, k in enumerate(n['useables'])},
+                dict(zip(n['perks'], self.perk_info)))
+
+# === Compiling ===
+def _check_entry(table, i, e):
+    where = f"{table}[{i}]"
+    if not isinstance(e, dict):
+        raise CatalogError(f"{where} is not an object")
+    name = e.get('name')
+    if not isinstance(name, str) or not name.strip() or '\n' in name:
+        raise CatalogError(f"{where} needs a one-line name")
+    fields = SCHEMA[table]
+    extra = set(e) - set(fields) - {'name'}
+    if extra:
+        raise CatalogError(f"{table} {name!r}: unknown field {sorted(extra)[0]!r}")
+    for f, kind in fields.items():
+        v = e.get(f)
+        ok = isinstance(v, (int, float)) if kind is float else isinstance(v, kind)
+        if not ok or isinstance(v, bool):
+            raise CatalogError(f"{table} {name!r}: {f} must be {kind.__name__}")
+    if table == 'nodes' and not e['mult'] > 0:
+        raise CatalogError(f"node {name!r}: mult must be positive")
+    if table == 'warez' and not 0 < e['lo'] <= e['hi']:
+        raise CatalogError(f"ware {name!r}: needs 0 < lo <= hi")
+    if table == 'weapons':
+        if not 0 < e['acc'] <= 1:
+            raise CatalogError(f"weapon {name!r}: acc must be in (0, 1]")
+        if e['dmg'] <= 0 or e['mag'] <= 0:
+            raise CatalogError(f"weapon {name!r}: dmg and mag must be positive")
+    if 'price' in fields and e['price'] <= 0:
+        raise CatalogError(f"{table} {name!r}: price must be positive")
+    if table == 'perks' and '\n' in e['info']:
+        raise CatalogError(f"perk {name!r}: info must be one line")
+    return name
+
+def compile_catalog(data):
+    # Validate parsed catalog JSON and build a Catalog
+    if not isinstance(data, dict):
+        raise CatalogError('catalog must be an object')
+    names = {}
+    for t in TABLES:
+        entries = data.get(t)
+        if not isinstance(entries, list) or not entries:
+            raise CatalogError(f"{t} must be a non-empty list")
+        if len(entries) > 0xFFFF:
+            raise CatalogError(f"{t} has more than {0xFFFF} entries")
+        names[t] = [_check_entry(t, i, e) for i, e in enumerate(entries)]
+        seen = set()
+        for n in names[t]:
+            if n in seen:
+                raise CatalogError(f"{t}: duplicate name {n!r}")
+            seen.add(n)
+    # Drops and the armory look items up by name across these tables, so a
+    # name may only mean one of them
+    owner = {}
+    for t in ITEM_TABLES:
+        for n in names[t]:
+            if n in owner:
+                raise CatalogError(f"{t}: {n!r} is already a name in {owner[n]}")
+            owner[n] = t
+    for t, need in REQUIRED.items():
+        for n in need:
+            if n not in names[t]:
+                raise CatalogError(f"{t} must include {n!r}")
+    ammo = {n: i for i, n in enumerate(names['ammo'])}
+    for e in data['weapons']:
+        if e['ammo'] not in ammo:
+            raise CatalogError(f"weapon {e['name']!r}: unknown ammo {e['ammo']!r}")
+    arrays = {}
+    for attr, code, t, f in ARRAYS:
+        values = [ammo[e[f]] if f == 'ammo' else e[f] for e in data[t]]
+        arrays[attr] = array(code, values)
+    return Catalog(names, [e['info'] for e in data['perks']], arrays)
+
+# === Binary index ===
+def encode(cat, key):
+    text = '\n'.join([n for t in TABLES for n in cat.names[t]] + cat.perk_info).encode()
+    body = HEADER.pack(MAGIC, VERSION, key, *[len(cat.names[t]) for t in TABLES], len(text)) + text
+    return body + b''.join(getattr(cat, attr).tobytes() for attr, *_ in ARRAYS)
+
+def decode(data, key):
+    if len(data) < HEADER.size:
+        raise CatalogError('index is truncated')
+    magic, version, src, *counts = HEADER.unpack_from(data)
+    size = counts.pop()
+    if magic != MAGIC or version != VERSION or src != key:
+        raise CatalogError('index is stale')
+    counts = dict(zip(TABLES, counts))
+    at = HEADER.size
+    lines = data[at:at + size].decode().split('\n')
+    at += size
+    names = {}
+    for t in TABLES:
+        names[t], lines = lines[:counts[t]], lines[counts[t]:]
+    arrays = {}
+    for attr, code, t, _ in ARRAYS:
+        a = array(code)
+        end = at + a.itemsize * counts[t]
+        a.frombytes(data[at:end])
+        arrays[attr] = a
+        at = end
+    if at != len(data) or len(lines) != counts['perks']:
+        raise CatalogError('index is truncated')
+    return Catalog(names, lines, arrays)
+
+def index_path(path):
+    return os.path.splitext(path)[0] + '.idx'
+
+def load_catalog(path=None):
+    # The compiled catalog, from its index when that is current; otherwise
+    # compiled from the JSON and the index rewritten (if the folder allows)
+    path = path or os.environ.get('MATRIX_CATALOG') or CATALOG_FILE
+    with open(path, 'rb') as f:
+        src = f.read()
+    key = hashlib.sha256(src + sys.byteorder.encode()).digest()
+    try:
+        with open(index_path(path), 'rb') as f:
+            return decode(f.read(), key)
+    except (OSError, ValueError):
+        pass
+    try:
+        data = json.loads(src)
+    except ValueError as e:
+        raise CatalogError(f"{path}: {e}") from None
+    cat = compile_catalog(data)
+    try:
+        write_atomic(index_path(path), encode(cat, key))
+    except OSError:
+        pass
+    return cat
+
+if __name__=='__main__':
+    ap = argparse.ArgumentParser(description='Check and compile a MATRIX 1984 content catalog')
+    ap.add_argument('file', nargs='?', default=CATALOG_FILE)
+    ap.add_argument('-n', type=int, default=1000, help='loads to time')
+    args = ap.parse_args()
+    try:
+        cat = load_catalog(args.file)
+    except CatalogError as e:
+        ap.exit(1, f"{args.file}: {e}\n")
+    print(', '.join(f"{len(cat.names[t])} {t}" for t in TABLES))
+    with open(args.file, 'rb') as f:
+        src = f.read()
+    t = time.perf_counter()
+    for _ in range(args.n):
+        compile_catalog(json.loads(src))
+    full = (time.perf_counter() - t) / args.n
+    t = time.perf_counter()
+    for _ in range(args.n):
+        load_catalog(args.file)
+    cached = (time.perf_counter() - t) / args.n
+    print(f"parse + validate {full*1e6:8.1f} us")
+    print(f"from the index   {cached*1e6:8.1f} us")
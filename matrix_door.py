@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - BBS door server ===
+# Hosts the game over telnet (and optionally a local unix socket) with
+# asyncio: one coroutine and one Engine per connection, no threads, no
+# curses and no module-global state. The HUD is the same panel layout as
+# draw_screen, painted with ANSI escapes and redrawn panel by panel.
+import argparse
+import asyncio
+from matrix_engine import (WAREZ, WEAPONS, AMMO_PRICES, USEABLES, Engine,
+                           new_game_plus, update_perks, armory_items, parse_basket)
+from matrix_autobattle import resolve, summary_lines
+from matrix_battle_odds import odds_line
+from matrix_planner import advice_line
+from matrix_render import HudRenderer
+
+IDLE_TIMEOUT = 900      # seconds without a key before a session is dropped
+MAX_SESSIONS = 500
+A_BOLD = 1
+
+# === Telnet ===
+IAC, DONT, DO, WONT, WILL, SB, SE = 255, 254, 253, 252, 251, 250, 240
+ECHO, SGA, NAWS = 1, 3, 31
+# Server echoes and runs in character mode; ask the client for its size
+TELNET_HELLO = bytes([IAC, WILL, ECHO, IAC, WILL, SGA, IAC, DO, NAWS])
+# Subnegotiation bytes kept; NAWS needs 5, anything past this is dropped
+SB_MAX = 16
+
+class Disconnected(Exception):
+    pass
+
+# === ANSI Terminal ===
+# A stdscr stand-in that turns addstr() calls into ANSI escapes and
+# getkey()/getstr() into awaitable reads on the connection.
+class AnsiTerminal:
+    def __init__(self, reader, writer, telnet=True):
+        self.reader = reader
+        self.writer = writer
+        self.telnet = telnet
+        self.size = (24, 80)
+        self.out = ["\x1b[32;40m\x1b[2J"]
+        self.raw = bytearray()
+        self.pending_cr = False
+
+    # --- output ---
+    def getmaxyx(self):
+        return self.size
+
+    def addstr(self, y, x, text, attr=0):
+        h, w = self.size
+        if y >= h or x >= w:
+            return
+        text = text[:w - x]
+        if attr & A_BOLD:
+            text = f"\x1b[1m{text}\x1b[22m"
+        self.out.append(f"\x1b[{y+1};{x+1}H{text}")
+
+    def clear(self):
+        self.out.append("\x1b[2J")
+
+    erase = clear
+
+    def noutrefresh(self):
+        pass
+
+    def refresh(self):
+        self.flush()
+
+    def flush(self):
+        if self.out:
+            self.writer.write(''.join(self.out).encode('utf-8', 'replace'))
+            self.out = []
+
+    # --- input ---
+    async def _byte(self):
+        if not self.raw:
+            try:
+                data = await asyncio.wait_for(self.reader.read(256), IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise Disconnected('idle')
+            if not data:
+                raise Disconnected('closed')
+            self.raw.extend(data)
+        return self.raw.pop(0)
+
+    async def _char(self):
+        while True:
+            b = await self._byte()
+            if self.telnet and b == IAC:
+                await self._command()
+                continue
+            # CR LF and CR NUL are one Enter
+            if self.pending_cr and b in (0, 10):
+                self.pending_cr = False
+                continue
+            self.pending_cr = b == 13
+            if b in (10, 13):
+                return '\n'
+            if b < 128:
+                return chr(b)
+
+    async def _command(self):
+        cmd = await self._byte()
+        if cmd in (DO, DONT, WILL, WONT):
+            await self._byte()
+        elif cmd == SB:
+            sub = bytearray()
+            while True:
+                b = await self._byte()
+                if b == IAC and await self._byte() == SE:
+                    break
+                if len(sub) < SB_MAX:
+                    sub.append(b)
+            if len(sub) >= 5 and sub[0] == NAWS:
+                w, h = sub[1] << 8 | sub[2], sub[3] << 8 | sub[4]
+                if w and h:
+                    self.size = (h, w)
+
+    async def getkey(self):
+        self.flush()
+        await self.writer.drain()
+        return await self._char()
+
+    async def getstr(self, y, x, n=40):
+        self.out.append(f"\x1b[{y+1};{x+1}H")
+        self.flush()
+        buf = ''
+        while True:
+            await self.writer.drain()
+            ch = await self._char()
+            if ch == '\n':
+                return buf
+            if ch in ('\x7f', '\x08'):
+                if buf:
+                    buf = buf[:-1]
+                    self.writer.write(b'\x08 \x08')
+            elif ch.isprintable() and len(buf) < n:
+                buf += ch
+                self.writer.write(ch.encode())
+
+# === Session ===
+class Session:
+    def __init__(self, term, seed=None):
+        self.term = term
+        self.engine = Engine(seed=seed, compact=True)
+        self.state = self.engine.state
+        self.hud = HudRenderer(term, term.flush)
+
+    async def pause(self, y, x):
+        self.term.addstr(y, x, 'Press any key...')
+        await self.term.getkey()
+
+    async def menu(self, y0, title, rows):
+        t = self.term
+        t.clear()
+        t.addstr(y0, 2, title)
+        for i, row in enumerate(rows, start=1):
+            t.addstr(y0+i, 4, f"{i}. {row}")
+        t.addstr(y0+len(rows)+1, 4, 'Q) Quit')
+        sel = (await t.getstr(y0+len(rows)+2, 4)).strip()
+        try:
+            choice = int(sel)
+        except ValueError:
+            return None
+        return choice-1 if 1 <= choice <= len(rows) else None
+
+    async def ask_qty(self, y, maxq):
+        self.term.addstr(y, 4, f'Qty? (1-{maxq}): ')
+        try:
+            return int((await self.term.getstr(y+1, 4)).strip())
+        except ValueError:
+            return None
+
+    # --- handlers ---
+    async def download(self):
+        s, prices = self.state, self.engine.prices
+        rows = [f"{w} - {prices[w]} cr (You have: {s['inventory'][w]})" for w in WAREZ]
+        i = await self.menu(5, 'Warez Market: Choose item by number', rows)
+        if i is None:
+            return
+        key = list(WAREZ)[i]
+        maxq = s['credits'] // prices[key] if prices[key] > 0 else 0
+        y = 5+len(rows)+3
+        if maxq < 1:
+            self.term.addstr(y, 4, 'Not enough credits.')
+            await self.pause(y+1, 4)
+            return
+        qty = await self.ask_qty(y, maxq)
+        return None if qty is None else ('download', key, qty)
+
+    async def upload(self):
+        s, prices = self.state, self.engine.prices
+        items = [w for w, cnt in s['inventory'].items() if cnt > 0]
+        rows = [f"{w} - {prices[w]} cr (You have: {s['inventory'][w]})" for w in items]
+        i = await self.menu(5, 'Upload: Choose item by number', rows)
+        if i is None:
+            return
+        qty = await self.ask_qty(5+len(rows)+3, s['inventory'][items[i]])
+        return None if qty is None else ('upload', items[i], qty)
+
+    async def bulk(self):
+        t, s, prices = self.term, self.state, self.engine.prices
+        t.clear()
+        t.addstr(5, 2, 'Bulk Order: U<n> [qty|all], D<n> [qty|max], comma separated')
+        for i, w in enumerate(WAREZ, start=1):
+            t.addstr(5+i, 4, f"{i}. {w} - {prices[w]} cr (You have: {s['inventory'][w]})")
+        y = 6+len(WAREZ)
+        t.addstr(y, 4, 'Orders (blank to cancel):')
+        text = (await t.getstr(y+1, 4, 60)).strip()
+        if not text:
+            return
+        orders = parse_basket(text)
+        fills, reason = self.engine.check_basket(orders) if orders else (None, 'Could not read that order.')
+        if fills is None:
+            t.addstr(y+3, 4, reason)
+            await self.pause(y+4, 4)
+            return
+        for i, (kind, key, qty, p) in enumerate(fills):
+            t.addstr(y+3+i, 4, f"{'Download' if kind == 'download' else 'Upload'} {qty} {key} @ {p} cr")
+        t.addstr(y+4+len(fills), 4, 'Confirm? [Y/N]')
+        if (await t.getkey()).upper() != 'Y':
+            return
+        return ('basket', orders)
+
+    async def armory(self):
+        rows = [f"{wp} - {inf['price']} cr" for wp, inf in WEAPONS.items()]
+        rows += [f"{u} - {pr} cr" for u, pr in USEABLES.items()]
+        rows += [f"{a} Ammo Pack - {pr} cr" for a, pr in AMMO_PRICES.items()]
+        i = await self.menu(12, 'Armory: Choose item by number', rows)
+        return None if i is None else ('buy', armory_items()[i])
+
+    async def equip(self):
+        rows = [f"{u} (Owned: {self.state['useables'][u]})" for u in USEABLES]
+        i = await self.menu(5, 'Equip: Choose item by number', rows)
+        return None if i is None else ('equip', list(USEABLES)[i])
+
+    async def advice(self):
+        t = self.term
+        t.clear()
+        t.addstr(2, 2, 'Consulting the Oracle...')
+        # The planner tables are built once per process; keep the loop serving meanwhile
+        line = await asyncio.get_running_loop().run_in_executor(None, advice_line, self.state, self.engine.prices)
+        t.addstr(2, 2, line.ljust(40))
+        await self.pause(4, 2)
+
+    # --- events ---
+    async def battle(self):
+        t, eng, s = self.term, self.engine, self.state
+        while eng.phase == 'battle':
+            t.clear()
+            label = 'SMITH' if eng.battle['smith'] else 'AGENT'
+            t.addstr(1, 2, f"{label} AMBUSH! Life:{s['life']}% HP:{eng.battle['hp']}")
+            # The odds solve is NumPy work; keep the other sessions served meanwhile
+            odds = await asyncio.get_running_loop().run_in_executor(
+                None, odds_line, s, eng.battle['hp'], eng.battle['smith'])
+            t.addstr(2, 2, odds)
+            t.addstr(3, 2, "[F]ight [R]un [A]uto")
+            ch = (await t.getkey()).upper()
+            if ch == 'A':
+                lines = summary_lines(resolve(eng))
+                t.clear()
+                for y, line in enumerate(lines, start=1):
+                    t.addstr(y, 2, line)
+                await self.pause(len(lines)+2, 2)
+                return
+            if ch == 'R':
+                if eng.step(('run',))[0]['type'] == 'escaped':
+                    t.addstr(5, 2, 'Escaped safely!')
+                    await self.pause(7, 2)
+                    return
+                t.addstr(5, 2, 'Escape failed!')
+                await self.pause(7, 2)
+            opts = eng.battle_options()
+            for i, name in enumerate(opts, start=1):
+                t.addstr(5+i, 2, f"{i}. {name}")
+            sel = await t.getstr(6+len(opts), 2, 2)
+            try:
+                choice = opts[int(sel)-1]
+            except (ValueError, IndexError):
+                continue
+            y = 7+len(opts)
+            for e in eng.step(('attack', choice)):
+                k = e['type']
+                if k == 'no_ammo':
+                    t.addstr(y, 2, 'No ammo!')
+                    await t.getkey()
+                elif k == 'player_hit':
+                    t.addstr(y, 2, f"Kung Fu! -{e['dmg']} HP" if e['weapon'] == 'Kung Fu' else f"Hit! -{e['dmg']} HP")
+                elif k == 'player_miss':
+                    t.addstr(y, 2, 'Miss!')
+                elif k == 'victory':
+                    t.addstr(y+2, 2, 'Opponent down!')
+                    t.addstr(y+3, 2, f"Smith defeated! +{e['gain']}cr +1 RootKit" if e['smith']
+                             else f"Found {e['drop']}, +{e['gain']}cr")
+                    await self.pause(y+5, 2)
+                elif k in ('enemy_hit', 'enemy_dodged'):
+                    t.addstr(y+2, 2, 'Opponent fires...')
+                    t.addstr(y+4, 2, f"Hit! -{e['dmg']}% life" if k == 'enemy_hit' else 'Dodged!')
+                    await self.pause(y+6, 2)
+
+    async def civilian(self):
+        t = self.term
+        t.clear()
+        t.addstr(5, 2, 'Pick a number 1-10: ')
+        events = self.engine.step(('guess', (await t.getstr(5, 24, 2)).strip()))
+        if events[0]['type'] == 'civilian_gone':
+            return
+        if events[0]['type'] == 'freed':
+            t.addstr(7, 2, 'Red pill! Mind freed.')
+        else:
+            t.addstr(7, 2, 'Blue pill! Becomes Agent.')
+            t.flush()
+            await asyncio.sleep(0.5)
+            await self.battle()
+        await self.pause(9, 2)
+
+    async def play_events(self, events):
+        for e in events:
+            if e['type'] == 'medic':
+                self.term.clear()
+                self.term.addstr(5, 5, f"Blasko heals +{e['heal']}% life")
+                await self.pause(7, 5)
+                self.hud.invalidate()
+        if self.engine.phase == 'battle':
+            await self.battle()
+            self.hud.invalidate()
+        elif self.engine.phase == 'civilian':
+            await self.civilian()
+            self.hud.invalidate()
+
+    # --- loop ---
+    async def run(self):
+        t, eng, s = self.term, self.engine, self.state
+        update_perks(s)
+        while True:
+            events = eng.start()
+            while eng.phase != 'over':
+                await self.play_events(events)
+                self.hud.draw(s, eng.prices, trend=eng.price_history.stats(s['location']))
+                ch = (await t.getkey()).upper()
+                action = None
+                if ch == 'D': action = await self.download()
+                elif ch == 'U': action = await self.upload()
+                elif ch == 'B': action = await self.bulk()
+                elif ch == 'W': action = await self.armory()
+                elif ch == 'E': action = await self.equip()
+                elif ch == 'J': action = ('jack',)
+                elif ch == 'N': action = ('next',)
+                elif ch == 'Q': action = ('quit',)
+                elif ch == 'A':
+                    await self.advice()
+                    self.hud.invalidate(); events = []
+                    continue
+                if ch in 'DUBWE': self.hud.invalidate()
+                events = eng.step(action or ('wait',))
+            t.clear()
+            t.addstr(5, 5, '=== SIMULATION COMPLETE ===', A_BOLD)
+            t.addstr(7, 5, f"Credits:{s['credits']}")
+            t.addstr(8, 5, f"Life:{s['life']}% Armor:{s['armor']}% Freed:{s['people_freed']}")
+            t.addstr(10, 5, '[N]ew Game+    [Q]uit')
+            if (await t.getkey()).upper() != 'N':
+                return
+            new_game_plus(s)
+            self.hud.invalidate()
+
+# === Server ===
+class DoorServer:
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.sessions = set()
+
+    async def handle(self, reader, writer, telnet=True):
+        if len(self.sessions) >= self.max_sessions:
+            writer.write(b'The Matrix is full. Try again later.\r\n')
+            await writer.drain()
+            writer.close()
+            return
+        term = AnsiTerminal(reader, writer, telnet)
+        if telnet:
+            writer.write(TELNET_HELLO)
+        session = Session(term)
+        self.sessions.add(session)
+        try:
+            await session.run()
+            term.addstr(12, 5, 'Goodbye, Operator.')
+            term.flush()
+            await writer.drain()
+        except (Disconnected, ConnectionError):
+            pass
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    async def serve(self, host, port, unix_path=None):
+        servers = [await asyncio.start_server(self.handle, host, port)]
+        if unix_path:
+            servers.append(await asyncio.start_unix_server(
+                lambda r, w: self.handle(r, w, telnet=False), unix_path))
+        await asyncio.gather(*(s.serve_forever() for s in servers))
+
+if __name__=='__main__':
+    ap = argparse.ArgumentParser(description='Host The MATRIX 1984 as a telnet door game')
+    ap.add_argument('--host', default='0.0.0.0')
+    ap.add_argument('--port', type=int, default=2323)
+    ap.add_argument('--unix', help='also listen on this unix socket path')
+    ap.add_argument('--max-sessions', type=int, default=MAX_SESSIONS)
+    args = ap.parse_args()
+    try:
+        asyncio.run(DoorServer(args.max_sessions).serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,787 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - headless rules engine ===
+# Every game rule lives here so the curses front end, bots and simulations
+# can run turns without a terminal. The engine never draws or waits: it
+# takes an action, mutates the state dict and returns a list of events.
+import hashlib
+import json
+import random
+import re
+from array import array
+from collections import deque
+from collections.abc import MutableMapping, Sequence
+from matrix_catalog import load_catalog
+
+# === Game Data ===
+# The content tables are compiled from matrix_catalog.json (see
+# matrix_catalog); CATALOG has them by integer id as flat arrays, the dicts
+# below keep the shapes every front end reads.
+CYCLES = 30.0
+CATALOG = load_catalog()
+NODES, WAREZ, WEAPONS, AMMO_PRICES, USEABLES, PERK_INFO = CATALOG.tables()
+
+# === Rule Constants ===
+TRADE_COST   = 0.25   # cycles per download/upload/armory/equip
+JACK_COST    = 0.5
+NEXT_COST    = 1.0
+AGENT_ROLL   = 0.30   # event roll thresholds, checked in order
+SMITH_ROLL   = 0.31
+MEDIC_ROLL   = 0.32
+CIVILIAN_ROLL= 0.33
+ESCAPE_CHANCE= 0.35
+SMITH_DODGE  = 0.15
+KUNG_FU_DMG  = 20
+AMMO_PACK    = 5
+
+# === State ===
+def new_state(rng=random):
+    return {
+        'credits': 2000,
+        'life': 100,
+        'armor': 0,
+        'inventory': {w: 0 for w in WAREZ},
+        'weapons': {},
+        'ammo': {k: 0 for k in AMMO_PRICES},
+        'useables': {u: 0 for u in USEABLES},
+        'location': rng.choice(list(NODES)),
+        'cycle': 1.0,
+        'escapes': 0,
+        'profit_start': 2000,
+        'people_freed': 0,
+        'perks': []
+    }
+
+# A plain dict costs a few KB per player once its nested dicts and long
+# string keys are counted. GameState keeps the scalars in __slots__ and every
+# count (warez, weapons, ammo, useables) in one int64 array at fixed
+# indices, and still reads and writes like the dict: state['ammo']['M4 Ammo']
+# += 5 goes through a small view over the array. Weapons list only what is
+# owned, in WEAPONS order. Perks are a bitset over PERK_INFO, listed in that
+# order. to_dict() gives the JSON-ready nested dict.
+NODE_LIST = list(NODES)
+NODE_INDEX= {n: i for i, n in enumerate(NODE_LIST)}
+SCALARS   = ('credits', 'life', 'armor', 'cycle', 'escapes', 'profit_start', 'people_freed')
+TABLES    = {'inventory': list(WAREZ), 'weapons': list(WEAPONS),
+             'ammo': list(AMMO_PRICES), 'useables': list(USEABLES)}
+STATE_KEYS= ('credits', 'life', 'armor', 'inventory', 'weapons', 'ammo', 'useables',
+             'location', 'cycle', 'escapes', 'profit_start', 'people_freed', 'perks')
+PERK_BIT  = {p: 1 << i for i, p in enumerate(PERK_INFO)}
+_INDEX, _COUNTS = {}, 0          # table -> {name: slot in the count array}
+for _t, _names in TABLES.items():
+    _INDEX[_t] = {k: _COUNTS + i for i, k in enumerate(_names)}
+    _COUNTS += len(_names)
+
+class Counts(MutableMapping):
+    # Dict view of one table in a GameState's count array
+    __slots__ = ('_a', '_table', '_owned')
+
+    def __init__(self, counts, table):
+        self._a = counts
+        self._table = table
+        self._owned = table == 'weapons'
+
+    def __getitem__(self, k):
+        v = self._a[_INDEX[self._table][k]]
+        if self._owned and not v:
+            raise KeyError(k)
+        return v
+
+    def __setitem__(self, k, v):
+        self._a[_INDEX[self._table][k]] = v
+
+    def __delitem__(self, k):
+        self[k]
+        self[k] = 0
+
+    def __iter__(self):
+        a = self._a
+        return (k for k, i in _INDEX[self._table].items() if a[i] or not self._owned)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class PerkBits(Sequence):
+    # List view of a GameState's perk bitset
+    __slots__ = ('_g',)
+
+    def __init__(self, g):
+        self._g = g
+
+    def __contains__(self, p):
+        return bool(self._g._perks & PERK_BIT.get(p, 0))
+
+    def __iter__(self):
+        bits = self._g._perks
+        return (p for p, b in PERK_BIT.items() if bits & b)
+
+    def __len__(self):
+        return self._g._perks.bit_count()
+
+    def __getitem__(self, i):
+        return list(self)[i]
+
+    def append(self, p):
+        self._g._perks |= PERK_BIT[p]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+def perk_bits(perks):
+    if isinstance(perks, PerkBits):
+        return perks._g._perks
+    bits = 0
+    for p in perks:
+        bits |= PERK_BIT.get(p, 0)
+    return bits
+
+class GameState(MutableMapping):
+    __slots__ = SCALARS + ('_counts', '_node', '_perks')
+
+    def __init__(self, data=None):
+        for k in SCALARS:
+            setattr(self, k, 0)
+        self._counts = array('q', bytes(8 * _COUNTS))
+        self._node = 0
+        self._perks = 0
+        if data is not None:
+            self.update(data)
+
+    def __getitem__(self, k):
+        if k in TABLES: return Counts(self._counts, k)
+        if k == 'location': return NODE_LIST[self._node]
+        if k == 'perks': return PerkBits(self)
+        if k in SCALARS: return getattr(self, k)
+        raise KeyError(k)
+
+    def __setitem__(self, k, v):
+        if k in TABLES:
+            for i in _INDEX[k].values():
+                self._counts[i] = 0
+            for name, n in v.items():
+                self._counts[_INDEX[k][name]] = n
+        elif k == 'location': self._node = NODE_INDEX[v]
+        elif k == 'perks': self._perks = perk_bits(v)
+        elif k in SCALARS: setattr(self, k, v)
+        else: raise KeyError(k)
+
+    def __delitem__(self, k):
+        raise TypeError('GameState fields cannot be deleted')
+
+    def __iter__(self):
+        return iter(STATE_KEYS)
+
+    def __len__(self):
+        return len(STATE_KEYS)
+
+    def to_dict(self):
+        d = {k: self[k] for k in STATE_KEYS}
+        for t in TABLES:
+            d[t] = dict(d[t])
+        d['perks'] = list(d['perks'])
+        return d
+
+    def __repr__(self):
+        return f"GameState({self.to_dict()!r})"
+
+def as_dict(state):
+    # A JSON-ready copy of either kind of state
+    return state.to_dict() if isinstance(state, GameState) else json.loads(json.dumps(state))
+
+def clamp(v, lo, hi): return max(lo, min(hi, v))
+
+def is_over(state):
+    return not (state['cycle'] <= CYCLES and state['life'] > 0)
+
+def roll_prices(location, rng=random):
+    return {w: int(rng.randint(*r) * NODES[location]) for w, r in WAREZ.items()}
+
+# === Price History ===
+# The last HISTORY prices of every ware at every node, kept in fixed-size
+# ring buffers. Appending is O(1): the window's sum is updated in place and
+# its min and max come from monotonic queues (amortized O(1), never longer
+# than the window), so nothing is rescanned and nothing grows however many
+# runs an engine plays.
+HISTORY = 32
+
+class RollingWindow:
+    __slots__ = ('size', 'ring', 'head', 'count', 'total', 'seq', 'lows', 'highs')
+
+    def __init__(self, size=HISTORY):
+        self.size = size
+        self.ring = array('q', bytes(8 * size))
+        self.head = self.count = self.total = self.seq = 0
+        self.lows, self.highs = deque(), deque()   # (seq, value), rising / falling
+
+    def append(self, v):
+        if self.count == self.size:
+            self.total -= self.ring[self.head]
+        else:
+            self.count += 1
+        self.ring[self.head] = v
+        self.head = (self.head + 1) % self.size
+        self.total += v
+        self.seq += 1
+        lows, highs, gone = self.lows, self.highs, self.seq - self.size
+        while lows and lows[-1][1] >= v: lows.pop()
+        while highs and highs[-1][1] <= v: highs.pop()
+        lows.append((self.seq, v)); highs.append((self.seq, v))
+        if lows[0][0] <= gone: lows.popleft()
+        if highs[0][0] <= gone: highs.popleft()
+
+    def stats(self):
+        # (min, mean, max) of the window, or None while it is empty
+        if not self.count:
+            return None
+        return self.lows[0][1], self.total / self.count, self.highs[0][1]
+
+    def values(self):
+        # Oldest first
+        start = (self.head - self.count) % self.size
+        return [self.ring[(start + i) % self.size] for i in range(self.count)]
+
+class PriceHistory:
+    def __init__(self, size=HISTORY):
+        self.size = size
+        self.windows = {(n, w): RollingWindow(size) for n in NODES for w in WAREZ}
+
+    def record(self, node, sheet):
+        for w, p in sheet.items():
+            self.windows[node, w].append(p)
+
+    def stats(self, node):
+        # {ware: (min, mean, max)} at a node; empty before its first sheet
+        out = {}
+        for w in WAREZ:
+            st = self.windows[node, w].stats()
+            if st is not None:
+                out[w] = st
+        return out
+
+    def values(self, node, ware):
+        return self.windows[node, ware].values()
+
+# === Market ===
+# A price sheet belongs to a (node, cycle): it is rolled the first time the
+# player is at that node at that cycle and then kept, so a turn that doesn't
+# move the clock (a stray key, a refused trade) shows the same prices instead
+# of rolling new ones. Sheets come off the market stream in the order they
+# are first needed, so a seeded run still replays exactly. Every sheet seen
+# this run stays in `sheets`, in the order it was looked up.
+#
+# `block` can hold pre-rolled sheets (see matrix_market.pregenerate): a
+# callable giving the sheet for (node, cycle), or None if it has none. New
+# sheets are also recorded in `price_history`, a PriceHistory that outlives
+# the run.
+class Market:
+    def __init__(self, rng=random, price_history=None):
+        self.rng = rng
+        self.price_history = price_history
+        self.sheets = {}
+        self.block = None
+
+    def prices(self, node, cycle):
+        sheet = self.sheets.get((node, cycle))
+        if sheet is None:
+            if self.block is not None:
+                sheet = self.block(node, cycle)
+            if sheet is None:
+                sheet = roll_prices(node, self.rng)
+            self.sheets[node, cycle] = sheet
+            if self.price_history is not None:
+                self.price_history.record(node, sheet)
+        return sheet
+
+    def history(self, node=None):
+        # [(cycle, node, sheet)] in the order the sheets were looked up
+        return [(c, n, p) for (n, c), p in self.sheets.items() if node is None or n == node]
+
+def armory_items():
+    # Same numbering the armory screen uses: weapons, useables, then ammo
+    return list(WEAPONS) + list(USEABLES) + list(AMMO_PRICES)
+
+def parse_basket(text):
+    # 'U4, D5 max, D2 10' -> [('upload', 'Trojan', 'all'), ('download', 'Worm', 'max'),
+    # ('download', 'BlackICE', 10)]. Warez go by their number on the market
+    # screen or by name; a missing quantity means all (uploads) or max
+    # (downloads). None if any order doesn't read.
+    names = list(WAREZ)
+    orders = []
+    for part in text.split(','):
+        m = re.fullmatch(r'\s*([DU])\s*([A-Za-z]+|\d+)\s*(\d+|MAX|ALL)?\s*', part, re.I)
+        if m is None:
+            return None
+        kind = 'download' if m[1].upper() == 'D' else 'upload'
+        if m[2].isdigit():
+            i = int(m[2]) - 1
+            if not 0 <= i < len(names):
+                return None
+            ware = names[i]
+        else:
+            hits = [w for w in names if w.lower().startswith(m[2].lower())]
+            if len(hits) != 1:
+                return None
+            ware = hits[0]
+        qty = (m[3] or ('max' if kind == 'download' else 'all')).lower()
+        orders.append((kind, ware, int(qty) if qty.isdigit() else qty))
+    return orders
+
+def armory_price(item):
+    if item in WEAPONS: return WEAPONS[item]['price']
+    if item in USEABLES: return USEABLES[item]
+    return AMMO_PRICES[item]
+
+def new_game_plus(state):
+    # Start New Game+ preserving inventory and perks
+    state['cycle'] = 1.0
+    state['profit_start'] = state['credits']
+    state['life'] = 100
+    state['armor'] = 0
+
+# === Perks Logic ===
+# Each perk names the state fields its rule reads; the rule gets the state
+# and the bitset of perks held. A PerkWatch remembers those fields as they
+# were at its last check, so update_perks(state, watch) only tests the perks
+# whose fields have moved since: the cost of a check follows what changed,
+# not how many perks there are. Without a watch every rule is tested.
+BASE_PERKS = PERK_BIT['Heavily Armed'] | PERK_BIT['Edge Runner'] | PERK_BIT['Data Broker']
+PERK_RULES = {
+    'Heavily Armed':  (('weapons',),                lambda s, held: len(s['weapons']) == len(WEAPONS)),
+    'Edge Runner':    (('escapes',),                lambda s, held: s['escapes'] >= 2),
+    'Data Broker':    (('credits', 'profit_start'), lambda s, held: s['credits'] > s['profit_start'] * 1.6),
+    'Elite Operator': (('perks',),                  lambda s, held: held & BASE_PERKS == BASE_PERKS),
+}
+PERK_DEPS = {}                    # field -> perks whose rule reads it
+for _p, (_fields, _) in PERK_RULES.items():
+    for _f in _fields:
+        PERK_DEPS.setdefault(_f, set()).add(_p)
+
+def _watch_key(state, field):
+    v = state[field]
+    if field == 'perks': return perk_bits(v)
+    return tuple(v.items()) if field in TABLES else v
+
+class PerkWatch:
+    __slots__ = ('seen',)
+
+    def __init__(self):
+        self.seen = {}
+
+    def changed(self, state):
+        # Perks whose fields differ from the last check
+        due = set()
+        for f, perks in PERK_DEPS.items():
+            k = _watch_key(state, f)
+            if f not in self.seen or self.seen[f] != k:
+                self.seen[f] = k
+                due |= perks
+        return due
+
+def update_perks(state, watch=None):
+    due = set(PERK_RULES) if watch is None else watch.changed(state)
+    if not due:
+        return []
+    p = state['perks']
+    held = perk_bits(p)
+    new = []
+    while due:
+        # A new perk can unlock perks that depend on the ones held
+        now, due = due, set()
+        for name, (_, rule) in PERK_RULES.items():
+            if name in now and not held & PERK_BIT[name] and rule(state, held):
+                p.append(name); new.append(name)
+                held |= PERK_BIT[name]
+                due |= PERK_DEPS['perks']
+    if watch is not None and new:
+        watch.seen['perks'] = held
+    return new
+
+# === Random Streams ===
+# Each engine draws from three independent streams so that, say, an extra
+# battle round never shifts the next price roll. Streams are seeded from
+# the engine seed and the run number, so any run can be rebuilt exactly.
+STREAMS = ('market', 'events', 'combat')
+
+class RngStreams:
+    def __init__(self, seed=None, run=0, rng=None):
+        self.seed = seed
+        for name in STREAMS:
+            setattr(self, name, rng if rng is not None else random.Random(f"{seed}/{run}/{name}"))
+
+def state_digest(state):
+    if isinstance(state, GameState):
+        state = state.to_dict()
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+# === Engine ===
+# Phases: 'turn' waits for a main-menu action, 'battle' for ('run',) or
+# ('attack', weapon), 'civilian' for ('guess', n) and 'over' accepts nothing.
+#
+# Turn actions:
+#   ('download', ware, qty)   ('upload', ware, qty)   ('buy', item)
+#   ('basket', [(kind, ware, qty), ...])   see check_basket and parse_basket
+#   ('equip', useable)        ('jack',)   ('next',)   ('quit',)   ('wait',)
+#
+# Every turn action ends the loop iteration exactly like a keypress in
+# curses_sim does, so the engine looks up the next prices (see Market) and
+# rolls the next event straight away, and the returned events cover both.
+#
+# Pass `seed` (or nothing, and one is picked) for reproducible streams, or
+# `rng` to draw everything from one generator such as the `random` module.
+# With record=True every run keeps its opening state and action log, and
+# record() returns what replay() needs to play it again bit for bit.
+# compact=True starts from a GameState instead of a plain dict.
+# `price_history` keeps the recent prices at every node across runs.
+class Engine:
+    def __init__(self, state=None, rng=None, seed=None, record=False, compact=False):
+        if rng is None and seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.run = 0
+        self.rngs = RngStreams(seed, 0, rng)
+        if state is None:
+            state = new_state(self.rngs.events)
+            if compact: state = GameState(state)
+        self.state = state
+        self.price_history = PriceHistory()
+        self.market = Market(self.rngs.market, self.price_history)
+        self.prices = {}
+        self.phase = 'turn'
+        self.battle = None
+        self.curse = None
+        self.perk_watch = PerkWatch()
+        self.recording = record
+        self.initial = None
+        self.log = None
+        self.journal = None     # see matrix_journal
+
+    def start(self):
+        # Every run (first game, continue, New Game+) gets fresh streams
+        if self.seed is not None:
+            self.run += 1
+            self.rngs = RngStreams(self.seed, self.run)
+        self.market = Market(self.rngs.market, self.price_history)
+        if self.recording:
+            self.initial = as_dict(self.state)
+            self.log = []
+        events = self._begin_turn([])
+        if self.journal is not None:
+            self.journal.begin(self, events)
+        return events
+
+    def record(self):
+        if self.seed is None or self.log is None:
+            raise ValueError('engine is not recording a seeded run')
+        return {'seed':self.seed, 'run':self.run, 'state':self.initial,
+                'actions':[list(a) for a in self.log], 'digest':state_digest(self.state)}
+
+    def step(self, action):
+        events = self._step(action)
+        if self.log is not None:
+            self.log.append(action)
+        if self.journal is not None:
+            self.journal.step(self, action, events)
+        return events
+
+    def _step(self, action):
+        kind = action[0]
+        events = []
+        if self.phase == 'turn':
+            if kind == 'quit':
+                self.phase = 'over'
+                events.append({'type':'game_over','reason':'quit'})
+                return events
+            handler = self._TURN.get(kind)
+            if handler is None:
+                raise ValueError(f"unknown action {kind!r}")
+            handler(self, action, events)
+            return self._begin_turn(events)
+        if self.phase == 'battle':
+            if kind == 'run': self._run(events)
+            elif kind == 'attack': self._attack(action[1], events)
+            else: raise ValueError(f"{kind!r} is not a battle action")
+        elif self.phase == 'civilian':
+            if kind != 'guess': raise ValueError(f"{kind!r} is not a civilian action")
+            self._guess(action[1], events)
+        else:
+            raise ValueError('game is over')
+        return events
+
+    def battle_options(self):
+        opts = list(self.state['weapons'].keys())
+        if 'Elite Operator' in self.state['perks']:
+            opts.append('Kung Fu')
+        return opts
+
+    # --- loop iteration ---
+    def _begin_turn(self, events):
+        s, rng = self.state, self.rngs.events
+        if is_over(s):
+            self.phase = 'over'
+            events.append({'type':'game_over','reason':'dead' if s['life'] <= 0 else 'complete'})
+            return events
+        self.prices = self.market.prices(s['location'], s['cycle'])
+        self.phase = 'turn'
+        events.append({'type':'prices','prices':self.prices})
+        ev = rng.random()
+        if ev < AGENT_ROLL: self._start_battle(False, events)
+        elif ev < SMITH_ROLL: self._start_battle(True, events)
+        elif ev < MEDIC_ROLL: self._field_medic(events)
+        elif ev < CIVILIAN_ROLL:
+            self.curse = rng.randint(1,10)
+            self.phase = 'civilian'
+            events.append({'type':'civilian'})
+        return events
+
+    # --- turn handlers ---
+    def _download(self, action, events):
+        _, key, qty = action
+        s = self.state
+        p = self.prices[key]
+        maxq = s['credits'] // p if p>0 else 0
+        if maxq < 1:
+            events.append({'type':'rejected','reason':'Not enough credits.'})
+            return
+        qty = max(1, min(maxq, int(qty)))
+        s['credits'] -= p * qty
+        s['inventory'][key] += qty
+        s['cycle'] += TRADE_COST
+        events.append({'type':'download','ware':key,'qty':qty,'price':p})
+
+    def _upload(self, action, events):
+        _, key, qty = action
+        s = self.state
+        maxq = s['inventory'].get(key, 0)
+        if maxq < 1:
+            events.append({'type':'rejected','reason':f'No {key} to upload.'})
+            return
+        qty = max(1, min(maxq, int(qty)))
+        p = self.prices[key]
+        s['credits'] += p * qty
+        s['inventory'][key] -= qty
+        s['cycle'] += TRADE_COST
+        events.append({'type':'upload','ware':key,'qty':qty,'price':p})
+
+    def _buy(self, action, events):
+        key = action[1]
+        s = self.state
+        price = armory_price(key)
+        # The armory charges its cycle even when the purchase is refused
+        if s['credits'] >= price:
+            s['credits'] -= price
+            if key in WEAPONS:
+                info = WEAPONS[key]
+                s['weapons'][key] = s['weapons'].get(key, 0) + 1
+                s['ammo'][info['ammo']] += info['mag']
+            elif key in USEABLES:
+                s['useables'][key] += 1
+            else:
+                s['ammo'][key] += AMMO_PACK
+            events.append({'type':'buy','item':key,'price':price})
+        else:
+            events.append({'type':'rejected','reason':'Not enough credits.'})
+        s['cycle'] += TRADE_COST
+
+    def _equip(self, action, events):
+        key = action[1]
+        s = self.state
+        if s['useables'][key] < 1:
+            events.append({'type':'rejected','reason':f'No {key} owned.'})
+            return
+        s['useables'][key] -= 1
+        if key == 'Health Pack':
+            s['life'] = clamp(s['life'] + 15, 0, 100)
+        elif key == 'Armor Kit':
+            s['armor'] = clamp(s['armor'] + 20, 0, 100)
+        s['cycle'] += TRADE_COST
+        events.append({'type':'equip','item':key})
+
+    def _jack(self, action, events):
+        s = self.state
+        s['location'] = self.rngs.events.choice(list(NODES))
+        s['cycle'] += JACK_COST
+        events.append({'type':'jack','location':s['location']})
+
+    def _next(self, action, events):
+        self.state['cycle'] += NEXT_COST
+        events.append({'type':'next','cycle':self.state['cycle']})
+
+    def check_basket(self, orders):
+        # One pass over a basket of ('upload'|'download', ware, qty|'all'|'max')
+        # orders at the current prices, uploads first so their credits can
+        # pay for the downloads. Quantities are clamped like single trades.
+        # Returns ([(kind, ware, qty, price)], None), or (None, reason) if
+        # any order can't be filled; nothing is changed either way.
+        s = self.state
+        credits = s['credits']
+        held = {w: s['inventory'][w] for w in WAREZ}
+        fills = []
+        for kind, key, qty in sorted(orders, key=lambda o: o[0] != 'upload'):
+            if kind not in ('download', 'upload') or key not in WAREZ:
+                return None, f'Bad order: {kind} {key}.'
+            p = self.prices[key]
+            if kind == 'upload':
+                maxq = held[key]
+                if maxq < 1:
+                    return None, f'No {key} to upload.'
+            else:
+                maxq = credits // p if p > 0 else 0
+                if maxq < 1:
+                    return None, f'Not enough credits for {key}.'
+            if qty in ('all', 'max'):
+                qty = maxq
+            else:
+                try:
+                    qty = max(1, min(maxq, int(qty)))
+                except (TypeError, ValueError):
+                    return None, f'Bad quantity for {key}.'
+            if kind == 'upload':
+                credits += p * qty; held[key] -= qty
+            else:
+                credits -= p * qty; held[key] += qty
+            fills.append((kind, key, qty, p))
+        if not fills:
+            return None, 'Empty basket.'
+        return fills, None
+
+    def _basket(self, action, events):
+        # A whole basket is one trade: one validation pass, one TRADE_COST
+        fills, reason = self.check_basket(action[1])
+        if fills is None:
+            events.append({'type':'rejected','reason':reason})
+            return
+        s = self.state
+        for kind, key, qty, p in fills:
+            if kind == 'upload':
+                s['credits'] += p * qty; s['inventory'][key] -= qty
+            else:
+                s['credits'] -= p * qty; s['inventory'][key] += qty
+            events.append({'type':kind,'ware':key,'qty':qty,'price':p})
+        s['cycle'] += TRADE_COST
+
+    def _wait(self, action, events):
+        pass
+
+    _TURN = {'download':_download, 'upload':_upload, 'basket':_basket, 'buy':_buy, 'equip':_equip,
+             'jack':_jack, 'next':_next, 'wait':_wait}
+
+    # --- random events ---
+    def _field_medic(self, events):
+        s, rng = self.state, self.rngs.events
+        if rng.random() < 0.01:
+            heal = rng.randint(10,15)
+            if rng.random() < 0.05:
+                heal = 25
+            s['life'] = clamp(s['life'] + heal, 0, 100)
+            update_perks(s, self.perk_watch)
+            events.append({'type':'medic','heal':heal})
+
+    def _guess(self, guess, events):
+        self.phase = 'turn'
+        try:
+            guess = int(guess)
+        except (TypeError, ValueError):
+            events.append({'type':'civilian_gone'})
+            return
+        if abs(guess - self.curse) <= 2:
+            self.state['people_freed'] += 1
+            events.append({'type':'freed','people_freed':self.state['people_freed']})
+        else:
+            events.append({'type':'blue_pill'})
+            self._start_battle(True, events)
+
+    # --- battle ---
+    def _start_battle(self, smith, events):
+        self.phase = 'battle'
+        self.battle = {'smith':smith, 'hp':100 if smith else 50,
+                       'dodge':SMITH_DODGE if smith else 0.0}
+        events.append({'type':'ambush','smith':smith,'hp':self.battle['hp']})
+
+    def _run(self, events):
+        if self.rngs.combat.random() < ESCAPE_CHANCE:
+            self.state['escapes'] += 1
+            self._end_battle()
+            events.append({'type':'escaped'})
+        else:
+            # failed escape, the player still gets to pick a weapon
+            events.append({'type':'escape_failed'})
+
+    def _attack(self, choice, events):
+        s, rng, b = self.state, self.rngs.combat, self.battle
+        if choice not in self.battle_options():
+            events.append({'type':'rejected','reason':f'Cannot use {choice}.'})
+            return
+        if choice == 'Kung Fu':
+            b['hp'] -= KUNG_FU_DMG
+            events.append({'type':'player_hit','weapon':choice,'dmg':KUNG_FU_DMG,'hp':b['hp']})
+        else:
+            info = WEAPONS[choice]
+            ak = info['ammo']
+            if s['ammo'][ak] < 1:
+                events.append({'type':'no_ammo','weapon':choice})
+                return
+            s['ammo'][ak] -= 1
+            if rng.random() < info['acc']:
+                b['hp'] -= info['dmg']
+                events.append({'type':'player_hit','weapon':choice,'dmg':info['dmg'],'hp':b['hp']})
+            else:
+                events.append({'type':'player_miss','weapon':choice})
+        if b['hp'] <= 0:
+            self._win(events)
+            return
+        if rng.random() > b['dodge']:
+            dmg = rng.randint(5,15)
+            # Armor absorbs damage first
+            if s['armor'] > 0:
+                absorbed = min(s['armor'], dmg)
+                s['armor'] -= absorbed
+                dmg -= absorbed
+            # Apply remaining to life
+            if dmg > 0:
+                s['life'] = clamp(s['life'] - dmg, 0, 100)
+            events.append({'type':'enemy_hit','dmg':dmg,'life':s['life']})
+        else:
+            events.append({'type':'enemy_dodged'})
+        if s['life'] <= 0:
+            self._end_battle()
+            events.append({'type':'killed'})
+
+    def _win(self, events):
+        s, rng = self.state, self.rngs.combat
+        if self.battle['smith']:
+            # Smith drop rewards
+            gain = rng.randint(5000,10000)
+            s['credits'] += gain
+            s['inventory']['RootKit'] = s['inventory'].get('RootKit',0) + 1
+            events.append({'type':'victory','smith':True,'gain':gain,'drop':'RootKit'})
+        else:
+            drop = rng.choice(list(WAREZ.keys()) + list(WEAPONS.keys()) + list(AMMO_PRICES.keys()))
+            if drop in WAREZ:
+                s['inventory'][drop] += 1
+            elif drop in WEAPONS:
+                s['weapons'][drop] = s['weapons'].get(drop,0) + 1
+            else:
+                s['ammo'][drop] = s['ammo'].get(drop,0) + 1
+            gain = rng.randint(50,200)
+            s['credits'] += gain
+            events.append({'type':'victory','smith':False,'gain':gain,'drop':drop})
+        self._end_battle()
+
+    def _end_battle(self):
+        self.battle = None
+        self.phase = 'turn'
+
+# === Replay ===
+def replay(rec):
+    # Rebuild a recorded run headlessly; returns the finished engine
+    eng = Engine(json.loads(json.dumps(rec['state'])), seed=rec['seed'])
+    eng.run = rec['run'] - 1
+    eng.start()
+    for a in rec['actions']:
+        eng.step(tuple(a))
+    return eng
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - reinforcement learning environments ===
+# Two environments with the same action and observation layout:
+#
+#   MatrixEnv  one game on top of matrix_engine.Engine, gymnasium-style
+#              reset()/step(); the rules are the engine's own.
+#   VecEnv     n games stepped together on matrix_montecarlo's item-major
+#              arrays, one battle round or turn per step like the engine,
+#              with finished games reset in place.
+#
+# Actions are one Discrete index covering the main menu keys and the battle
+# and civilian screens (see ACTIONS). An index that doesn't belong to the
+# current phase falls back to that phase's default: [N]ext on the main
+# menu, [R]un in a battle, walking past a civilian. info['action_mask']
+# flags the moves that can do something. The reward is the change in
+# log(1 + credits), so a run's return is its log growth in wealth.
+#
+# gymnasium is optional: with it installed the environments carry
+# action_space/observation_space and MatrixEnv subclasses gymnasium.Env.
+import argparse
+import time
+import numpy as np
+from matrix_engine import (CYCLES, PERK_INFO, ESCAPE_CHANCE, SMITH_DODGE, KUNG_FU_DMG,
+                           AGENT_ROLL, SMITH_ROLL, MEDIC_ROLL, CIVILIAN_ROLL, Engine, armory_items)
+from matrix_montecarlo import (Batch, NODE_NAMES, WARE_NAMES, GUN_NAMES, AMMO_NAMES, USE_NAMES,
+                               GUN_ACC, GUN_DMG, GUN_AMMO, ARMORY_PRICE, WARE_HI, ELITE_OPERATOR,
+                               ACT_WAIT, ACT_NEXT, ACT_JACK, ACT_DOWNLOAD, ACT_UPLOAD, ACT_BUY,
+                               ACT_EQUIP, apply_actions, roll_prices, update_perks, win_loot)
+try:
+    import gymnasium
+    from gymnasium import spaces
+except ImportError:
+    gymnasium = spaces = None
+
+# === Actions ===
+ACTIONS = ([('next',), ('jack',)] +
+           [('download', w) for w in WARE_NAMES] +
+           [('upload', w) for w in WARE_NAMES] +
+           [('buy', i) for i in armory_items()] +
+           [('equip', u) for u in USE_NAMES] +
+           [('run',)] +
+           [('attack', g) for g in GUN_NAMES] + [('attack', 'Kung Fu')] +
+           [('guess', n) for n in range(1, 11)])
+N_ACTIONS = len(ACTIONS)
+A_NEXT, A_JACK = 0, 1
+A_DOWNLOAD = 2
+A_UPLOAD   = A_DOWNLOAD + len(WARE_NAMES)
+A_BUY      = A_UPLOAD + len(WARE_NAMES)
+A_EQUIP    = A_BUY + len(ARMORY_PRICE)
+A_RUN      = A_EQUIP + len(USE_NAMES)
+A_ATTACK   = A_RUN + 1                       # guns, then Kung Fu
+A_KUNG_FU  = A_ATTACK + len(GUN_NAMES)
+A_GUESS    = A_KUNG_FU + 1
+TURN_ACTIONS = slice(A_NEXT, A_RUN)
+BATTLE_ACTIONS = slice(A_RUN, A_GUESS)
+CIVILIAN_ACTIONS = slice(A_GUESS, N_ACTIONS)
+
+PHASES = ('turn', 'battle', 'civilian', 'over')
+TURN, BATTLE, CIVILIAN, OVER = range(4)
+PERK_NAMES = list(PERK_INFO)
+
+# === Observations ===
+# credits, life, armor, cycle, enemy hp, smith, then per-item blocks,
+# location, perks and phase one-hots. Amounts that can grow without bound
+# are log1p-scaled.
+OBS_FIELDS = (['credits', 'life', 'armor', 'cycle', 'enemy_hp', 'smith'] +
+              [f"inv:{w}" for w in WARE_NAMES] + [f"price:{w}" for w in WARE_NAMES] +
+              [f"gun:{g}" for g in GUN_NAMES] + [f"ammo:{a}" for a in AMMO_NAMES] +
+              [f"use:{u}" for u in USE_NAMES] + [f"at:{n}" for n in NODE_NAMES] +
+              [f"perk:{p}" for p in PERK_NAMES] + [f"phase:{p}" for p in PHASES])
+OBS_SIZE = len(OBS_FIELDS)
+
+def observe(credits, life, armor, cycle, hp, smith, inventory, prices, weapons, ammo,
+            useables, location, perks, phase):
+    # Column arrays in, (n, OBS_SIZE) float32 out
+    n = len(credits)
+    obs = np.empty((n, OBS_SIZE), dtype=np.float32)
+    obs[:, 0] = np.log1p(credits)
+    obs[:, 1] = life / 100
+    obs[:, 2] = armor / 100
+    obs[:, 3] = cycle / CYCLES
+    obs[:, 4] = hp / 100
+    obs[:, 5] = smith
+    i = 6
+    for block in (np.log1p(inventory), prices / WARE_HI, weapons, np.log1p(ammo), useables):
+        obs[:, i:i + len(block)] = block.T
+        i += len(block)
+    obs[:, i:i + len(NODE_NAMES)] = location[:, None] == np.arange(len(NODE_NAMES))
+    i += len(NODE_NAMES)
+    obs[:, i:i + len(PERK_NAMES)] = (perks[:, None] >> np.arange(len(PERK_NAMES))) & 1
+    i += len(PERK_NAMES)
+    obs[:, i:] = phase[:, None] == np.arange(len(PHASES))
+    return obs
+
+def action_mask(credits, inventory, prices, weapons, ammo, useables, perks, phase):
+    # (n, N_ACTIONS) bool: moves that aren't refused or ignored right now
+    n = len(credits)
+    mask = np.zeros((n, N_ACTIONS), dtype=bool)
+    turn = phase == TURN
+    mask[:, A_NEXT] = mask[:, A_JACK] = turn
+    mask[:, A_DOWNLOAD:A_UPLOAD] = (turn & (prices <= credits)).T
+    mask[:, A_UPLOAD:A_BUY] = (turn & (inventory > 0)).T
+    mask[:, A_BUY:A_EQUIP] = turn[:, None] & (ARMORY_PRICE[None, :] <= credits[:, None])
+    mask[:, A_EQUIP:A_RUN] = (turn & (useables > 0)).T
+    fight = phase == BATTLE
+    mask[:, A_RUN] = fight
+    mask[:, A_ATTACK:A_KUNG_FU] = (fight & (weapons > 0) & (ammo[GUN_AMMO] > 0)).T
+    mask[:, A_KUNG_FU] = fight & (perks & ELITE_OPERATOR > 0)
+    mask[:, CIVILIAN_ACTIONS] = (phase == CIVILIAN)[:, None]
+    return mask
+
+def _phase_default(phase):
+    return {'turn':ACTIONS[A_NEXT], 'battle':ACTIONS[A_RUN], 'civilian':('guess', None)}[phase]
+
+# === Single Game ===
+_Env = gymnasium.Env if gymnasium else object
+
+class MatrixEnv(_Env):
+    def __init__(self, max_steps=5000):
+        self.max_steps = max_steps
+        self.engine = None
+        self.steps = 0
+        if spaces:
+            self.action_space = spaces.Discrete(N_ACTIONS)
+            self.observation_space = spaces.Box(-np.inf, np.inf, (OBS_SIZE,), np.float32)
+
+    def _columns(self):
+        eng, s = self.engine, self.engine.state
+        col = lambda table, names: np.array([[table.get(k, 0)] for k in names])
+        b = eng.battle or {}
+        return dict(credits=np.array([s['credits']]), life=np.array([s['life']]),
+                    armor=np.array([s['armor']]), cycle=np.array([s['cycle']]),
+                    hp=np.array([b.get('hp', 0)]), smith=np.array([b.get('smith', False)]),
+                    inventory=col(s['inventory'], WARE_NAMES), prices=col(eng.prices, WARE_NAMES),
+                    weapons=col(s['weapons'], GUN_NAMES), ammo=col(s['ammo'], AMMO_NAMES),
+                    useables=col(s['useables'], USE_NAMES),
+                    location=np.array([NODE_NAMES.index(s['location'])]),
+                    perks=np.array([sum(1 << i for i, p in enumerate(PERK_NAMES) if p in s['perks'])]),
+                    phase=np.array([PHASES.index(eng.phase)]))
+
+    def _observe(self, events):
+        c = self._columns()
+        mask = action_mask(c['credits'], c['inventory'], c['prices'], c['weapons'], c['ammo'],
+                           c['useables'], c['perks'], c['phase'])
+        return observe(**c)[0], {'action_mask':mask[0], 'events':events}
+
+    def reset(self, seed=None, options=None):
+        self.engine = Engine(seed=seed, compact=True)
+        self.steps = 0
+        return self._observe(self.engine.start())
+
+    def action(self, a):
+        # Engine action for index a in the current phase
+        act = ACTIONS[a]
+        phase = self.engine.phase
+        if phase == 'turn' and a < A_RUN:
+            s = self.engine.state
+            if act[0] == 'download':
+                p = self.engine.prices[act[1]]
+                return ('download', act[1], s['credits'] // p if p > 0 else 0)
+            if act[0] == 'upload':
+                return ('upload', act[1], s['inventory'][act[1]])
+            return act
+        if phase == 'battle' and A_RUN <= a < A_GUESS: return act
+        if phase == 'civilian' and a >= A_GUESS: return act
+        return _phase_default(phase)
+
+    def step(self, a):
+        before = self.engine.state['credits']
+        events = self.engine.step(self.action(int(a)))
+        self.steps += 1
+        obs, info = self._observe(events)
+        reward = float(np.log1p(self.engine.state['credits']) - np.log1p(before))
+        return obs, reward, self.engine.phase == 'over', self.steps >= self.max_steps, info
+
+# === Batched Games ===
+class VecEnv:
+    def __init__(self, n, max_steps=5000):
+        self.n = n
+        self.max_steps = max_steps
+        self.rng = None
+        self.b = None
+        if spaces:
+            self.single_action_space = spaces.Discrete(N_ACTIONS)
+            self.single_observation_space = spaces.Box(-np.inf, np.inf, (OBS_SIZE,), np.float32)
+
+    def reset(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.b = Batch(self.n, self.rng)
+        self.phase = np.full(self.n, TURN)
+        self.hp = np.zeros(self.n, dtype=np.int64)
+        self.smith = np.zeros(self.n, dtype=bool)
+        self.curse = np.zeros(self.n, dtype=np.int64)
+        self.prices = self.b.prices
+        self.steps = np.zeros(self.n, dtype=np.int64)
+        self._begin_turn(np.arange(self.n))
+        return self._observe()
+
+    def _observe(self):
+        b = self.b
+        obs = observe(b.credits, b.life, b.armor, b.cycle, self.hp, self.smith, b.inventory,
+                      self.prices, b.weapons, b.ammo, b.useables, b.location, b.perks, self.phase)
+        mask = action_mask(b.credits, b.inventory, self.prices, b.weapons, b.ammo, b.useables,
+                           b.perks, self.phase)
+        return obs, {'action_mask':mask}
+
+    # --- loop iteration, as Engine._begin_turn ---
+    def _begin_turn(self, g):
+        b, rng = self.b, self.rng
+        over = ~((b.cycle[g] <= CYCLES) & (b.life[g] > 0))
+        self.phase[g[over]] = OVER
+        g = g[~over]
+        roll_prices(b, g, rng)
+        self.phase[g] = TURN
+        ev = rng.random(len(g))
+        fights = g[ev < SMITH_ROLL]
+        self._start_battle(fights, ev[ev < SMITH_ROLL] >= AGENT_ROLL)
+        m = g[(ev >= SMITH_ROLL) & (ev < MEDIC_ROLL)]
+        m = m[rng.random(len(m)) < 0.01]
+        heal = np.where(rng.random(len(m)) < 0.05, 25, rng.integers(10, 16, len(m)))
+        b.life[m] = np.minimum(b.life[m] + heal, 100)
+        update_perks(b, m)
+        c = g[(ev >= MEDIC_ROLL) & (ev < CIVILIAN_ROLL)]
+        self.curse[c] = rng.integers(1, 11, len(c))
+        self.phase[c] = CIVILIAN
+
+    def _start_battle(self, g, smith):
+        self.phase[g] = BATTLE
+        self.smith[g] = smith
+        self.hp[g] = np.where(smith, 100, 50)
+
+    # --- battle round, as Engine._run / _attack ---
+    def _battle(self, g, a):
+        b, rng = self.b, self.rng
+        run = g[a == A_RUN]
+        esc = run[rng.random(len(run)) < ESCAPE_CHANCE]
+        b.escapes[esc] += 1
+        self.phase[esc] = TURN
+        g, a = g[a != A_RUN], a[a != A_RUN]
+        # Kung Fu or a gun with ammo; anything else is refused and costs nothing
+        kung_fu = (a == A_KUNG_FU) & (b.perks[g] & ELITE_OPERATOR > 0)
+        gun = np.clip(a - A_ATTACK, 0, len(GUN_NAMES) - 1)
+        fire = (a < A_KUNG_FU) & (b.weapons[gun, g] > 0) & (b.ammo[GUN_AMMO[gun], g] > 0)
+        ok = kung_fu | fire
+        g, gun, kung_fu, fire = g[ok], gun[ok], kung_fu[ok], fire[ok]
+        b.ammo[GUN_AMMO[gun[fire]], g[fire]] -= 1
+        hit = fire & (rng.random(len(g)) < GUN_ACC[gun])
+        self.hp[g] -= np.where(hit, GUN_DMG[gun], 0) + np.where(kung_fu, KUNG_FU_DMG, 0)
+        won = self.hp[g] <= 0
+        win_loot(b, g[won], self.smith[g[won]], rng)
+        self.phase[g[won]] = TURN
+        g = g[~won]
+        shot = rng.random(len(g)) > np.where(self.smith[g], SMITH_DODGE, 0.0)
+        pain = np.where(shot, rng.integers(5, 16, len(g)), 0)
+        absorbed = np.minimum(b.armor[g], pain)
+        b.armor[g] -= absorbed
+        b.life[g] = np.clip(b.life[g] - (pain - absorbed), 0, 100)
+        self.phase[g[b.life[g] <= 0]] = TURN
+
+    def _civilian(self, g, a):
+        # A guess within 2 frees them; a miss wakes Smith; no guess walks on
+        self.phase[g] = TURN
+        guessed = a >= A_GUESS
+        close = guessed & (np.abs(a - A_GUESS + 1 - self.curse[g]) <= 2)
+        self.b.people_freed[g[close]] += 1
+        self._start_battle(g[guessed & ~close], np.ones((guessed & ~close).sum(), dtype=bool))
+
+    def _turn(self, g, a):
+        b = self.b
+        act = np.full(len(g), ACT_NEXT)
+        item = np.zeros(len(g), dtype=np.int64)
+        qty = np.zeros(len(g), dtype=np.int64)
+        for lo, hi, code in ((A_NEXT, A_JACK, ACT_NEXT), (A_JACK, A_DOWNLOAD, ACT_JACK),
+                             (A_DOWNLOAD, A_UPLOAD, ACT_DOWNLOAD), (A_UPLOAD, A_BUY, ACT_UPLOAD),
+                             (A_BUY, A_EQUIP, ACT_BUY), (A_EQUIP, A_RUN, ACT_EQUIP)):
+            m = (a >= lo) & (a < hi)
+            act[m] = code
+            item[m] = a[m] - lo
+        # Download as much as the credits buy, upload the whole stack
+        m = act == ACT_DOWNLOAD
+        qty[m] = b.credits[g[m]] // np.maximum(self.prices[item[m], g[m]], 1)
+        m = act == ACT_UPLOAD
+        qty[m] = b.inventory[item[m], g[m]]
+        codes = np.full(self.n, ACT_WAIT)
+        codes[g] = act
+        items = np.zeros(self.n, dtype=np.int64)
+        items[g] = item
+        qtys = np.zeros(self.n, dtype=np.int64)
+        qtys[g] = qty
+        apply_actions(b, self.prices, codes, items, qtys, self.rng)
+        self._begin_turn(g)
+
+    def step(self, actions):
+        a = np.asarray(actions)
+        before = np.log1p(self.b.credits)
+        phase = self.phase.copy()
+        g = np.nonzero(phase == BATTLE)[0]
+        self._battle(g, np.where((a[g] >= A_RUN) & (a[g] < A_GUESS), a[g], A_RUN))
+        g = np.nonzero(phase == CIVILIAN)[0]
+        self._civilian(g, a[g])
+        g = np.nonzero(phase == TURN)[0]
+        self._turn(g, np.where(a[g] < A_RUN, a[g], A_NEXT))
+        self.steps += 1
+        reward = (np.log1p(self.b.credits) - before).astype(np.float32)
+        terminated = self.phase == OVER
+        truncated = ~terminated & (self.steps >= self.max_steps)
+        done = np.nonzero(terminated | truncated)[0]
+        final = None
+        if len(done):
+            final, _ = self._observe()
+            self._reset_games(done)
+        obs, info = self._observe()
+        if final is not None:
+            info['final_observation'] = final[done]
+            info['final_index'] = done
+        return obs, reward, terminated, truncated, info
+
+    def _reset_games(self, g):
+        # Finished games restart in place with a fresh batch slice
+        fresh = Batch(len(g), self.rng)
+        for k, v in vars(fresh).items():
+            if isinstance(v, np.ndarray):
+                getattr(self.b, k)[..., g] = v
+        self.steps[g] = 0
+        self.hp[g] = 0
+        self.smith[g] = False
+        self._begin_turn(g)
+
+# === Throughput ===
+def random_policy(mask, rng):
+    # Uniform over the allowed moves of each row
+    score = rng.random(mask.shape) * mask
+    return score.argmax(axis=1)
+
+def bench(n, steps, seed=0):
+    rng = np.random.default_rng(seed)
+    env = VecEnv(n)
+    obs, info = env.reset(seed)
+    t = time.perf_counter()
+    episodes = 0
+    for _ in range(steps):
+        obs, r, term, trunc, info = env.step(random_policy(info['action_mask'], rng))
+        episodes += int(term.sum())
+    vec = n * steps / (time.perf_counter() - t)
+    single = MatrixEnv()
+    obs, info = single.reset(seed)
+    t = time.perf_counter()
+    for _ in range(steps):
+        obs, r, term, trunc, info = single.step(random_policy(info['action_mask'][None], rng)[0])
+        if term or trunc:
+            obs, info = single.reset()
+    return vec, steps / (time.perf_counter() - t), episodes
+
+if __name__=='__main__':
+    ap = argparse.ArgumentParser(description='Step throughput of the RL environments')
+    ap.add_argument('-n', type=int, default=4096, help='games in the VecEnv')
+    ap.add_argument('--steps', type=int, default=500)
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+    vec, single, episodes = bench(args.n, args.steps, args.seed)
+    print(f"VecEnv x{args.n}: {vec:,.0f} steps/s ({episodes} episodes finished)")
+    print(f"MatrixEnv:      {single:,.0f} steps/s")
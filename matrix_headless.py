@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - headless terminal ===
+# A stdscr stand-in backed by an in-memory character grid and a scripted
+# input queue, so the real screens and handle_* functions of any betav file
+# run with no TTY at full speed:
+#
+#   scr = FakeScreen(['5', '3', 'x'])         # getstr lines and keys, in order
+#   with patched_curses(scr):
+#       action = game.handle_download(scr, game.engine.prices)
+#   assert 'Download complete' in scr
+#
+# getkey() and getstr() take the next item off the queue and raise
+# OutOfInput once it is empty. Writes behave like curses: text wraps at the
+# right edge and running off the bottom-right corner raises curses.error.
+import contextlib
+import curses
+from collections import deque
+
+class OutOfInput(Exception):
+    pass
+
+# === Fake Screen ===
+class FakeScreen:
+    def __init__(self, script=(), h=24, w=80, strict=True):
+        # strict=False drops writes that fall off the screen instead of raising
+        self.h, self.w = h, w
+        self.strict = strict
+        self.script = deque(script)
+        self.grid = [[' '] * w for _ in range(h)]
+        self.y = self.x = 0
+        self.refreshes = 0
+        self.keys_read = 0
+
+    # --- input ---
+    def feed(self, *items):
+        self.script.extend(items)
+
+    def next_input(self):
+        # The next scripted item; subclasses can generate input instead
+        if not self.script:
+            raise OutOfInput
+        return self.script.popleft()
+
+    def getkey(self, *yx):
+        self.keys_read += 1
+        return self.next_input()
+
+    def getch(self, *yx):
+        return ord(self.getkey(*yx)[0])
+
+    def getstr(self, *args):
+        # getstr([y, x,] [n]); the line is echoed where it was typed
+        if len(args) >= 2:
+            self.y, self.x = args[0], args[1]
+        n = args[-1] if len(args) in (1, 3) else None
+        self.keys_read += 1
+        line = self.next_input()[:n]
+        self._put(line)
+        return line.encode()
+
+    # --- output ---
+    def getmaxyx(self):
+        return (self.h, self.w)
+
+    def getyx(self):
+        return (self.y, self.x)
+
+    def move(self, y, x):
+        if not (0 <= y < self.h and 0 <= x < self.w):
+            raise curses.error('move() returned ERR')
+        self.y, self.x = y, x
+
+    def addstr(self, *args):
+        # addstr([y, x,] text[, attr])
+        if len(args) >= 3 or (len(args) == 2 and not isinstance(args[0], str)):
+            self.move(args[0], args[1])
+            text = args[2]
+        else:
+            text = args[0]
+        self._put(str(text))
+
+    def _put(self, text):
+        grid, w = self.grid, self.w
+        for ch in text:
+            if ch == '\n':
+                for x in range(self.x, w):
+                    grid[self.y][x] = ' '
+                self.y, self.x = self.y + 1, 0
+            else:
+                if self.y >= self.h:
+                    break
+                grid[self.y][self.x] = ch
+                self.x += 1
+                if self.x == w:
+                    self.y, self.x = self.y + 1, 0
+            if self.y >= self.h:
+                if self.strict:
+                    self.y, self.x = self.h - 1, w - 1
+                    raise curses.error('addwstr() returned ERR')
+                self.y, self.x = self.h - 1, w - 1
+                break
+
+    def clrtoeol(self):
+        row = self.grid[self.y]
+        for x in range(self.x, self.w):
+            row[x] = ' '
+
+    def erase(self):
+        for row in self.grid:
+            row[:] = [' '] * self.w
+        self.y = self.x = 0
+    clear = erase
+
+    def refresh(self):
+        self.refreshes += 1
+    noutrefresh = refresh
+
+    def bkgd(self, *a): pass
+    def keypad(self, *a): pass
+    def nodelay(self, *a): pass
+    def timeout(self, *a): pass
+
+    # --- inspection ---
+    def row(self, y):
+        return ''.join(self.grid[y]).rstrip()
+
+    def text(self):
+        return '\n'.join(self.row(y) for y in range(self.h)).rstrip('\n')
+
+    def find(self, needle):
+        # (y, x) of the first occurrence on screen, or None
+        for y in range(self.h):
+            x = ''.join(self.grid[y]).find(needle)
+            if x >= 0:
+                return (y, x)
+        return None
+
+    def __contains__(self, needle):
+        return self.find(needle) is not None
+
+# === Patched curses ===
+NOOPS = ('echo', 'noecho', 'curs_set', 'start_color', 'init_pair', 'napms', 'doupdate',
+         'cbreak', 'nocbreak', 'use_default_colors', 'beep', 'flash')
+
+@contextlib.contextmanager
+def patched_curses(screen=None):
+    # The curses calls the betav files make, as no-ops; curses.wrapper(fn)
+    # runs fn on `screen` (a fresh FakeScreen if none is given)
+    names = NOOPS + ('color_pair', 'wrapper', 'initscr', 'endwin')
+    saved = {n: getattr(curses, n, None) for n in names}
+    for n in NOOPS:
+        setattr(curses, n, lambda *a, **k: None)
+    curses.color_pair = lambda *a: 0
+    curses.endwin = lambda: None
+    curses.initscr = lambda: screen if screen is not None else FakeScreen()
+    curses.wrapper = lambda fn, *a, **k: fn(curses.initscr(), *a, **k)
+    try:
+        yield screen
+    finally:
+        for n, f in saved.items():
+            if f is None:
+                delattr(curses, n)
+            else:
+                setattr(curses, n, f)
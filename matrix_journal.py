@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - event journal ===
+# An append-only log of a slot's runs, one JSON record per line:
+#
+#   {'t':'start', 'seed', 'run', 'initial', 'ev', 'snap'}   Engine.start()
+#   {'t':'act', 'n', 'a', 'ev'}     every Engine.step: the action and its events
+#   {'t':'snap', 'n', 'snap'}       a full engine snapshot every SNAPSHOT_EVERY acts
+#   {'t':'end', 'n'}                the run finished (or was abandoned)
+#
+# Events are the engine's own (price rolls, trades, battles, ...) plus a
+# {'type':'perk'} for every perk the state gained during the step. Each
+# record is flushed as it is written, so a crash loses at most the action in
+# flight; resume() loads the last snapshot of an unfinished run and replays
+# only the actions after it, which the seeded streams in the snapshot make
+# exact. A record that doesn't parse ends the journal there: resume() plays
+# up to it and the next write cuts it off.
+#
+# The journal only ever holds the run in progress. When a run ends (or a
+# new one starts over an abandoned one) its records move to the end of the
+# slot's '.old' file, so resume() never reads past runs. events() streams
+# both, oldest first, for analytics without touching a save.
+#
+# Run it as a script to summarise a journal.
+import argparse
+import json
+import os
+import re
+import shutil
+from collections import Counter
+from itertools import chain
+from matrix_engine import PERK_BIT, STREAMS, Market, PriceHistory, RngStreams, as_dict, perk_bits
+from matrix_store import DEFAULT_SLOT
+
+JOURNAL = 'matrix_1984_{}.journal'
+SNAPSHOT_EVERY = 50
+
+def journal_path(slot):
+    return JOURNAL.format(re.sub(r'[^\w-]', '_', slot))
+
+def archive_path(path):
+    # Where the journal's finished runs go
+    return path + '.old'
+
+# === Snapshots ===
+def _set_rng(rng, st):
+    version, internal, gauss = st
+    rng.setstate((version, tuple(internal), gauss))
+
+def snapshot(engine):
+    # Everything step() reads: state, phase, streams, and the sheets this run
+    # can still look up (the clock never goes back within a run)
+    cycle = engine.state['cycle']
+    return {'state':as_dict(engine.state), 'phase':engine.phase, 'battle':engine.battle,
+            'curse':engine.curse, 'prices':engine.prices, 'run':engine.run,
+            'rngs':{n: getattr(engine.rngs, n).getstate() for n in STREAMS},
+            'sheets':[[n, c, p] for (n, c), p in engine.market.sheets.items() if c >= cycle],
+            'history':[[n, w, win.values()] for (n, w), win in engine.price_history.windows.items()
+                       if win.count]}
+
+def restore(engine, snap):
+    # Put a snapshot back into an engine; the state object is updated in
+    # place so front ends holding a reference to it see the change
+    s = engine.state
+    for k, v in snap['state'].items():
+        s[k] = v
+    engine.run = snap['run']
+    if engine.seed is not None:
+        engine.rngs = RngStreams(engine.seed, engine.run)
+    for n in STREAMS:
+        _set_rng(getattr(engine.rngs, n), snap['rngs'][n])
+    engine.price_history = PriceHistory(engine.price_history.size)
+    for n, w, values in snap['history']:
+        for v in values:
+            engine.price_history.windows[n, w].append(v)
+    engine.market = Market(engine.rngs.market, engine.price_history)
+    engine.market.sheets = {(n, c): p for n, c, p in snap['sheets']}
+    engine.phase, engine.battle, engine.curse = snap['phase'], snap['battle'], snap['curse']
+    engine.prices = snap['prices']
+
+# === Reading ===
+def _parse(line):
+    # The record on a line, None for a torn or damaged one
+    if not line.endswith(b'\n'):
+        return None
+    try:
+        rec = json.loads(line)
+    except ValueError:
+        return None
+    return rec if isinstance(rec, dict) and 't' in rec else None
+
+def read(path):
+    # Records in order, up to the first one that doesn't parse (a torn last
+    # line from a crash mid-write, or damage)
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            rec = _parse(line)
+            if rec is None:
+                break
+            yield rec
+
+def trim(path):
+    # Cut a file at its first record that doesn't parse, so records added
+    # after it can be read
+    try:
+        with open(path, 'rb+') as f:
+            at = 0
+            for line in f:
+                if _parse(line) is None:
+                    break
+                at += len(line)
+            f.truncate(at)
+    except FileNotFoundError:
+        pass
+
+def events(path, types=None):
+    # (run, n, event) for every event in the journal and its finished runs,
+    # optionally only some types
+    run = None
+    for rec in chain(read(archive_path(path)), read(path)):
+        if rec['t'] == 'start':
+            run = rec['run']
+        for e in rec.get('ev', ()):
+            if types is None or e['type'] in types:
+                yield run, rec.get('n', 0), e
+
+# === Journal ===
+class Journal:
+    def __init__(self, path, every=SNAPSHOT_EVERY):
+        self.path = path
+        self.every = every
+        self.f = None
+        self.seq = 0        # actions since the run started
+        self.open = False   # a run is logged and hasn't ended
+        self.perks = 0      # bitset of the perks already logged
+
+    def _write(self, rec, sync=False):
+        if self.f is None:
+            trim(self.path)
+            self.f = open(self.path, 'a')
+        self.f.write(json.dumps(rec, separators=(',', ':')) + '\n')
+        self.f.flush()
+        if sync:
+            os.fsync(self.f.fileno())
+
+    def _rotate(self):
+        # Move the journal's records to the end of the archive. A crash
+        # between the copy and the unlink leaves the run in both, which
+        # only analytics would see twice
+        self.close()
+        trim(self.path)
+        try:
+            src = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        trim(archive_path(self.path))
+        with src, open(archive_path(self.path), 'ab') as dst:
+            shutil.copyfileobj(src, dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.unlink(self.path)
+
+    # --- hooks, called by the Engine ---
+    def begin(self, engine, events):
+        self.seq = 0
+        self.open = True
+        self.perks = perk_bits(engine.state['perks'])
+        # Whatever run the file still holds was abandoned
+        self._rotate()
+        self._write({'t':'start', 'seed':engine.seed, 'run':engine.run, 'initial':engine.initial,
+                     'ev':events, 'snap':snapshot(engine)}, sync=True)
+        if engine.phase == 'over':
+            self.end()
+
+    def step(self, engine, action, events):
+        self.seq += 1
+        bits = perk_bits(engine.state['perks'])
+        new = bits & ~self.perks
+        if new:
+            events = events + [{'type':'perk','perk':p} for p, b in PERK_BIT.items() if new & b]
+            self.perks = bits
+        self._write({'t':'act', 'n':self.seq, 'a':list(action), 'ev':events})
+        if engine.phase == 'over':
+            self.end()
+        elif self.seq % self.every == 0:
+            self._write({'t':'snap', 'n':self.seq, 'snap':snapshot(engine)}, sync=True)
+
+    def end(self, force=False):
+        # force also closes a run some earlier session left open in the file
+        if self.open or (force and os.path.exists(self.path)):
+            self.open = False
+            self._write({'t':'end', 'n':self.seq}, sync=True)
+            self._rotate()
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+    # --- resume ---
+    def resume(self, engine):
+        # Rebuild the journal's unfinished run in `engine`: the last snapshot,
+        # then the actions logged after it. False if there is none
+        start = snap = None
+        actions, at = [], 0
+        for rec in read(self.path):
+            t = rec['t']
+            if t == 'start':
+                start, snap, actions, at = rec, rec['snap'], [], 0
+            elif t == 'act':
+                actions.append(rec['a'])
+            elif t == 'snap':
+                snap, at = rec['snap'], rec['n']
+            elif t == 'end':
+                start = None
+        if start is None:
+            return False
+        engine.seed = start['seed']
+        restore(engine, snap)
+        if engine.recording:
+            engine.initial = start['initial']
+            engine.log = [tuple(a) for a in actions[:at]]
+        journal, engine.journal = engine.journal, None
+        try:
+            for a in actions[at:]:
+                engine.step(tuple(a))
+        finally:
+            engine.journal = journal
+        self.seq, self.open = len(actions), True
+        self.perks = perk_bits(engine.state['perks'])
+        return True
+
+# === Analytics ===
+def summarise(path):
+    runs = Counter(); kinds = Counter(); trades = Counter(); fights = Counter()
+    for run, n, e in events(path):
+        t = e['type']
+        runs[run] += 1
+        kinds[t] += 1
+        if t in ('download', 'upload'):
+            trades[t, e['ware']] += e['qty']
+        elif t in ('victory', 'killed', 'escaped'):
+            fights[t] += 1
+    return runs, kinds, trades, fights
+
+if __name__=='__main__':
+    ap = argparse.ArgumentParser(description='Summarise a MATRIX 1984 event journal')
+    ap.add_argument('file', nargs='?', default=journal_path(DEFAULT_SLOT))
+    args = ap.parse_args()
+    runs, kinds, trades, fights = summarise(args.file)
+    print(f"{len(runs)} runs, {sum(runs.values())} events")
+    print('Events: ' + ', '.join(f"{t} x{n}" for t, n in kinds.most_common()))
+    for (t, ware), qty in sorted(trades.items()):
+        print(f"  {t:<9}{ware:<14}{qty:>8}")
+    if fights:
+        print('Battles: ' + ', '.join(f"{t} {n}" for t, n in sorted(fights.items())))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - batch price sheets ===
+# Engine.market rolls one sheet at a time as the player needs it. For
+# simulations and planners this module rolls whole blocks of sheets as
+# NumPy arrays, shape (cycles, nodes, warez), and can hand them to a Market
+# up front so the engine then plays on the pre-rolled prices, turning a row
+# into a sheet only when it is first looked up. A block is drawn from a
+# NumPy generator seeded off the market's own stream, so a seeded run that
+# pre-generates at the same point replays exactly.
+#
+# Run it as a script to time lazy lookups, rerolls and block generation.
+import argparse
+import random
+import time
+import numpy as np
+from matrix_engine import CYCLES, CATALOG, NODES, WAREZ, TRADE_COST, Market, roll_prices
+
+NODE_NAMES = list(NODES)
+WARE_NAMES = list(WAREZ)
+NODE_MULT  = np.array(CATALOG.node_mult)
+WARE_LO    = np.array(CATALOG.ware_lo)
+WARE_HI    = np.array(CATALOG.ware_hi)
+# Every cycle a price can be looked up at: 1.0 .. 30.0 in trade steps
+ALL_CYCLES = 1.0 + TRADE_COST * np.arange(int(round((CYCLES - 1.0) / TRADE_COST)) + 1)
+
+def roll_table(rng, cycles, nodes=NODE_NAMES):
+    # (len(cycles), len(nodes), warez) sheets; randint(lo, hi) * node multiplier
+    shape = (len(cycles), len(nodes), len(WARE_NAMES))
+    raw = rng.integers(WARE_LO, WARE_HI + 1, size=shape)
+    mult = np.array([NODES[n] for n in nodes])[None, :, None]
+    return np.floor(raw * mult).astype(np.int64)
+
+class Block:
+    # Pre-rolled sheets for Market.block; a row becomes a dict only when the
+    # engine first looks it up
+    def __init__(self, table, cycles, nodes):
+        self.table = table
+        self.rows = {float(c): i for i, c in enumerate(cycles)}
+        self.cols = {n: j for j, n in enumerate(nodes)}
+
+    def __call__(self, node, cycle):
+        i, j = self.rows.get(cycle), self.cols.get(node)
+        if i is None or j is None:
+            return None
+        return dict(zip(WARE_NAMES, self.table[i, j].tolist()))
+
+def pregenerate(market, cycles=ALL_CYCLES, nodes=NODE_NAMES):
+    # Roll the whole block at once and hand it to the market; sheets it has
+    # already shown are kept, and copied into the returned block
+    rng = np.random.default_rng(market.rng.getrandbits(64))
+    table = roll_table(rng, cycles, nodes)
+    block = market.block = Block(table, cycles, nodes)
+    for (n, c), sheet in market.sheets.items():
+        if c in block.rows and n in block.cols:
+            table[block.rows[c], block.cols[n]] = [sheet[w] for w in WARE_NAMES]
+    return table
+
+def history_arrays(market, node=None):
+    # (cycles, node indices, prices) of every sheet seen, in looked-up order
+    hist = market.history(node)
+    cycles = np.array([c for c, n, p in hist])
+    nodes = np.array([NODE_NAMES.index(n) for c, n, p in hist], dtype=np.int64)
+    prices = np.array([[p[w] for w in WARE_NAMES] for c, n, p in hist], dtype=np.int64)
+    return cycles, nodes, prices.reshape(len(hist), len(WARE_NAMES))
+
+def bench(turns):
+    rng = random.Random(0)
+    t = time.perf_counter()
+    for _ in range(turns):
+        roll_prices('The Construct', rng)
+    reroll = (time.perf_counter() - t) / turns
+    m = Market(rng)
+    m.prices('The Construct', 1.0)
+    t = time.perf_counter()
+    for _ in range(turns):
+        m.prices('The Construct', 1.0)
+    lazy = (time.perf_counter() - t) / turns
+    pregenerate(Market(rng))
+    t = time.perf_counter()
+    for _ in range(100):
+        pregenerate(Market(rng))
+    block = (time.perf_counter() - t) / 100
+    return reroll, lazy, block
+
+if __name__=='__main__':
+    ap = argparse.ArgumentParser(description='Time price sheet rolling for The MATRIX 1984')
+    ap.add_argument('--turns', type=int, default=200000)
+    args = ap.parse_args()
+    reroll, lazy, block = bench(args.turns)
+    print(f"reroll every turn  {reroll*1e6:6.2f} us")
+    print(f"cached sheet       {lazy*1e6:6.2f} us")
+    print(f"whole run block    {block*1e3:6.2f} ms ({len(ALL_CYCLES)} cycles x {len(NODE_NAMES)} nodes, "
+          f"{block/len(ALL_CYCLES)/len(NODE_NAMES)*1e6:.2f} us/sheet)")
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - Monte Carlo batch simulator ===
+# Plays N independent copies of the curses_sim loop at once. Every player
+# field is a NumPy array with one column per game, so a whole 30-cycle run
+# for a million games is a few hundred vectorized steps instead of a
+# million Python loops. Rules mirror matrix_engine.Engine.
+#
+# Per-item tables (inventory, weapons, ammo, useables, prices) are stored
+# item-major, shape (items, N): every row is contiguous, and the handful of
+# items is looped over in Python instead of reducing along a tiny axis.
+import argparse
+import numpy as np
+from matrix_engine import (CYCLES, CATALOG, NODES, WAREZ, WEAPONS, AMMO_PRICES, USEABLES, PERK_BIT,
+                           TRADE_COST, JACK_COST, NEXT_COST, AGENT_ROLL, SMITH_ROLL,
+                           MEDIC_ROLL, CIVILIAN_ROLL, SMITH_DODGE,
+                           KUNG_FU_DMG, AMMO_PACK, armory_items, armory_price)
+
+# === Lookup Arrays ===
+# Straight off the compiled catalog's arrays, indexed by catalog id
+NODE_NAMES = list(NODES)
+NODE_MULT  = np.array(CATALOG.node_mult)
+WARE_NAMES = list(WAREZ)
+WARE_LO    = np.array(CATALOG.ware_lo)[:, None]
+WARE_HI    = np.array(CATALOG.ware_hi)[:, None]
+GUN_NAMES  = list(WEAPONS)
+GUN_ACC    = np.array(CATALOG.gun_acc)
+GUN_DMG    = np.array(CATALOG.gun_dmg)
+GUN_MAG    = np.array(CATALOG.gun_mag)
+AMMO_NAMES = list(AMMO_PRICES)
+GUN_AMMO   = np.array(CATALOG.gun_ammo)
+USE_NAMES  = list(USEABLES)
+HEALTH_PACK= USE_NAMES.index('Health Pack')
+ARMORY     = armory_items()
+ARMORY_PRICE = np.array([armory_price(i) for i in ARMORY])
+ROOTKIT    = WARE_NAMES.index('RootKit')
+# Guns ranked by expected damage per round, best first
+GUN_RANK   = np.argsort(-(GUN_ACC * GUN_DMG))
+# Agent drops pick uniformly over warez, weapons and ammo
+DROPS      = len(WARE_NAMES) + len(GUN_NAMES) + len(AMMO_NAMES)
+
+HEAVILY_ARMED, EDGE_RUNNER, DATA_BROKER, ELITE_OPERATOR = (PERK_BIT[p] for p in
+    ('Heavily Armed', 'Edge Runner', 'Data Broker', 'Elite Operator'))
+
+# === Action Codes ===
+ACT_WAIT, ACT_NEXT, ACT_JACK, ACT_DOWNLOAD, ACT_UPLOAD, ACT_BUY, ACT_EQUIP = range(7)
+
+# === Batch State ===
+class Batch:
+    def __init__(self, n, rng):
+        self.n = n
+        self.credits  = np.full(n, 2000, dtype=np.int64)
+        self.life     = np.full(n, 100, dtype=np.int64)
+        self.armor    = np.zeros(n, dtype=np.int64)
+        self.inventory= np.zeros((len(WARE_NAMES), n), dtype=np.int64)
+        self.weapons  = np.zeros((len(GUN_NAMES), n), dtype=np.int64)
+        self.ammo     = np.zeros((len(AMMO_NAMES), n), dtype=np.int64)
+        self.useables = np.zeros((len(USE_NAMES), n), dtype=np.int64)
+        self.location = rng.integers(0, len(NODE_NAMES), n)
+        self.cycle    = np.ones(n)
+        self.escapes  = np.zeros(n, dtype=np.int64)
+        self.profit_start = np.full(n, 2000, dtype=np.int64)
+        self.people_freed = np.zeros(n, dtype=np.int64)
+        self.perks    = np.zeros(n, dtype=np.int64)
+        self.death_cycle = np.full(n, np.nan)
+        # The price sheet each game is looking at and the (node, cycle) it
+        # belongs to
+        self.prices   = np.zeros((len(WARE_NAMES), n), dtype=np.int64)
+        self.sheet_node  = np.full(n, -1)
+        self.sheet_cycle = np.full(n, np.nan)
+
+    def active(self):
+        return (self.cycle <= CYCLES) & (self.life > 0)
+
+def first_true(mask, order=None):
+    # Row index of the first True in each column (by `order`), -1 if none
+    best = np.full(mask.shape[1], -1)
+    for j in reversed(order if order is not None else range(len(mask))):
+        best = np.where(mask[j], j, best)
+    return best
+
+def update_perks(b, g):
+    p = b.perks[g]
+    p |= np.where((b.weapons[:, g] > 0).all(axis=0), HEAVILY_ARMED, 0)
+    p |= np.where(b.escapes[g] >= 2, EDGE_RUNNER, 0)
+    p |= np.where(b.credits[g] > b.profit_start[g] * 1.6, DATA_BROKER, 0)
+    base = HEAVILY_ARMED | EDGE_RUNNER | DATA_BROKER
+    p |= np.where(p & base == base, ELITE_OPERATOR, 0)
+    b.perks[g] = p
+
+def roll_prices(b, g, rng):
+    # Prices for games g at their current (node, cycle). Like Engine.market,
+    # a game gets one sheet per (node, cycle) and sees it again after an
+    # action that was refused and so didn't move the clock. The clock never
+    # goes back and every jack moves it on, so keeping the last sheet per
+    # game is enough; only games that moved get a new roll.
+    g = g[(b.location[g] != b.sheet_node[g]) | (b.cycle[g] != b.sheet_cycle[g])]
+    # randint(lo, hi) per ware; scaling one uniform draw beats per-element bounds
+    raw = np.floor(rng.random((len(WARE_NAMES), len(g))) * (WARE_HI - WARE_LO + 1)) + WARE_LO
+    b.prices[:, g] = (raw * NODE_MULT[b.location[g]]).astype(np.int64)
+    b.sheet_node[g], b.sheet_cycle[g] = b.location[g], b.cycle[g]
+    return b.prices
+
+# === Battle Policies ===
+# 'run'  : run until the escape roll succeeds. A failed escape hands the
+#          player the weapon menu, and an empty pick loops back without an
+#          enemy turn, so running never costs life.
+# 'fight': fire the best gun that still has ammo (Kung Fu for an Elite
+#          Operator), run once nothing is left to shoot with.
+def battle(b, g, smith, policy, rng):
+    if policy == 'run':
+        b.escapes[g] += 1
+        return
+    hp = np.where(smith, 100, 50)
+    dodge = np.where(smith, SMITH_DODGE, 0.0)
+    while len(g):
+        gun = first_true((b.weapons[:, g] > 0) & (b.ammo[GUN_AMMO][:, g] > 0), GUN_RANK)
+        can_fire = gun >= 0
+        kung_fu = ~can_fire & (b.perks[g] & ELITE_OPERATOR > 0)
+        flee = ~can_fire & ~kung_fu
+        b.escapes[g[flee]] += 1
+        b.ammo[GUN_AMMO[gun[can_fire]], g[can_fire]] -= 1
+        hit = can_fire & (rng.random(len(g)) < GUN_ACC[gun])
+        hp -= np.where(hit, GUN_DMG[gun], 0) + np.where(kung_fu, KUNG_FU_DMG, 0)
+        won = ~flee & (hp <= 0)
+        win_loot(b, g[won], smith[won], rng)
+        # Opponent fires at everyone still standing
+        keep = ~flee & ~won
+        g, hp, smith, dodge = g[keep], hp[keep], smith[keep], dodge[keep]
+        shot = rng.random(len(g)) > dodge
+        pain = np.where(shot, rng.integers(5, 16, len(g)), 0)
+        absorbed = np.minimum(b.armor[g], pain)
+        b.armor[g] -= absorbed
+        b.life[g] = np.clip(b.life[g] - (pain - absorbed), 0, 100)
+        keep = b.life[g] > 0
+        g, hp, smith, dodge = g[keep], hp[keep], smith[keep], dodge[keep]
+
+def win_loot(b, g, smith, rng):
+    s, a = g[smith], g[~smith]
+    b.credits[s] += rng.integers(5000, 10001, len(s))
+    b.inventory[ROOTKIT, s] += 1
+    drop = rng.integers(0, DROPS, len(a))
+    ware = drop < len(WARE_NAMES)
+    gun = ~ware & (drop < len(WARE_NAMES) + len(GUN_NAMES))
+    ammo = ~ware & ~gun
+    b.inventory[drop[ware], a[ware]] += 1
+    b.weapons[drop[gun] - len(WARE_NAMES), a[gun]] += 1
+    b.ammo[drop[ammo] - len(WARE_NAMES) - len(GUN_NAMES), a[ammo]] += 1
+    b.credits[a] += rng.integers(50, 201, len(a))
+
+# === Turn Policies ===
+# A policy gets the batch and the (wares, N) price sheet and returns
+# (action code, item index, qty) arrays of shape (N,). Item indices are
+# into WARE_NAMES for trades, ARMORY for buys and USE_NAMES for equips.
+def policy_idle(b, prices, rng):
+    return np.full(b.n, ACT_NEXT), np.zeros(b.n, dtype=np.int64), np.zeros(b.n, dtype=np.int64)
+
+def policy_jacker(b, prices, rng):
+    return np.full(b.n, ACT_JACK), np.zeros(b.n, dtype=np.int64), np.zeros(b.n, dtype=np.int64)
+
+TRADER_MEAN = (WARE_LO + WARE_HI) / 2 * NODE_MULT.mean()
+TRADER_SELL = TRADER_MEAN * 1.05
+TRADER_BUY  = TRADER_MEAN * 0.85
+
+def policy_trader(b, prices, rng):
+    # Sell anything above its average price, otherwise buy as much as
+    # possible of the dearest ware that is cheap here, otherwise jack in.
+    sell = first_true((b.inventory > 0) & (prices > TRADER_SELL))
+    cheap = (prices < TRADER_BUY) & (prices <= b.credits)
+    buy = np.full(b.n, -1)
+    best = np.zeros(b.n, dtype=np.int64)
+    for j in range(len(WARE_NAMES)):
+        better = cheap[j] & (prices[j] > best)
+        buy = np.where(better, j, buy)
+        best = np.where(better, prices[j], best)
+    act = np.where(sell >= 0, ACT_UPLOAD, np.where(buy >= 0, ACT_DOWNLOAD, ACT_JACK))
+    item = np.where(sell >= 0, sell, np.maximum(buy, 0))
+    qty = np.where(sell >= 0, b.inventory[item, np.arange(b.n)], b.credits)
+    return act, item, qty
+
+POLICIES = {'idle': policy_idle, 'jacker': policy_jacker, 'trader': policy_trader}
+
+def apply_actions(b, prices, act, item, qty, rng):
+    m = act == ACT_NEXT
+    b.cycle[m] += NEXT_COST
+    m = np.nonzero(act == ACT_JACK)[0]
+    b.location[m] = rng.integers(0, len(NODE_NAMES), len(m))
+    b.cycle[m] += JACK_COST
+    # Downloads are clamped to 1..credits//price, refused when unaffordable
+    m = np.nonzero(act == ACT_DOWNLOAD)[0]
+    it, p = item[m], prices[item[m], m]
+    maxq = b.credits[m] // p
+    ok = maxq >= 1
+    m, it, p, q = m[ok], it[ok], p[ok], np.clip(qty[m][ok], 1, maxq[ok])
+    b.credits[m] -= p * q
+    b.inventory[it, m] += q
+    b.cycle[m] += TRADE_COST
+    m = np.nonzero(act == ACT_UPLOAD)[0]
+    it = item[m]
+    maxq = b.inventory[it, m]
+    ok = maxq >= 1
+    m, it, q = m[ok], it[ok], np.clip(qty[m][ok], 1, maxq[ok])
+    b.credits[m] += prices[it, m] * q
+    b.inventory[it, m] -= q
+    b.cycle[m] += TRADE_COST
+    # The armory charges its cycle even when the purchase is refused
+    m = np.nonzero(act == ACT_BUY)[0]
+    b.cycle[m] += TRADE_COST
+    m = m[b.credits[m] >= ARMORY_PRICE[item[m]]]
+    it = item[m]
+    b.credits[m] -= ARMORY_PRICE[it]
+    gun = it < len(GUN_NAMES)
+    use = ~gun & (it < len(GUN_NAMES) + len(USE_NAMES))
+    ammo = ~gun & ~use
+    b.weapons[it[gun], m[gun]] += 1
+    b.ammo[GUN_AMMO[it[gun]], m[gun]] += GUN_MAG[it[gun]]
+    b.useables[it[use] - len(GUN_NAMES), m[use]] += 1
+    b.ammo[it[ammo] - len(GUN_NAMES) - len(USE_NAMES), m[ammo]] += AMMO_PACK
+    m = np.nonzero(act == ACT_EQUIP)[0]
+    m = m[b.useables[item[m], m] > 0]
+    it = item[m]
+    b.useables[it, m] -= 1
+    hp = it == HEALTH_PACK
+    b.life[m[hp]] = np.minimum(b.life[m[hp]] + 15, 100)
+    b.armor[m[~hp]] = np.minimum(b.armor[m[~hp]] + 20, 100)
+    b.cycle[m] += TRADE_COST
+
+# === Simulation ===
+def simulate(n, policy='idle', battle_policy='fight', guess=5, seed=None, batch=None):
+    rng = np.random.default_rng(seed)
+    turn = POLICIES[policy] if isinstance(policy, str) else policy
+    b = batch if batch is not None else Batch(n, rng)
+    live = b.active()
+    while live.any():
+        prices = roll_prices(b, np.nonzero(live)[0], rng)
+        # Finished games roll no events and take no actions
+        ev = np.where(live, rng.random(b.n), 1.0)
+        agent = np.nonzero(ev < AGENT_ROLL)[0]
+        smith = np.nonzero((ev >= AGENT_ROLL) & (ev < SMITH_ROLL))[0]
+        medic = np.nonzero((ev >= SMITH_ROLL) & (ev < MEDIC_ROLL))[0]
+        civ = np.nonzero((ev >= MEDIC_ROLL) & (ev < CIVILIAN_ROLL))[0]
+        # Field medic
+        m = medic[rng.random(len(medic)) < 0.01]
+        heal = np.where(rng.random(len(m)) < 0.05, 25, rng.integers(10, 16, len(m)))
+        b.life[m] = np.minimum(b.life[m] + heal, 100)
+        update_perks(b, m)
+        # Civilians: a miss turns them into Smith
+        freed = np.abs(guess - rng.integers(1, 11, len(civ))) <= 2
+        b.people_freed[civ[freed]] += 1
+        fights = np.concatenate([agent, smith, civ[~freed]])
+        is_smith = np.arange(len(fights)) >= len(agent)
+        battle(b, fights, is_smith, battle_policy, rng)
+        act, item, qty = turn(b, prices, rng)
+        apply_actions(b, prices, np.where(live, act, ACT_WAIT), item, qty, rng)
+        now = b.active()
+        died = live & ~now & (b.life <= 0)
+        b.death_cycle[died] = b.cycle[died]
+        live = now
+    return {'credits': b.credits, 'life': b.life, 'people_freed': b.people_freed,
+            'death_cycle': b.death_cycle, 'cycle': b.cycle, 'escapes': b.escapes,
+            'perks': b.perks}
+
+def summary(result):
+    lines = []
+    for k in ('credits', 'life', 'people_freed'):
+        v = result[k]
+        q = np.percentile(v, [5, 25, 50, 75, 95])
+        lines.append(f"{k:<13} mean {v.mean():>10.1f}  p5/p25/p50/p75/p95 " + '/'.join(f"{x:.0f}" for x in q))
+    dc = result['death_cycle']
+    dead = ~np.isnan(dc)
+    lines.append(f"{'died':<13} {dead.mean()*100:.1f}%" +
+                 (f"  median death cycle {np.median(dc[dead]):.2f}" if dead.any() else ''))
+    return '\n'.join(lines)
+
+if __name__=='__main__':
+    ap = argparse.ArgumentParser(description='Monte Carlo batch runs of The MATRIX 1984')
+    ap.add_argument('-n', type=int, default=100000)
+    ap.add_argument('--policy', choices=sorted(POLICIES), default='idle')
+    ap.add_argument('--battle', choices=['fight', 'run'], default='fight')
+    ap.add_argument('--guess', type=int, default=5)
+    ap.add_argument('--seed', type=int)
+    args = ap.parse_args()
+    print(summary(simulate(args.n, args.policy, args.battle, args.guess, args.seed)))
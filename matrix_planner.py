@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - trading planner ===
+# Trading is a stochastic inventory problem: every turn the market rolls
+# randint(lo, hi) * node multiplier per ware, a download or upload costs a
+# quarter cycle, [J]ack In half a cycle to a random node and [N]ext a whole
+# one. The planner solves it backwards over quarter-cycle ticks for
+# expected final credits.
+#
+# States are (tick, node, position, amount): the position is cash or one
+# held ware, and the amount (credits or units) lives on a half-octave grid,
+# interpolated in between. Each ware's price distribution is cut into equal
+# probability quantiles, and since the wares roll independently the value
+# of the best reaction to a fresh price sheet is taken from the product of
+# their CDFs. Ambushes and other events are left out: they don't depend on
+# what the player trades.
+#
+# advise() reads the tables for a live state and price sheet, so a bot or
+# the UI can ask every turn for the price of a few interpolations.
+import argparse
+from functools import lru_cache
+import numpy as np
+from matrix_engine import (CYCLES, NODES, WAREZ, TRADE_COST, JACK_COST, NEXT_COST,
+                           Engine, new_state)
+
+NODE_NAMES = list(NODES)
+WARE_NAMES = list(WAREZ)
+TICKS = int(round((CYCLES - 1.0) / TRADE_COST)) + 1   # playable ticks, cycle 1.0 .. 30.0
+STEP  = {'trade':int(TRADE_COST / TRADE_COST), 'jack':int(JACK_COST / TRADE_COST),
+         'next':int(NEXT_COST / TRADE_COST)}
+PAD   = max(STEP.values())
+GRID  = 2.0 ** (np.arange(101) / 2)     # 1 .. ~1e15 credits or units
+QUANTILES = 16
+
+def tick(cycle):
+    return int(round((cycle - 1.0) / TRADE_COST))
+
+def price_quantiles(m=QUANTILES):
+    # (node, ware, m) midpoints of m equal-probability slices of each roll
+    u = (np.arange(m) + 0.5) / m
+    out = np.empty((len(NODE_NAMES), len(WARE_NAMES), m))
+    for i, n in enumerate(NODE_NAMES):
+        for j, (lo, hi) in enumerate(WAREZ.values()):
+            out[i, j] = np.floor((lo + np.floor(u * (hi - lo + 1))) * NODES[n])
+    return out
+
+def lerp(vals, x):
+    # Value at amounts x from values on GRID: linear down to 0 at 0, and
+    # proportional past the top of the grid
+    x = np.asarray(x, dtype=float)
+    out = np.interp(x, np.concatenate([[0.0], GRID]), np.concatenate([[0.0], vals]))
+    return np.where(x > GRID[-1], x * (vals[-1] / GRID[-1]), out)
+
+def expected_max(floor, y):
+    # E[max(floor, Y_0 .. Y_w)] per grid row, Y_i independent and uniform
+    # over their m samples; floor (k,), y (w, k, m)
+    w, k, m = y.shape
+    z = np.maximum(y, floor[None, :, None]).transpose(1, 0, 2).reshape(k, w * m)
+    order = np.argsort(z, axis=1)
+    z = np.take_along_axis(z, order, axis=1)
+    src = np.repeat(np.arange(w), m)[order]
+    cdf = np.prod(np.cumsum(src[:, :, None] == np.arange(w), axis=1) / m, axis=2)
+    return (z * np.diff(cdf, axis=1, prepend=0.0)).sum(axis=1)
+
+# === Planner ===
+class Planner:
+    def __init__(self, quantiles=QUANTILES):
+        self.prices = price_quantiles(quantiles)
+        nodes, wares = len(NODE_NAMES), len(WARE_NAMES)
+        # Values before the tick's prices are rolled; ticks past the end pay
+        # out cash and nothing for unsold warez
+        self.cash = np.zeros((TICKS + PAD, nodes, len(GRID)))
+        self.held = np.zeros((TICKS + PAD, nodes, wares, len(GRID)))
+        self.cash[TICKS:] = GRID
+        for t in range(TICKS - 1, -1, -1):
+            self._solve_tick(t)
+
+    def _stay(self, table, t):
+        # Best of [N]ext and [J]ack In, which don't depend on the prices
+        nxt = table[t + STEP['next']]
+        jack = table[t + STEP['jack']].mean(axis=0, keepdims=True)
+        return np.maximum(nxt, jack)
+
+    def _solve_tick(self, t):
+        t1 = t + STEP['trade']
+        cash_stay = self._stay(self.cash, t)
+        held_stay = self._stay(self.held, t)
+        for n in range(len(NODE_NAMES)):
+            p = self.prices[n]                                # (ware, m)
+            # Cash: download as many units as the credits allow; the change
+            # is kept as cash
+            q = np.floor(GRID[None, :, None] / p[:, None, :])  # (ware, k, m)
+            buy = np.stack([lerp(self.held[t1, n, w], q[w]) for w in range(len(WARE_NAMES))])
+            buy = np.where(q >= 1, buy + GRID[None, :, None] - q * p[:, None, :], -np.inf)
+            self.cash[t, n] = expected_max(cash_stay[n], buy)
+            # Holding: upload everything or sit on it
+            for w in range(len(WARE_NAMES)):
+                sell = lerp(self.cash[t1, n], GRID[:, None] * p[w][None, :])
+                self.held[t, n, w] = expected_max(held_stay[n, w], sell[None])
+
+    # --- queries ---
+    def value(self, state, t=None, node=None):
+        # Expected final credits of a state before prices are rolled; a mixed
+        # inventory is valued ware by ware
+        t = tick(state['cycle']) if t is None else t
+        if t >= TICKS:
+            return float(state['credits'])
+        nodes = [NODE_NAMES.index(state['location'])] if node is None else node
+        total = 0.0
+        for n in nodes:
+            v = lerp(self.cash[t, n], state['credits'])
+            for w, ware in enumerate(WARE_NAMES):
+                q = state['inventory'].get(ware, 0)
+                if q:
+                    v += lerp(self.held[t, n, w], q)
+            total += v
+        return float(total / len(nodes))
+
+    def options(self, state, prices):
+        # Expected final credits of every trading move given this price sheet
+        t = tick(state['cycle'])
+        inv = state['inventory']
+        out = {('next',): self.value(state, t + STEP['next']),
+               ('jack',): self.value(state, t + STEP['jack'], range(len(NODE_NAMES)))}
+        for ware in WARE_NAMES:
+            p = prices[ware]
+            if inv.get(ware, 0) > 0:
+                s = dict(state, credits=state['credits'] + inv[ware] * p,
+                         inventory=dict(inv, **{ware:0}))
+                out[('upload', ware, inv[ware])] = self.value(s, t + STEP['trade'])
+            q = state['credits'] // p if p > 0 else 0
+            if q >= 1:
+                s = dict(state, credits=state['credits'] - q * p,
+                         inventory=dict(inv, **{ware:inv.get(ware, 0) + q}))
+                out[('download', ware, q)] = self.value(s, t + STEP['trade'])
+        return out
+
+    def advise(self, state, prices):
+        # (action, expected final credits) of the best move, as an Engine action
+        opts = self.options(state, prices)
+        best = max(opts, key=opts.get)
+        return best, opts[best]
+
+@lru_cache(maxsize=None)
+def planner(quantiles=QUANTILES):
+    return Planner(quantiles)
+
+def advice_line(state, prices):
+    action, ev = planner().advise(state, prices)
+    if action[0] in ('download', 'upload'):
+        move = f"{action[0].capitalize()} {action[2]} {action[1]}"
+    else:
+        move = {'next':'Next cycle', 'jack':'Jack In'}[action[0]]
+    return f"Advisor: {move} (EV {int(ev):,} cr)"
+
+# === Self Play ===
+def play(games, seed=0):
+    # Advisor on every turn; ambushes are run from, civilians guessed at 5
+    plan = planner()
+    finals, predicted = [], []
+    for g in range(games):
+        eng = Engine(new_state(), seed=f"{seed}/{g}")
+        eng.start()
+        predicted.append(plan.value(eng.state))
+        while eng.phase != 'over':
+            if eng.phase == 'battle': eng.step(('run',))
+            elif eng.phase == 'civilian': eng.step(('guess', 5))
+            else: eng.step(plan.advise(eng.state, eng.prices)[0])
+        finals.append(eng.state['credits'] if eng.state['life'] > 0 else 0)
+    return np.array(finals), np.array(predicted)
+
+if __name__=='__main__':
+    ap = argparse.ArgumentParser(description='Expected-value trading planner for The MATRIX 1984')
+    ap.add_argument('--play', type=int, default=0, help='self-play this many advised games')
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+    plan = planner()
+    start = new_state()['credits']
+    print(f'Expected final credits from {start} cr at cycle 1.0:')
+    for n, node in enumerate(NODE_NAMES):
+        print(f"  {node:<26}{float(lerp(plan.cash[0, n], start)):>22,.0f}")
+    if args.play:
+        finals, predicted = play(args.play, args.seed)
+        print(f"Self-play over {args.play} games: mean {finals.mean():,.0f} cr, "
+              f"median {np.median(finals):,.0f} cr, predicted {predicted.mean():,.0f} cr")
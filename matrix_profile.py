@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - turn profiler ===
+# Opt-in timing of every phase of a turn. Nothing is timed unless a Profiler
+# is installed: instrument() swaps the named functions for timed wrappers
+# and screen() wraps stdscr so getkey/getstr count as 'input', so a game
+# that doesn't profile runs the same code as before.
+#
+# Spans nest, and each one is charged its own time only: the seconds a
+# handler spends waiting in getkey land in 'input' (the player thinking),
+# and the price lookup inside an engine step lands in 'prices', not in the
+# step.
+# Per name the profiler keeps a count, a total, a max and a histogram of
+# power-of-two microsecond buckets, and can show them as lines for an
+# overlay or dump them to a JSON file.
+import functools
+import json
+import time
+from matrix_engine import Engine, Market
+from matrix_journal import Journal
+
+INPUT = 'input'
+# What profile_game() times in a betav module, and in the engine classes
+PHASES = ('draw_screen', 'handle_download', 'handle_upload', 'handle_bulk', 'handle_buy_armory',
+          'handle_equip', 'play_events', 'battle_screen', 'free_civilian', 'nap', 'show_advice',
+          'run_macro', 'save_game', 'flush_save', 'save_replay', 'load_game')
+ENGINE_PHASES = {Engine: {'step':'engine.step', '_begin_turn':'event roll'},
+                 Market: {'prices':'prices'}, Journal: {'step':'journal'}}
+
+class Profiler:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.stats = {}       # name -> [count, total s, max s, {bucket: count}]
+        self.stack = []       # [name, start, time spent in children]
+        self.patched = []     # (namespace, name, original) for restore()
+
+    # --- spans ---
+    def enter(self, name):
+        self.stack.append([name, self.clock(), 0.0])
+
+    def leave(self):
+        name, start, inner = self.stack.pop()
+        dt = self.clock() - start
+        if self.stack:
+            self.stack[-1][2] += dt
+        own = dt - inner
+        st = self.stats.get(name)
+        if st is None:
+            st = self.stats[name] = [0, 0.0, 0.0, {}]
+        st[0] += 1
+        st[1] += own
+        if own > st[2]: st[2] = own
+        b = int(own * 1e6).bit_length()
+        st[3][b] = st[3].get(b, 0) + 1
+
+    def wrap(self, name, fn):
+        @functools.wraps(fn)
+        def timed(*a, **k):
+            self.enter(name)
+            try:
+                return fn(*a, **k)
+            finally:
+                self.leave()
+        timed.profiled = fn
+        return timed
+
+    def instrument(self, namespace, names):
+        # Time namespace[name] (a module's globals() or a class); names is a
+        # list, or a dict of name -> label. Names that aren't there are skipped
+        get = namespace.get if isinstance(namespace, dict) else lambda n: vars(namespace).get(n)
+        labels = names if isinstance(names, dict) else {n: n for n in names}
+        for name, label in labels.items():
+            fn = get(name)
+            if fn is None or hasattr(fn, 'profiled'):
+                continue
+            timed = self.wrap(label, fn)
+            if isinstance(namespace, dict): namespace[name] = timed
+            else: setattr(namespace, name, timed)
+            self.patched.append((namespace, name, fn))
+
+    def restore(self):
+        # Put back everything instrument() replaced
+        for namespace, name, fn in reversed(self.patched):
+            if isinstance(namespace, dict): namespace[name] = fn
+            else: setattr(namespace, name, fn)
+        self.patched = []
+
+    def screen(self, stdscr):
+        return ProfiledScreen(stdscr, self)
+
+    # --- reports ---
+    def percentile(self, name, q):
+        # Upper edge of the bucket holding the q-th quantile, in seconds
+        count, _, _, hist = self.stats[name]
+        seen = 0
+        for b in sorted(hist):
+            seen += hist[b]
+            if seen >= q * count:
+                return (1 << b) / 1e6
+        return 0.0
+
+    def lines(self):
+        rows = sorted(self.stats.items(), key=lambda kv: -kv[1][1])
+        out = [f"{'phase':<20}{'calls':>7}{'total ms':>10}{'mean us':>10}{'p90 us':>9}{'max us':>9}"]
+        for name, (count, total, mx, _) in rows:
+            out.append(f"{name:<20}{count:>7}{total*1e3:>10.1f}{total/count*1e6:>10.1f}"
+                       f"{self.percentile(name, .9)*1e6:>9.0f}{mx*1e6:>9.0f}")
+        engine = sum(st[1] for n, st in self.stats.items() if n != INPUT)
+        think = self.stats.get(INPUT, [0, 0.0])[1]
+        out.append(f"game {engine*1e3:.1f} ms, waiting on the player {think:.1f} s")
+        return out
+
+    def to_dict(self):
+        return {name: {'calls':count, 'total_s':total, 'max_s':mx,
+                       'hist_us':{str(1 << b): n for b, n in sorted(hist.items())}}
+                for name, (count, total, mx, hist) in self.stats.items()}
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+def profile_game(namespace, profiler=None):
+    # Instrument a betav module's globals and the engine classes
+    profiler = profiler or Profiler()
+    profiler.instrument(namespace, PHASES)
+    for cls, names in ENGINE_PHASES.items():
+        profiler.instrument(cls, names)
+    return profiler
+
+class ProfiledScreen:
+    # stdscr with its blocking reads timed as INPUT; everything else passes
+    # straight through
+    def __init__(self, scr, profiler):
+        self._scr = scr
+        self.getkey = profiler.wrap(INPUT, scr.getkey)
+        self.getstr = profiler.wrap(INPUT, scr.getstr)
+
+    def __getattr__(self, name):
+        return getattr(self._scr, name)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - HUD renderer ===
+# draw_screen used to clear() and repaint the whole terminal every loop.
+# The HUD is now split into panels; each panel is a list of (y, x, text)
+# lines, and the renderer keeps the lines it last drew per panel. Only
+# panels whose lines changed are rewritten, and the frame is flushed once
+# with noutrefresh()/doupdate(), so pressing [N]ext over SSH repaints the
+# header and not the screen.
+import curses
+from matrix_engine import CYCLES, WEAPONS, PERK_INFO
+
+PANELS = ('header', 'warez', 'health', 'perks', 'market', 'weapons', 'footer')
+FOOTER = '[D]ownload [U]pload [B]ulk [W]eapons [E]quip [J]ack [N]ext [A]dvisor [Q]uit'
+
+# === Panel Layout ===
+def market_lines(prices, trend, x, width):
+    # Price per ware; with a trend ({ware: (min, mean, max)} from
+    # PriceHistory.stats) also how far it sits from the recent average, and
+    # the recent range when the column is wide enough
+    if not trend:
+        return [(i, x+4, f"{k:<12}{pr}cr") for i, (k, pr) in enumerate(prices.items(), start=3)]
+    lines = []
+    for i, (k, pr) in enumerate(prices.items(), start=3):
+        text = f"{k:<10}{pr:>6}cr"
+        if k in trend:
+            lo, mean, hi = trend[k]
+            text += f" {round(100 * (pr - mean) / mean):+4d}%" if mean else ''
+            span = f" {lo}-{hi}"
+            if len(text) + len(span) + 2 < width:
+                text += span
+        lines.append((i, x+2, text))
+    return lines
+
+def hud_panels(state, prices, h, w, note='', trend=None):
+    hy = 4 + len(state['inventory'])
+    py = hy + 4
+    mx, wx = w//3, 2*w//3
+    hdr = f" The MATRIX 1984 | Cyc {state['cycle']:.1f}/{CYCLES} | Life {state['life']}% | Armor {state['armor']}% | {state['location']} "
+    return {
+        'header': [(0, 0, hdr.ljust(w))],
+        'warez': [(2, 2, 'WAREZ')] +
+                 [(i, 4, f"{k:<12} x{v}") for i, (k, v) in enumerate(state['inventory'].items(), start=3)],
+        'health': [(hy, 2, 'HEALTH / ARMOR'),
+                   (hy+1, 4, f"HPacks: {state['useables']['Health Pack']}"),
+                   (hy+2, 4, f"AKits:  {state['useables']['Armor Kit']}")],
+        'perks': [(py, 2, 'PERKS')] +
+                 [(i, 4, f"{pk}: {PERK_INFO[pk]}") for i, pk in enumerate(state['perks'], start=py+1)] +
+                 [(py+len(state['perks'])+2, 2, f"Minds Freed: {state['people_freed']}")],
+        'market': [(2, mx, 'BLACK MARKET' + ('  vs avg' if trend else ''))] + market_lines(prices, trend, mx, wx - mx),
+        'weapons': [(2, wx, 'WEAPONS')] +
+                   [(i, wx+2, f"{wp:<12} x{cnt} Ammo:{state['ammo'][WEAPONS[wp]['ammo']]}")
+                    for i, (wp, cnt) in enumerate(state['weapons'].items(), start=3)],
+        'footer': [(h-2, 2, FOOTER), (h-1, 2, f"Credits:{state['credits']} cr" + (f"   {note}" if note else ''))],
+    }
+
+# === Renderer ===
+class HudRenderer:
+    def __init__(self, stdscr, update=None):
+        # update flushes the frame; curses.doupdate unless the screen isn't curses
+        self.scr = stdscr
+        self.update = update or curses.doupdate
+        self.drawn = {}
+        self.size = None
+
+    def invalidate(self):
+        # Another screen drew over the HUD; repaint every panel next frame
+        self.drawn = {}
+        self.size = None
+
+    def draw(self, state, prices, note='', trend=None):
+        # note is an optional status shown after the credits, trend the
+        # location's price history stats for the market panel
+        scr = self.scr
+        h, w = scr.getmaxyx()
+        if (h, w) != self.size:
+            scr.erase()
+            self.drawn = {}
+            self.size = (h, w)
+        for name, lines in hud_panels(state, prices, h, w, note, trend).items():
+            old = self.drawn.get(name)
+            if old == lines:
+                continue
+            if old:
+                # Blank what this panel drew last time, then write the new lines
+                keep = set(lines)
+                for y, x, text in old:
+                    if (y, x, text) not in keep:
+                        scr.addstr(y, x, ' ' * len(text))
+            for y, x, text in lines:
+                scr.addstr(y, x, text)
+            self.drawn[name] = lines
+        scr.noutrefresh()
+        self.update()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - replay a recorded run ===
+# Plays a replay file (see Engine.record) headlessly at full speed and checks
+# that it ends on exactly the state the original run ended on.
+import argparse
+import json
+import time
+from matrix_engine import replay, state_digest
+
+if __name__=='__main__':
+    ap = argparse.ArgumentParser(description='Replay a recorded MATRIX 1984 run')
+    ap.add_argument('file', nargs='?', default='matrix_1984_replay.json')
+    args = ap.parse_args()
+    with open(args.file) as f:
+        rec = json.load(f)
+    t = time.perf_counter()
+    eng = replay(rec)
+    dt = time.perf_counter() - t
+    s = eng.state
+    print(f"seed {rec['seed']} run {rec['run']}: {len(rec['actions'])} actions in {dt*1000:.1f}ms")
+    print(f"Credits:{s['credits']} Life:{s['life']}% Armor:{s['armor']}% Freed:{s['people_freed']} Cycle:{s['cycle']:.2f}")
+    if state_digest(s) == rec['digest']:
+        print('Replay matches the recorded run.')
+    else:
+        print('Replay DIVERGED from the recorded run.')
+        raise SystemExit(1)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - binary save format ===
+# Saves used to be the state dict dumped as JSON with no version, so an old
+# file loaded "fine" and then failed on the first missing key. A save is now
+#
+#   magic 'MX84' | u8 format version | fixed struct | names | counts | ids | crc32
+#
+# and load() brings anything older up to date: earlier binary versions via
+# MIGRATIONS, and the JSON saves of every betav release through the legacy
+# steps below. v0.1 and v0.2 never saved; v0.3-v0.5 wrote
+# matrix_wars_save.json with Health Packs and Armor Kits inside 'ammo';
+# v0.6-v0.11 split those into 'useables' but still used the short node
+# names; v0.12-v0.14 match the current layout.
+#
+# Run it as a script to convert existing JSON saves or to time both formats.
+import argparse
+import json
+import os
+import struct
+import time
+import zlib
+from matrix_engine import CATALOG, NODES, WAREZ, WEAPONS, AMMO_PRICES, USEABLES, PERK_INFO, new_state
+from matrix_saver import write_atomic
+
+MAGIC   = b'MX84'
+VERSION = 3
+SAVEFILE = 'matrix_1984_save.bin'
+LEGACY_SAVEFILES = ('matrix_1984_save.json', 'matrix_wars_save.json')
+
+class SaveError(ValueError):
+    pass
+
+NODE_INDEX = {n: i for i, n in enumerate(NODES)}
+PERK_INDEX = {p: i for i, p in enumerate(PERK_INFO)}
+GUN_INDEX  = {g: i for i, g in enumerate(WEAPONS)}
+NODE_LIST, PERK_LIST, GUN_LIST = list(NODE_INDEX), list(PERK_INDEX), list(GUN_INDEX)
+WARE_LIST, AMMO_LIST, USE_LIST = list(WAREZ), list(AMMO_PRICES), list(USEABLES)
+
+BIG    = 1
+CRC    = struct.Struct('<I')
+INT64  = (-2**63, 2**63 - 1)
+
+def _pack_int(n):
+    raw = n.to_bytes((n.bit_length() + 8) // 8, 'big', signed=True)
+    return bytes((len(raw),)) + raw
+
+def _unpack_int(data, at):
+    size = data[at]
+    return int.from_bytes(data[at + 1:at + 1 + size], 'big', signed=True), at + 1 + size
+
+# === Version 3 ===
+# Counts go by name: the save carries the names of every table it was
+# written with, so content can be added, removed or reordered under it. A
+# save from another catalog is read with its own names and fitted to this
+# one like a legacy save (new items start out fresh, items that are gone
+# are dropped).
+#
+# One struct holds the fixed fields, the size of each name table and the
+# length of the names ('\n'-separated); then come the names, one count per
+# ware, gun, ammo and useable, and the order the weapons were picked up in
+# and the perks as u16 ids into the save's own tables. Credits and
+# profit_start are Python ints with no upper bound: past int64 the BIG flag
+# is set and both follow the ids as length-prefixed bytes.
+NAME_LISTS = (NODE_LIST, WARE_LIST, GUN_LIST, AMMO_LIST, USE_LIST, PERK_LIST)
+NAME_SIZES = tuple(len(t) for t in NAME_LISTS)
+NAME_TEXT  = '\n'.join(n for t in NAME_LISTS for n in t).encode()
+FIXED  = struct.Struct(f'<4sBBqqhhdqqHHH{len(NAME_LISTS)}HI')
+COUNTS = struct.Struct(f'<{sum(NAME_SIZES[1:5])}q')
+IDS    = '<{}H'
+
+def encode(state):
+    inv, guns, ammo, use = state['inventory'], state['weapons'], state['ammo'], state['useables']
+    credits, profit = state['credits'], state['profit_start']
+    big = not (INT64[0] <= credits <= INT64[1] and INT64[0] <= profit <= INT64[1])
+    order = [GUN_INDEX[g] for g in guns]
+    perks = [PERK_INDEX[p] for p in state['perks']]
+    body = FIXED.pack(MAGIC, VERSION, BIG if big else 0,
+                      0 if big else credits, 0 if big else profit,
+                      state['life'], state['armor'], state['cycle'], state['escapes'],
+                      state['people_freed'], NODE_INDEX[state['location']], len(order), len(perks),
+                      *NAME_SIZES, len(NAME_TEXT))
+    body += NAME_TEXT
+    body += COUNTS.pack(*[inv.get(k, 0) for k in WARE_LIST], *[guns.get(k, 0) for k in GUN_LIST],
+                        *[ammo.get(k, 0) for k in AMMO_LIST], *[use.get(k, 0) for k in USE_LIST])
+    body += struct.pack(IDS.format(len(order) + len(perks)), *order, *perks)
+    if big:
+        body += _pack_int(credits) + _pack_int(profit)
+    return body + CRC.pack(zlib.crc32(body))
+
+def _tail(data, at, ids, nguns, nperks, flags, credits, profit):
+    # The weapon order and perk ids at `at`, then the big credits if the
+    # flag says so; nothing may follow them but the checksum
+    fmt = ids.format(nguns + nperks)
+    tail = struct.unpack_from(fmt, data, at)
+    at += struct.calcsize(fmt)
+    if flags & BIG:
+        credits, at = _unpack_int(data, at)
+        profit, at = _unpack_int(data, at)
+    if at != len(data) - CRC.size:
+        raise SaveError('save file has trailing bytes')
+    return tail[:nguns], tail[nguns:], credits, profit
+
+def _state(lists, counts, order, perks, credits, profit, life, armor, cycle, escapes, freed, loc):
+    # The state dict a save holds, by the names of the tables it was
+    # written with: (nodes, warez, guns, ammo, useables, perks)
+    nodes, wares, guns, ammos, uses, perk_names = lists
+    c = iter(counts)
+    inv = dict(zip(wares, c))
+    held = dict(zip(guns, c))
+    return {'credits':credits, 'life':life, 'armor':armor, 'inventory':inv,
+            'weapons':{guns[g]: held[guns[g]] for g in order},
+            'ammo':dict(zip(ammos, c)), 'useables':dict(zip(uses, c)),
+            'location':nodes[loc], 'cycle':cycle, 'escapes':escapes, 'profit_start':profit,
+            'people_freed':freed, 'perks':[perk_names[p] for p in perks]}
+
+def _decode_v3(data):
+    (_, _, flags, credits, profit, life, armor, cycle, escapes, freed, loc, nguns, nperks,
+     *sizes) = FIXED.unpack_from(data)
+    size = sizes.pop()
+    at = FIXED.size
+    text = data[at:at + size]
+    if text == NAME_TEXT and tuple(sizes) == NAME_SIZES:
+        lists = NAME_LISTS
+    else:
+        names = text.decode().split('\n')
+        if len(names) != sum(sizes):
+            raise SaveError('save file is corrupted (bad name table)')
+        lists = []
+        for n in sizes:
+            lists.append(names[:n])
+            names = names[n:]
+    at += size
+    counts = struct.unpack_from(f'<{sum(sizes[1:5])}q', data, at)
+    at += 8 * len(counts)
+    order, perks, credits, profit = _tail(data, at, IDS, nguns, nperks, flags, credits, profit)
+    state = _state(lists, counts, order, perks, credits, profit, life, armor, cycle, escapes,
+                   freed, loc)
+    return state if lists is NAME_LISTS else _fill_defaults(state)
+
+# === Versions 1 and 2 ===
+# Both stored counts by position in one fixed struct, with the weapon order
+# and perks as ids after it. v1 was written before the catalog, always with
+# the tables as they were then, so its layout is frozen here. v2 carried the
+# catalog's layout hash instead of names; it can only be read while the
+# catalog still has that layout.
+V1_TABLES = (('The Train Station', 'The Construct', 'Simulatte', 'The Oracles Apartement',
+              'The Merovingians Chateau'),
+             ('RootKit', 'BlackICE', 'Datashard', 'Trojan', 'Worm'),
+             ('Beretta 92FS', 'MP5K SMG', 'M4 Carbine'),
+             ('Beretta Ammo', 'MP5K Ammo', 'M4 Ammo'),
+             ('Health Pack', 'Armor Kit'),
+             ('Heavily Armed', 'Edge Runner', 'Data Broker', 'Elite Operator'))
+FIXED_V1 = struct.Struct(f'<4sBBqqhhdqqBBB{sum(len(t) for t in V1_TABLES[1:5])}q')
+FIXED_V2 = struct.Struct(f'<4sBB32sqqhhdqqHHH{COUNTS.size // 8}q')
+
+def _decode_fixed(data, fixed, lists, ids):
+    n = sum(len(t) for t in lists[1:5])
+    f = fixed.unpack_from(data)
+    credits, profit, life, armor, cycle, escapes, freed, loc, nguns, nperks = f[-n - 10:-n]
+    order, perks, credits, profit = _tail(data, fixed.size, ids, nguns, nperks, f[2], credits, profit)
+    return _state(lists, f[-n:], order, perks, credits, profit, life, armor, cycle, escapes,
+                  freed, loc)
+
+def _decode_v1(data):
+    return _decode_fixed(data, FIXED_V1, V1_TABLES, '<{}B')
+
+def _decode_v2(data):
+    if FIXED_V2.unpack_from(data)[3] != CATALOG.layout:
+        raise SaveError('save was made with a different content catalog')
+    return _decode_fixed(data, FIXED_V2, NAME_LISTS, IDS)
+
+DECODERS = {1: _decode_v1, 2: _decode_v2, 3: _decode_v3}
+# Old format version -> function that turns its decoded dict into the next
+# version's
+MIGRATIONS = {1: lambda d: _fill_defaults(d), 2: lambda d: d}
+
+def decode(data):
+    if len(data) < 5 + CRC.size or data[:4] != MAGIC:
+        raise SaveError('not a MATRIX 1984 save')
+    body, (crc,) = data[:-CRC.size], CRC.unpack_from(data, len(data) - CRC.size)
+    if zlib.crc32(body) != crc:
+        raise SaveError('save file is corrupted (checksum mismatch)')
+    version = data[4]
+    if version not in DECODERS:
+        raise SaveError(f'save format v{version} is newer than this game (v{VERSION})')
+    try:
+        state = DECODERS[version](data)
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise SaveError(f'save file is corrupted ({e})') from None
+    while version < VERSION:
+        state = MIGRATIONS[version](state)
+        version += 1
+    return state
+
+# === Legacy JSON Saves ===
+OLD_NODES = {'Trainstation':'The Train Station', 'Construct':'The Construct',
+             'Nebuchadnezzar':'Simulatte', 'Oracle':'The Oracles Apartement',
+             'Chateau':'The Merovingians Chateau'}
+
+def _split_useables(d):
+    # v0.3-v0.5 kept Health Packs and Armor Kits in 'ammo'
+    if 'useables' not in d:
+        ammo = d.get('ammo', {})
+        d['useables'] = {u: ammo.pop(u, 0) for u in USEABLES}
+
+def _rename_nodes(d):
+    # v0.3-v0.11 node names
+    d['location'] = OLD_NODES.get(d.get('location'), d.get('location'))
+
+def _fill_defaults(d):
+    # Keys and table entries an older release didn't have start out fresh
+    fresh = new_state()
+    for k, v in fresh.items():
+        if k not in d:
+            d[k] = v
+        elif isinstance(v, dict) and k != 'weapons':
+            d[k] = {**v, **{n: c for n, c in d[k].items() if n in v}}
+    d['weapons'] = {g: n for g, n in d['weapons'].items() if g in WEAPONS}
+    d['perks'] = [p for p in d['perks'] if p in PERK_INFO]
+    if d['location'] not in NODES:
+        d['location'] = fresh['location']
+    return d
+
+LEGACY_STEPS = (_split_useables, _rename_nodes)
+
+def migrate_json(d):
+    if not isinstance(d, dict):
+        raise SaveError('save file is not a state object')
+    d = json.loads(json.dumps(d))
+    for step in LEGACY_STEPS:
+        step(d)
+    return _fill_defaults(d)
+
+# === Files ===
+def load(path):
+    # Current state dict from a binary save or any legacy JSON save
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] == MAGIC:
+        return decode(data)
+    try:
+        return migrate_json(json.loads(data))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise SaveError(f'save file is corrupted ({e})') from None
+
+def save(path, state):
+    write_atomic(path, encode(state))
+
+def find_save(folder='.'):
+    # The save to load: the binary one, else a legacy JSON one, newest layout first
+    for name in (SAVEFILE,) + LEGACY_SAVEFILES:
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+def convert(src, dst=None):
+    dst = dst or os.path.join(os.path.dirname(src), SAVEFILE)
+    save(dst, load(src))
+    return dst
+
+def bench(state, rounds=20000):
+    # Seconds per save and per load for JSON and for the binary format
+    text, data = json.dumps(state), encode(state)
+    out = {}
+    for name, enc, dec, blob in (('json', json.dumps, json.loads, text), ('binary', encode, decode, data)):
+        t = time.perf_counter()
+        for _ in range(rounds): enc(state)
+        t2 = time.perf_counter()
+        for _ in range(rounds): dec(blob)
+        out[name] = ((t2 - t) / rounds, (time.perf_counter() - t2) / rounds, len(blob))
+    return out
+
+if __name__=='__main__':
+    ap = argparse.ArgumentParser(description='Convert MATRIX 1984 JSON saves to the binary format')
+    ap.add_argument('saves', nargs='*', help='JSON saves to convert (default: any found here)')
+    ap.add_argument('-o', '--output', help='output file (single input only)')
+    ap.add_argument('--bench', action='store_true', help='time JSON against the binary format')
+    args = ap.parse_args()
+    if args.bench:
+        state = new_state()
+        state.update(credits=123456789, perks=['Edge Runner'], weapons={'M4 Carbine':1})
+        for name, (enc, dec, size) in bench(state).items():
+            print(f"{name:<7} save {enc*1e6:6.2f} us  load {dec*1e6:6.2f} us  {size} bytes")
+    else:
+        srcs = args.saves or [p for p in LEGACY_SAVEFILES if os.path.exists(p)]
+        if not srcs:
+            ap.error('no JSON saves found')
+        for src in srcs:
+            try:
+                print(f"{src} -> {convert(src, args.output)}")
+            except (OSError, SaveError) as e:
+                print(f"{src}: {e}")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - write-behind saves ===
+# save() snapshots the state and returns straight away; a background thread
+# writes the newest snapshot at most once per `interval` seconds, so a run
+# of keypresses costs one disk write. Every write goes to a temp file in the
+# same directory, is fsynced and then renamed over the save, so a crash
+# leaves either the old save or the new one, never half of each.
+import atexit
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+SAVE_INTERVAL = 1.0
+
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+def write_atomic(path, data):
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', dir=folder)
+    try:
+        with os.fdopen(fd, 'wb' if isinstance(data, bytes) else 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp files are private; keep the mode a plain open() would give
+        mode = os.stat(path).st_mode if os.path.exists(path) else 0o666 & ~_umask()
+        os.chmod(tmp, mode & 0o777)
+        os.replace(tmp, path)
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+
+class SaveWriter:
+    # write(data) replaces the atomic file write, e.g. to save into a database
+    def __init__(self, path, interval=SAVE_INTERVAL, encode=json.dumps, write=None):
+        self.path = path
+        self.interval = interval
+        self.encode = encode
+        self.write = write or (lambda data: write_atomic(self.path, data))
+        self.error = None
+        self._pending = None
+        self._closed = False
+        self._thread = None
+        self._cond = threading.Condition()
+        self._io = threading.Lock()
+        atexit.register(self.close)
+
+    def save(self, state):
+        # Snapshot now, on the caller's thread, so later mutations can't race the writer
+        data = self.encode(state)
+        with self._cond:
+            idle = self._pending is None
+            self._pending = data
+            closed = self._closed
+            if not closed and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='matrix-saver', daemon=True)
+                self._thread.start()
+            elif not closed and idle:
+                self._cond.notify()
+        if closed:
+            # After close() there is no writer thread left; save synchronously
+            self._write_pending()
+
+    def flush(self):
+        # Write whatever is pending right now (game over, quit, before a load)
+        self._write_pending()
+        if self.error is not None:
+            err, self.error = self.error, None
+            raise err
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._write_pending()
+
+    def _write_pending(self):
+        # Holding _io while taking the snapshot keeps writes in save order
+        with self._io:
+            with self._cond:
+                data, self._pending = self._pending, None
+            if data is None:
+                return
+            try:
+                self.write(data)
+            except (OSError, sqlite3.Error) as e:
+                self.error = e
+                with self._cond:
+                    if self._pending is None:
+                        self._pending = data
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # Let more saves pile up; only the newest one is written
+                self._cond.wait(self.interval)
+            self._write_pending()
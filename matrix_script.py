@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - command scripts and macros ===
+# Plays typed commands straight into an Engine, the same actions the
+# curses_sim keys dispatch to but with no screens in between, so a scripted
+# run or a regression scenario goes at engine speed. One command per line
+# or separated by ';', '#' starts a comment:
+#
+#   N  J  Q                   next cycle, jack in, quit
+#   D <ware> [qty|max]        download (default max)
+#   U <ware> [qty|all]        upload (default all)
+#   B <basket>                bulk order, e.g. B U4, D5 max
+#   W <item>   E <useable>    armory purchase, equip
+#   R   F <weapon>   G <n>    run / fire in a battle, guess for a civilian
+#   set battle <policy>       how battles the script doesn't fight are resolved
+#   set guess <n>             the guess for civilians it doesn't answer
+#   macro <name> = <commands> define a macro; then use it by name
+#   <command> * <n>           repeat a command or macro n times
+#
+# Items go by their menu number or by the start of their name. A battle or
+# civilian still pending when the next main-menu command comes up is settled
+# with the battle policy (matrix_autobattle) or the default guess; R, F and
+# G outside their screens are skipped.
+import argparse
+import re
+import time
+from matrix_engine import WAREZ, USEABLES, Engine, armory_items, parse_basket, state_digest
+from matrix_autobattle import DEFAULT_POLICY, POLICIES, resolve
+
+MACROFILE = 'matrix_1984_macros.txt'
+MAX_REPEAT = 100000
+MAX_COMMANDS = 1000000      # commands a script may expand to, repeats and macros included
+TURN_KEYS = {'N':('next',), 'J':('jack',), 'Q':('quit',)}
+KEYWORDS  = set(TURN_KEYS) | set('DUBWERFG') | {'SET', 'MACRO'}
+
+class ScriptError(ValueError):
+    pass
+
+def _pick(arg, names, what):
+    # An item by 1-based menu number or unique name prefix
+    arg = arg.strip()
+    if arg.isdigit():
+        i = int(arg) - 1
+        if 0 <= i < len(names):
+            return names[i]
+        raise ScriptError(f"no {what} #{arg}")
+    hits = [n for n in names if n.lower().startswith(arg.lower())]
+    if len(hits) != 1:
+        raise ScriptError(f"{'unknown' if not hits else 'ambiguous'} {what} {arg!r}")
+    return hits[0]
+
+def _trade(kind, arg):
+    m = re.fullmatch(r'(.+?)(?:\s+(\d+|max|all))?', arg.strip(), re.I)
+    if m is None or not arg.strip():
+        raise ScriptError(f"{kind} needs a ware")
+    ware = _pick(m[1], list(WAREZ), 'ware')
+    qty = (m[2] or ('max' if kind == 'download' else 'all')).lower()
+    if qty.isdigit():
+        return (kind, ware, int(qty))
+    # max/all are worked out at the current prices, as a one-order basket
+    return ('basket', [(kind, ware, qty)])
+
+def parse_command(cmd):
+    # One command (no macros or repeats) -> an engine action, a battle or
+    # civilian action, or a ('set', key, value) directive
+    head, _, arg = cmd.strip().partition(' ')
+    key = head.upper()
+    if key in TURN_KEYS and not arg.strip():
+        return TURN_KEYS[key]
+    if key == 'D': return _trade('download', arg)
+    if key == 'U': return _trade('upload', arg)
+    if key == 'B':
+        orders = parse_basket(arg)
+        if orders is None:
+            raise ScriptError(f"can't read basket {arg!r}")
+        return ('basket', orders)
+    if key == 'W': return ('buy', _pick(arg, armory_items(), 'armory item'))
+    if key == 'E': return ('equip', _pick(arg, list(USEABLES), 'useable'))
+    if key == 'R' and not arg.strip(): return ('run',)
+    if key == 'F': return ('attack', arg.strip())
+    if key == 'G': return ('guess', arg.strip())
+    if key == 'SET':
+        name, _, value = arg.strip().partition(' ')
+        if name == 'battle' and value in POLICIES: return ('set', 'battle', value)
+        if name == 'guess' and value.strip().isdigit(): return ('set', 'guess', int(value))
+        raise ScriptError(f"bad setting {arg.strip()!r}")
+    raise ScriptError(f"unknown command {cmd.strip()!r}")
+
+def compile_script(text, macros=None):
+    # Script text -> flat list of commands; macro definitions land in
+    # `macros` (a dict, so they can be kept between calls)
+    macros = {} if macros is None else macros
+    out = []
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        try:
+            if line.lower().startswith('macro '):
+                name, eq, body = line[6:].partition('=')
+                name = name.strip().lower()
+                if not eq or not re.fullmatch(r'[a-z_]\w*', name) or name.upper() in KEYWORDS:
+                    raise ScriptError(f"bad macro definition {line!r}")
+                macros[name] = None   # no recursion
+                macros[name] = _expand(body, macros)
+                continue
+            body = _expand(line, macros)
+            _check_size(len(out) + len(body))
+            out += body
+        except ScriptError as e:
+            raise ScriptError(f"line {lineno}: {e}") from None
+    return out
+
+def _expand(text, macros):
+    out = []
+    for cmd in text.split(';'):
+        cmd = cmd.strip()
+        if not cmd:
+            continue
+        m = re.fullmatch(r'(.+?)\s*\*\s*(\d+)', cmd)
+        times = 1
+        if m:
+            cmd, times = m[1], int(m[2])
+            if times > MAX_REPEAT:
+                raise ScriptError(f"repeat count {times} is over {MAX_REPEAT}")
+        if cmd.lower() in macros:
+            body = macros[cmd.lower()]
+            if body is None:
+                raise ScriptError(f"macro {cmd!r} uses itself")
+        else:
+            body = [parse_command(cmd)]
+        _check_size(len(out) + len(body) * times)
+        out += body * times
+    return out
+
+def _check_size(n):
+    # Checked before a repeat is built, so nested macros can't blow up
+    if n > MAX_COMMANDS:
+        raise ScriptError(f"script expands to over {MAX_COMMANDS} commands")
+
+def load_macros(path=MACROFILE):
+    # Macros from a file of 'macro name = ...' lines; {} if there is none
+    macros = {}
+    try:
+        with open(path) as f:
+            compile_script(f.read(), macros)
+    except FileNotFoundError:
+        pass
+    return macros
+
+# === Runner ===
+class Runner:
+    def __init__(self, engine, battle=DEFAULT_POLICY, guess=5):
+        self.engine = engine
+        self.battle = battle
+        self.guess = guess
+        self.stats = {'commands':0, 'steps':0, 'skipped':0, 'battles':0}
+
+    def settle(self):
+        # Clear a pending battle or civilian the script didn't handle
+        eng = self.engine
+        while eng.phase in ('battle', 'civilian'):
+            if eng.phase == 'battle':
+                self.stats['steps'] += resolve(eng, self.battle)['actions']
+                self.stats['battles'] += 1
+            else:
+                eng.step(('guess', self.guess))
+                self.stats['steps'] += 1
+
+    def run(self, commands):
+        # Play commands until they run out or the game ends; returns the
+        # events of the engine steps taken
+        eng, st = self.engine, self.stats
+        events = []
+        for cmd in commands:
+            if eng.phase == 'over':
+                break
+            st['commands'] += 1
+            kind = cmd[0]
+            if kind == 'set':
+                setattr(self, cmd[1], cmd[2])
+                continue
+            if kind in ('run', 'attack'):
+                if eng.phase != 'battle':
+                    st['skipped'] += 1
+                    continue
+            elif kind == 'guess':
+                if eng.phase != 'civilian':
+                    st['skipped'] += 1
+                    continue
+            else:
+                self.settle()
+                if eng.phase == 'over':
+                    break
+            if kind == 'attack':
+                cmd = ('attack', _pick(cmd[1], eng.battle_options(), 'weapon'))
+            events += eng.step(cmd)
+            st['steps'] += 1
+        return events
+
+def run_script(engine, text, macros=None, battle=DEFAULT_POLICY, guess=5):
+    runner = Runner(engine, battle, guess)
+    runner.run(compile_script(text, macros))
+    return runner
+
+def summary(runner):
+    s, st = runner.engine.state, runner.stats
+    skipped = f", {st['skipped']} skipped" if st['skipped'] else ''
+    return (f"{st['commands']} commands, {st['steps']} steps, {st['battles']} battles settled{skipped}"
+            f" | Cycle {s['cycle']:.2f} Credits {s['credits']} Life {s['life']}% Freed {s['people_freed']}")
+
+if __name__=='__main__':
+    ap = argparse.ArgumentParser(description='Run a MATRIX 1984 command script headlessly')
+    ap.add_argument('script')
+    ap.add_argument('--seed', default='0', help='engine seed, for a reproducible run')
+    ap.add_argument('--macros', default=MACROFILE, help='macro file to load first')
+    args = ap.parse_args()
+    with open(args.script) as f:
+        text = f.read()
+    eng = Engine(seed=args.seed)
+    eng.start()
+    t = time.perf_counter()
+    try:
+        runner = run_script(eng, text, load_macros(args.macros))
+    except ScriptError as e:
+        ap.exit(1, f"{args.script}: {e}\n")
+    dt = time.perf_counter() - t
+    print(summary(runner))
+    print(f"{runner.stats['steps'] / dt:,.0f} steps/s, state {state_digest(eng.state)[:16]}")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# === The MATRIX 1984 - SQLite save slots and leaderboards ===
+# One database file holds any number of named save slots (each a binary
+# save from matrix_savefile) and a row per finished run. The runs table is
+# indexed on credits and on minds freed, so a top-N leaderboard is an index
+# walk of N rows however many runs have been recorded.
+#
+# One connection is shared behind a lock, so the write-behind saver's thread
+# and the game loop can both use the store.
+import argparse
+import random
+import sqlite3
+import threading
+import time
+from matrix_engine import CYCLES, PERK_INFO
+from matrix_savefile import SaveError, encode, decode, load
+
+DBFILE = 'matrix_1984.db'
+DEFAULT_SLOT = 'default'
+INT64_MAX = 2**63 - 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    name    TEXT PRIMARY KEY,
+    data    BLOB NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id           INTEGER PRIMARY KEY,
+    slot         TEXT,
+    finished     REAL NOT NULL,
+    credits      INTEGER NOT NULL,
+    people_freed INTEGER NOT NULL,
+    perks        TEXT NOT NULL,
+    cycles       REAL NOT NULL,
+    life         INTEGER NOT NULL,
+    escapes      INTEGER NOT NULL,
+    seed         TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_by_credits ON runs (credits DESC);
+CREATE INDEX IF NOT EXISTS runs_by_freed   ON runs (people_freed DESC, credits DESC);
+"""
+BOARDS = {'credits':'credits DESC', 'people_freed':'people_freed DESC, credits DESC'}
+RUN_COLUMNS = ('id', 'slot', 'finished', 'credits', 'people_freed', 'perks', 'cycles',
+               'life', 'escapes', 'seed')
+
+def _score(credits):
+    # SQLite integers stop at int64; bigger fortunes are stored as REAL,
+    # which still sorts correctly against the integers
+    return credits if credits <= INT64_MAX else float(credits)
+
+class SaveStore:
+    def __init__(self, path=DBFILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self.lock:
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('PRAGMA synchronous=NORMAL')
+            self.db.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    # --- slots ---
+    def put_slot(self, name, data):
+        # data is an encoded save; see save_slot for a state
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO slots VALUES (?, ?, ?)', (name, data, time.time()))
+
+    def save_slot(self, name, state):
+        self.put_slot(name, encode(state))
+
+    def load_slot(self, name):
+        # The slot's state dict, or None for an empty slot
+        with self.lock:
+            row = self.db.execute('SELECT data FROM slots WHERE name = ?', (name,)).fetchone()
+        return decode(row[0]) if row else None
+
+    def backup_slot(self, name):
+        # Copy a slot's bytes as they are to a new slot, e.g. before a save
+        # that won't decode gets replaced; returns the copy's name
+        backup = f"{name}.bak-{time.strftime('%Y%m%d-%H%M%S')}"
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO slots SELECT ?, data, updated FROM slots WHERE name = ?',
+                            (backup, name))
+        return backup
+
+    def slots(self):
+        # [(name, last saved)] most recent first
+        with self.lock:
+            return self.db.execute('SELECT name, updated FROM slots ORDER BY updated DESC').fetchall()
+
+    def delete_slot(self, name):
+        with self.lock:
+            self.db.execute('DELETE FROM slots WHERE name = ?', (name,))
+
+    def import_save(self, name, path):
+        # Copy a save file (binary or any legacy JSON layout) into a slot
+        self.save_slot(name, load(path))
+
+    # --- runs ---
+    def record_run(self, state, slot=None, seed=None):
+        row = (slot, time.time(), _score(state['credits']), state['people_freed'],
+               ','.join(state['perks']), min(state['cycle'], CYCLES), state['life'],
+               state['escapes'], None if seed is None else str(seed))
+        with self.lock:
+            return self.db.execute('INSERT INTO runs (slot, finished, credits, people_freed, perks, '
+                                   'cycles, life, escapes, seed) VALUES (?,?,?,?,?,?,?,?,?)', row).lastrowid
+
+    def leaderboard(self, by='credits', n=10):
+        if by not in BOARDS:
+            raise ValueError(f"no leaderboard for {by!r}")
+        with self.lock:
+            rows = self.db.execute(f'SELECT * FROM runs ORDER BY {BOARDS[by]} LIMIT ?', (n,)).fetchall()
+        return [dict(zip(RUN_COLUMNS, r)) for r in rows]
+
+    def runs(self):
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+
+def board_lines(rows, by='credits'):
+    title = {'credits':'TOP OPERATORS BY CREDITS', 'people_freed':'TOP OPERATORS BY MINDS FREED'}[by]
+    lines = [f"=== {title} ===", f"{'#':>3} {'Credits':>18} {'Freed':>6} {'Cycle':>6}  Slot / Perks"]
+    for i, r in enumerate(rows, start=1):
+        perks = r['perks'].replace(',', ', ') or '-'
+        lines.append(f"{i:>3} {int(r['credits']):>18,} {r['people_freed']:>6} {r['cycles']:>6.2f}  {r['slot'] or '-'} / {perks}")
+    return lines
+
+def fill(store, n, seed=0):
+    # n synthetic finished runs, for sizing the database and timing queries
+    rng = random.Random(seed)
+    perks = list(PERK_INFO)
+    rows = [(f"bot{rng.randrange(1000)}", time.time(), int(2000 * rng.lognormvariate(0, 3)),
+             rng.randrange(30), ','.join(p for p in perks if rng.random() < .3),
+             rng.uniform(1, CYCLES), rng.randrange(101), rng.randrange(20), None) for _ in range(n)]
+    with store.lock:
+        store.db.execute('BEGIN')
+        store.db.executemany('INSERT INTO runs (slot, finished, credits, people_freed, perks, '
+                             'cycles, life, escapes, seed) VALUES (?,?,?,?,?,?,?,?,?)', rows)
+        store.db.execute('COMMIT')
+
+if __name__=='__main__':
+    ap = argparse.ArgumentParser(description='Save slots and leaderboards of The MATRIX 1984')
+    ap.add_argument('--db', default=DBFILE)
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    top = sub.add_parser('top', help='show a leaderboard')
+    top.add_argument('--by', choices=sorted(BOARDS), default='credits')
+    top.add_argument('-n', type=int, default=10)
+    sub.add_parser('slots', help='list save slots')
+    imp = sub.add_parser('import', help='copy a save file into a slot')
+    imp.add_argument('save')
+    imp.add_argument('--slot', default=DEFAULT_SLOT)
+    bench = sub.add_parser('bench', help='add synthetic runs and time the leaderboards')
+    bench.add_argument('-n', type=int, default=1000000)
+    args = ap.parse_args()
+    store = SaveStore(args.db)
+    if args.cmd == 'top':
+        print('\n'.join(board_lines(store.leaderboard(args.by, args.n), args.by)))
+    elif args.cmd == 'slots':
+        for name, updated in store.slots():
+            print(f"{name:<20} {time.strftime('%Y-%m-%d %H:%M', time.localtime(updated))}")
+    elif args.cmd == 'import':
+        try:
+            store.import_save(args.slot, args.save)
+        except (OSError, SaveError) as e:
+            ap.exit(1, f"{args.save}: {e}\n")
+        print(f"{args.save} -> slot {args.slot}")
+    else:
+        t = time.perf_counter()
+        fill(store, args.n)
+        print(f"inserted {args.n:,} runs in {time.perf_counter() - t:.1f} s ({store.runs():,} total)")
+        for by in BOARDS:
+            t = time.perf_counter()
+            store.leaderboard(by, 10)
+            print(f"top 10 by {by}: {(time.perf_counter() - t) * 1e3:.2f} ms")
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+from matrix_battle_odds import battle_odds, solve
+from matrix_engine import new_state
+
+# Values from the full backward solve over every round held
+KNOWN = [
+    ((100, 0, 50, ((0.7, 15, 18),), False, False, 0),
+     {'win':0.99007039, 'death':0.00992961, 'escape':0.0, 'ammo':5.697632428, 'life_lost':47.033285331}),
+    ((100, 100, 100, ((0.6, 25, 30), (0.7, 15, 18), (0.5, 20, 40)), True, True, 25),
+     {'win':0.999959008, 'death':3.778e-06, 'escape':3.7213e-05, 'ammo':6.666589681, 'life_lost':0.297888211}),
+    ((40, 10, 100, ((0.7, 15, 5),), True, False, 0),
+     {'win':0.0, 'death':0.260743339, 'escape':0.739256661, 'ammo':4.964310617, 'life_lost':31.18725311}),
+    ((80, 0, 50, (), False, True, 30),
+     {'win':1.0, 'death':0.0, 'escape':0.0, 'ammo':0.0, 'life_lost':20.0}),
+    ((60, 20, 100, ((0.5, 20, 12),), True, True, 0),
+     {'win':0.600126239, 'death':0.399873761, 'escape':0.0, 'ammo':8.577469923, 'life_lost':46.099876885}),
+]
+
+
+@pytest.mark.parametrize('args, want', KNOWN)
+def test_matches_full_solve(args, want):
+    got = solve(*args)
+    for k, v in want.items():
+        assert got[k] == pytest.approx(v, abs=1e-6)
+
+
+def test_outcomes_sum_to_one():
+    o = solve(70, 30, 100, ((0.6, 25, 7), (0.7, 15, 3)), True, False, 20)
+    assert o['win'] + o['death'] + o['escape'] == pytest.approx(1.0)
+
+
+def test_shot_bigger_than_hp_left():
+    o = solve(30, 0, 10, ((0.6, 25, 3),), False, False, 0)
+    assert o['win'] == pytest.approx(1 - 0.4 ** 3, abs=1e-3)
+
+
+def test_big_ammo_stock_is_cheap():
+    s = new_state()
+    s.update(armor=100, weapons={'Beretta 92FS':1, 'MP5K SMG':1, 'M4 Carbine':1},
+             ammo={'Beretta Ammo':1000, 'MP5K Ammo':1000, 'M4 Ammo':1000}, perks=['Elite Operator'])
+    t = time.perf_counter()
+    o = battle_odds(s, 100, smith=True)
+    assert time.perf_counter() - t < 1.0
+    assert o['win'] > 0.99
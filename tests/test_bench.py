@@ -0,0 +1,23 @@
+import os
+
+import matrix_bench as mb
+from matrix_headless import patched_curses
+
+
+def test_bench_leaves_the_working_directory_alone(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'keep.py').write_text('# not a save')
+    path = [p for p in mb.find_versions() if mb.version_name(p) == 'v0.14'][0]
+    with patched_curses():
+        row = mb.bench_version(path, 1, 60)
+    assert row['turns'] > 0 and row['error'] is None
+    assert os.listdir(tmp_path) == ['keep.py']
+
+
+def test_clear_saves_only_removes_game_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in ('keep.py', 'matrix_1984.db', 'matrix_1984.db-wal', 'matrix_1984_slot.journal',
+                 'matrix_wars_save.json'):
+        (tmp_path / name).write_text('')
+    mb.clear_saves()
+    assert os.listdir(tmp_path) == ['keep.py']
@@ -0,0 +1,57 @@
+import copy
+import json
+
+import pytest
+
+from matrix_catalog import CATALOG_FILE, CatalogError, compile_catalog, load_catalog
+from matrix_engine import CATALOG, NODES, PERK_INFO, WAREZ, WEAPONS
+
+
+@pytest.fixture
+def data():
+    with open(CATALOG_FILE) as f:
+        return json.load(f)
+
+
+def test_engine_tables_come_from_the_catalog():
+    assert list(NODES) == CATALOG.names['nodes']
+    assert WAREZ['Worm'] == (CATALOG.ware_lo[CATALOG.ids['warez']['Worm']],
+                             CATALOG.ware_hi[CATALOG.ids['warez']['Worm']])
+    assert WEAPONS['M4 Carbine']['ammo'] == 'M4 Ammo'
+    assert list(PERK_INFO) == CATALOG.names['perks']
+
+
+@pytest.mark.parametrize('spoil, message', [
+    (lambda d: d['weapons'][0].update(ammo='Nope'), 'unknown ammo'),
+    (lambda d: d['warez'][0].update(lo=0), 'lo <= hi'),
+    (lambda d: d['warez'].append(dict(d['warez'][1])), 'duplicate'),
+    (lambda d: d['useables'].pop(), "'Armor Kit'"),
+    (lambda d: d['nodes'][0].update(mult=True), 'must be float'),
+    (lambda d: d['ammo'][0].update(cost=3), 'unknown field'),
+    (lambda d: d['weapons'][0].update(name='Worm'), "'Worm' is already a name in warez"),
+    (lambda d: d['useables'].append({'name':'M4 Ammo', 'price':9}), 'already a name in ammo'),
+])
+def test_bad_catalogs_are_refused(data, spoil, message):
+    spoil(data)
+    with pytest.raises(CatalogError, match=message):
+        compile_catalog(data)
+
+
+def test_layout_follows_names_not_numbers(data):
+    base = compile_catalog(data).layout
+    priced = copy.deepcopy(data)
+    priced['ammo'][0]['price'] += 1
+    assert compile_catalog(priced).layout == base
+    data['nodes'].reverse()
+    assert compile_catalog(data).layout != base
+
+
+def test_index_is_rebuilt_when_the_source_changes(data, tmp_path):
+    path = tmp_path / 'cat.json'
+    path.write_text(json.dumps(data))
+    assert len(load_catalog(str(path)).names['nodes']) == len(data['nodes'])
+    assert (tmp_path / 'cat.idx').exists()
+    data['nodes'].append({'name':'Zion', 'mult':1.4})
+    path.write_text(json.dumps(data))
+    cat = load_catalog(str(path))
+    assert cat.names['nodes'][-1] == 'Zion' and cat.node_mult[-1] == 1.4
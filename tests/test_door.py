@@ -0,0 +1,48 @@
+import asyncio
+import tracemalloc
+
+from matrix_door import IAC, NAWS, SB, SE, AnsiTerminal
+
+
+class Writer:
+    def write(self, data):
+        pass
+
+    async def drain(self):
+        pass
+
+
+class Reader:
+    # Hands out the client's chunks one read at a time, like a socket
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+
+    async def read(self, n):
+        return next(self.chunks, b'')
+
+
+def read_char(*chunks):
+    # (first character typed, terminal, peak memory) for a client that sent `chunks`
+    async def go():
+        term = AnsiTerminal(Reader(chunks), Writer())
+        tracemalloc.start()
+        try:
+            ch = await term._char()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return ch, term, peak
+    return asyncio.run(go())
+
+
+def test_naws_sets_the_size():
+    ch, term, _ = read_char(bytes([IAC, SB, NAWS, 0, 132, 0, 50, IAC, SE]) + b'x')
+    assert ch == 'x' and term.size == (50, 132)
+
+
+def test_long_subnegotiation_is_not_kept():
+    # A client streaming bytes inside SB mustn't grow server memory
+    junk = (b'z' * 256 for _ in range(2000))
+    ch, term, peak = read_char(bytes([IAC, SB, NAWS, 0, 90, 0, 30]), *junk, bytes([IAC, SE]) + b'k')
+    assert ch == 'k' and term.size == (30, 90)
+    assert peak < 20000
@@ -0,0 +1,110 @@
+import importlib.util
+import os
+
+import pytest
+
+from matrix_engine import Engine, WAREZ, USEABLES
+from matrix_headless import FakeScreen, patched_curses
+
+GAME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    'thematrix1984_betav0.14.py')
+
+
+@pytest.fixture
+def game(tmp_path, monkeypatch):
+    # A fresh v0.14 module on a seeded engine, saving into tmp_path
+    monkeypatch.chdir(tmp_path)
+    spec = importlib.util.spec_from_file_location('betav0_14', GAME)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    assert os.listdir(tmp_path) == []     # importing it wrote nothing
+    mod.engine = Engine(mod.state, seed=7, record=True)
+    mod.open_store()
+    mod.turbo = True
+    mod.state['credits'] = 10**6
+    mod.engine.start()
+    with patched_curses():
+        yield mod
+    mod.flush_save()
+    mod.engine.journal.close()
+    mod.store.close()
+
+
+def play(scr_input, fn, *args):
+    scr = FakeScreen(scr_input)
+    return fn(scr, *args), scr
+
+
+def test_download(game):
+    action, scr = play(['5', '3', 'x'], game.handle_download, game.engine.prices)
+    assert action == ('download', list(WAREZ)[4], 3)
+    assert 'Download complete' in scr
+    game.engine.step(action)
+    assert game.state['inventory'][list(WAREZ)[4]] == 3
+
+
+def test_download_cancelled(game):
+    assert play(['Q'], game.handle_download, game.engine.prices)[0] is None
+    assert play(['9'], game.handle_download, game.engine.prices)[0] is None
+
+
+def test_upload_lists_only_held_warez(game):
+    game.state['inventory']['Trojan'] = 4
+    action, scr = play(['1', '2', 'x'], game.handle_upload, game.engine.prices)
+    assert action == ('upload', 'Trojan', 2)
+    assert '1. Trojan' in scr and 'Worm' not in scr
+
+
+def test_bulk_order(game):
+    game.state['inventory']['Worm'] = 10
+    action, scr = play(['U5 all, D3 2', 'y'], game.handle_bulk, game.engine.prices)
+    assert action[0] == 'basket'
+    assert 'Upload 10 Worm' in scr and 'Download 2 Datashard' in scr
+
+
+def test_bulk_order_refused(game):
+    action, scr = play(['D9 2', 'x'], game.handle_bulk, game.engine.prices)
+    assert action is None and 'Press any key' in scr
+
+
+def test_equip(game):
+    game.state['useables']['Armor Kit'] = 1
+    action, scr = play(['2', 'x'], game.handle_equip)
+    assert action == ('equip', 'Armor Kit') and 'Equipped' in scr
+
+
+def test_equip_nothing_owned(game):
+    game.state['useables'] = dict.fromkeys(USEABLES, 0)
+    assert play(['1'], game.handle_equip)[0] is None
+
+
+def test_run_macro(game):
+    game.macros['trip'] = [('jack',), ('jack',)]
+    _, scr = play(['set battle careful; D Worm 2; trip', 'x'], game.run_macro)
+    assert '4 commands' in scr and 'Cycle' in scr
+    game.flush_save()
+    assert game.store.load_slot(game.slot) == game.state
+
+
+def test_run_macro_bad_weapon_mid_battle(game):
+    # An unknown gun only turns up once the battle has started; the macro
+    # stops with the message instead of crashing the game
+    game.engine._start_battle(False, [])
+    _, scr = play(['F Beretta', 'x'], game.run_macro)
+    assert "unknown weapon 'Beretta'" in scr
+    assert game.engine.phase == 'battle'
+
+
+def test_unreadable_slot_is_kept(game, capsys):
+    # A slot that won't decode is copied aside before the fresh game is
+    # saved over it
+    game.store.put_slot(game.slot, b'MX84 not really a save')
+    game.load_game()
+    game.flush_save()
+    out = capsys.readouterr().out
+    assert "can't be loaded" in out
+    backups = [n for n, _ in game.store.slots() if n.startswith(game.slot + '.bak-')]
+    assert len(backups) == 1 and backups[0] in out
+    assert game.store.db.execute('SELECT data FROM slots WHERE name = ?',
+                                 backups).fetchone()[0] == b'MX84 not really a save'
+    assert game.store.load_slot(game.slot)['credits'] == 2000
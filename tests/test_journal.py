@@ -0,0 +1,76 @@
+import os
+
+from matrix_engine import Engine, state_digest
+from matrix_journal import Journal, archive_path, events, read
+
+
+def play(eng, n):
+    for _ in range(n):
+        if eng.phase == 'over':
+            return
+        if eng.phase == 'battle':
+            eng.step(('run',))
+        elif eng.phase == 'civilian':
+            eng.step(('guess', 5))
+        else:
+            eng.step(('next',))
+
+
+def started(path, seed=11, every=4):
+    eng = Engine(seed=seed)
+    eng.journal = Journal(str(path), every)
+    eng.start()
+    return eng
+
+
+def resumed(path):
+    eng = Engine(seed=0)
+    eng.journal = Journal(str(path))
+    return eng, eng.journal.resume(eng)
+
+
+def test_resume_picks_up_the_last_action(tmp_path):
+    path = tmp_path / 'j.journal'
+    eng = started(path)
+    play(eng, 10)
+    eng.journal.close()
+    again, ok = resumed(path)
+    assert ok and state_digest(again.state) == state_digest(eng.state)
+
+
+def test_finished_runs_leave_the_journal(tmp_path):
+    path = tmp_path / 'j.journal'
+    for seed in (1, 2):
+        eng = started(path, seed)
+        play(eng, 6)
+        eng.journal.end(force=True)
+        eng.journal.close()
+    assert not path.exists()
+    assert resumed(path)[1] is False
+    runs = [r for r in read(archive_path(str(path))) if r['t'] == 'start']
+    assert len(runs) == 2
+    assert {run for run, _, _ in events(str(path))} == {1}
+
+
+def test_new_run_moves_an_abandoned_one_out(tmp_path):
+    path = tmp_path / 'j.journal'
+    play(started(path, 1), 3)
+    eng = started(path, 2)
+    eng.journal.close()
+    assert [r['seed'] for r in read(str(path)) if r['t'] == 'start'] == [2]
+    assert [r['seed'] for r in read(archive_path(str(path))) if r['t'] == 'start'] == [1]
+
+
+def test_damaged_record_stops_resume_and_is_cut_off(tmp_path):
+    path = tmp_path / 'j.journal'
+    eng = started(path, every=1000)
+    play(eng, 8)
+    eng.journal.close()
+    lines = path.read_bytes().splitlines(keepends=True)
+    path.write_bytes(b''.join(lines[:4] + [b'{"t":"act",\n'] + lines[4:]))
+    again, ok = resumed(path)
+    assert ok and again.journal.seq == 3
+    play(again, 1)
+    again.journal.close()
+    recs = list(read(str(path)))
+    assert len(recs) == 5 and recs[-1]['n'] == 4
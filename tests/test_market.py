@@ -0,0 +1,26 @@
+from matrix_engine import Engine, WAREZ
+from matrix_market import NODE_NAMES, history_arrays
+
+
+def test_history_arrays_on_live_engine():
+    eng = Engine(seed=1)
+    eng.start()
+    for _ in range(5):
+        eng.step(('jack',))
+        while eng.phase == 'battle':
+            eng.step(('run',))
+        if eng.phase == 'civilian':
+            eng.step(('guess', 5))
+    cycles, nodes, prices = history_arrays(eng.market)
+    assert len(cycles) == len(nodes) == len(prices) == len(eng.market.sheets)
+    assert prices.shape[1] == len(WAREZ)
+    (node, cycle), sheet = next(iter(eng.market.sheets.items()))
+    assert cycles[0] == cycle and NODE_NAMES[nodes[0]] == node
+    assert prices[0].tolist() == [sheet[w] for w in WAREZ]
+
+
+def test_sheets_feed_the_price_history():
+    eng = Engine(seed=2)
+    eng.start()
+    loc = eng.state['location']
+    assert set(eng.price_history.stats(loc)) == set(WAREZ)
@@ -0,0 +1,24 @@
+import numpy as np
+
+import matrix_montecarlo as mc
+
+
+def test_refused_action_keeps_the_sheet():
+    # A download nobody can afford leaves the clock where it was, so the
+    # next turn shows the same prices; moving on rolls a new sheet
+    seen = []
+    def policy(b, prices, rng):
+        seen.append(prices.copy())
+        act = mc.ACT_DOWNLOAD if len(seen) == 1 else mc.ACT_NEXT
+        return np.full(b.n, act), np.full(b.n, mc.ROOTKIT), np.ones(b.n, dtype=np.int64)
+    mc.simulate(500, policy, battle_policy='run', seed=3)
+    assert (seen[1] == seen[0]).all()
+    assert (seen[2] != seen[1]).any(axis=0).all()
+
+
+def test_prices_follow_the_node():
+    b = mc.Batch(1000, np.random.default_rng(4))
+    prices = mc.roll_prices(b, np.arange(b.n), np.random.default_rng(5))
+    lo = np.floor(mc.WARE_LO * mc.NODE_MULT[b.location]).astype(np.int64)
+    hi = np.floor(mc.WARE_HI * mc.NODE_MULT[b.location]).astype(np.int64)
+    assert ((prices >= lo) & (prices <= hi)).all()
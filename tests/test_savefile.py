@@ -0,0 +1,219 @@
+import json
+import os
+import struct
+import subprocess
+import sys
+import zlib
+
+import pytest
+
+import matrix_savefile as sf
+from matrix_catalog import CATALOG_FILE
+from matrix_engine import NODES, new_state
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def stocked():
+    s = new_state()
+    s.update(credits=12345, escapes=3, perks=['Edge Runner', 'Heavily Armed'],
+             weapons={'M4 Carbine':2, 'Beretta 92FS':1})
+    s['ammo']['M4 Ammo'] = 7
+    s['inventory']['Worm'] = 40
+    return s
+
+
+def reseal(body):
+    return bytes(body) + sf.CRC.pack(zlib.crc32(bytes(body)))
+
+
+def test_round_trip():
+    s = stocked()
+    assert sf.decode(sf.encode(s)) == s
+
+
+def test_huge_credits_round_trip():
+    s = stocked()
+    s['credits'] = 10**30
+    assert sf.decode(sf.encode(s)) == s
+
+
+def save_from(lists, s):
+    # A v3 save as a game with other tables would have written it
+    nodes, wares, guns, ammos, uses, perks = lists
+    text = '\n'.join(n for t in lists for n in t).encode()
+    order = [guns.index(g) for g in s['weapons']]
+    picked = [perks.index(p) for p in s['perks']]
+    body = sf.FIXED.pack(sf.MAGIC, 3, 0, s['credits'], s['profit_start'], s['life'], s['armor'],
+                         s['cycle'], s['escapes'], s['people_freed'], nodes.index(s['location']),
+                         len(order), len(picked), *map(len, lists), len(text)) + text
+    counts = ([s['inventory'].get(k, 0) for k in wares] + [s['weapons'].get(k, 0) for k in guns] +
+              [s['ammo'].get(k, 0) for k in ammos] + [s['useables'].get(k, 0) for k in uses])
+    body += struct.pack(f'<{len(counts)}q', *counts)
+    body += struct.pack(f'<{len(order) + len(picked)}H', *order, *picked)
+    return reseal(body)
+
+
+def test_save_from_a_smaller_catalog_loads_by_name():
+    s = stocked()
+    s['inventory']['BlackICE'] = 0
+    lists = [list(t) for t in sf.NAME_LISTS]
+    lists[1] = [w for w in reversed(lists[1]) if w != 'BlackICE']
+    assert sf.decode(save_from(lists, s)) == s
+
+
+def test_save_from_a_bigger_catalog_drops_what_is_gone():
+    s = stocked()
+    lists = [list(t) for t in sf.NAME_LISTS]
+    lists[1].insert(0, 'Zeroday')
+    lists[2].append('Railgun')
+    lists[5].insert(0, 'Precog')
+    s2 = json.loads(json.dumps(s))
+    s2['inventory']['Zeroday'] = 5
+    s2['weapons']['Railgun'] = 1
+    s2['perks'].insert(0, 'Precog')
+    assert sf.decode(save_from(lists, s2)) == s
+
+
+def test_adding_content_keeps_saves(tmp_path):
+    # Save with the shipped catalog, load in a game whose catalog has one
+    # more ware
+    s = stocked()
+    save = tmp_path / 'save.bin'
+    sf.save(str(save), s)
+    with open(CATALOG_FILE) as f:
+        data = json.load(f)
+    data['warez'].append({'name':'Zeroday', 'lo':5, 'hi':9})
+    cat = tmp_path / 'cat.json'
+    cat.write_text(json.dumps(data))
+    out = subprocess.run([sys.executable, '-c', 'import json, sys, matrix_savefile as sf; '
+                          'json.dump(sf.load(sys.argv[1]), sys.stdout)', str(save)],
+                         cwd=ROOT, env={**os.environ, 'MATRIX_CATALOG':str(cat)},
+                         capture_output=True, text=True, check=True)
+    loaded = json.loads(out.stdout)
+    assert loaded.pop('inventory') == {**s.pop('inventory'), 'Zeroday':0}
+    assert loaded == s
+
+
+def test_v2_save_needs_its_catalog_layout():
+    s = stocked()
+    names = sf.NAME_LISTS
+    body = sf.FIXED_V2.pack(sf.MAGIC, 2, 0, sf.CATALOG.layout, s['credits'], s['profit_start'],
+                            s['life'], s['armor'], s['cycle'], s['escapes'], s['people_freed'],
+                            names[0].index(s['location']), len(s['weapons']), len(s['perks']),
+                            *[s['inventory'][k] for k in names[1]],
+                            *[s['weapons'].get(k, 0) for k in names[2]],
+                            *[s['ammo'][k] for k in names[3]], *[s['useables'][k] for k in names[4]])
+    body += struct.pack('<4H', *[names[2].index(g) for g in s['weapons']],
+                        *[names[5].index(p) for p in s['perks']])
+    assert sf.decode(reseal(body)) == s
+    body = bytearray(body)
+    body[7] ^= 1                       # inside the layout hash
+    with pytest.raises(sf.SaveError, match='content catalog'):
+        sf.decode(reseal(body))
+
+
+def test_v1_save_migrates():
+    s = stocked()
+    names = sf.V1_TABLES
+    inv, guns, ammo, use = s['inventory'], s['weapons'], s['ammo'], s['useables']
+    order = bytes(names[2].index(g) for g in guns)
+    perks = bytes(names[5].index(p) for p in s['perks'])
+    body = sf.FIXED_V1.pack(sf.MAGIC, 1, 0, s['credits'], s['profit_start'], s['life'], s['armor'],
+                            s['cycle'], s['escapes'], s['people_freed'], names[0].index(s['location']),
+                            len(order), len(perks), *[inv[k] for k in names[1]],
+                            *[guns.get(k, 0) for k in names[2]], *[ammo[k] for k in names[3]],
+                            *[use[k] for k in names[4]]) + order + perks
+    assert sf.decode(reseal(body)) == s
+
+
+# === Legacy JSON saves ===
+V03 = {'credits':5400, 'life':80, 'armor':20,
+       'inventory':{'RootKit':0, 'BlackICE':1, 'Datashard':0, 'Trojan':0, 'Worm':12},
+       'weapons':{'Beretta 92FS':1},
+       'ammo':{'Beretta Ammo':30, 'MP5K Ammo':0, 'M4 Ammo':0, 'Health Pack':2, 'Armor Kit':1},
+       'location':'Nebuchadnezzar', 'cycle':7.5, 'escapes':1, 'profit_start':2000,
+       'people_freed':2, 'perks':['Edge Runner']}
+V06 = {**V03, 'ammo':{'Beretta Ammo':30, 'MP5K Ammo':0, 'M4 Ammo':0},
+       'useables':{'Health Pack':2, 'Armor Kit':1}, 'location':'Chateau'}
+V12 = {**V06, 'location':'The Oracles Apartement', 'perks':['Edge Runner', 'Data Broker']}
+
+
+@pytest.mark.parametrize('legacy, name, location', [
+    (V03, 'matrix_wars_save.json', 'Simulatte'),
+    (V06, 'matrix_1984_save.json', 'The Merovingians Chateau'),
+    (V12, 'matrix_1984_save.json', 'The Oracles Apartement'),
+])
+def test_legacy_saves_migrate_and_round_trip(tmp_path, legacy, name, location):
+    src = tmp_path / name
+    src.write_text(json.dumps(legacy))
+    assert sf.find_save(str(tmp_path)) == str(src)
+    state = sf.load(str(src))
+    assert set(state) == set(new_state())
+    assert state['location'] == location
+    assert state['useables'] == {'Health Pack':2, 'Armor Kit':1}
+    assert state['ammo'] == {'Beretta Ammo':30, 'MP5K Ammo':0, 'M4 Ammo':0}
+    assert state['perks'] == legacy['perks']
+    dst = sf.convert(str(src))
+    assert sf.find_save(str(tmp_path)) == dst
+    assert sf.load(dst) == state
+
+
+def test_split_useables_leaves_new_saves_alone():
+    d = json.loads(json.dumps(V06))
+    sf._split_useables(d)
+    assert d['useables'] == V06['useables'] and d['ammo'] == V06['ammo']
+
+
+def test_rename_nodes_keeps_current_names():
+    d = {'location':'Construct'}
+    sf._rename_nodes(d)
+    assert d['location'] == 'The Construct'
+    sf._rename_nodes(d)
+    assert d['location'] == 'The Construct'
+
+
+def test_fill_defaults_drops_unknown_items():
+    d = {'credits':10, 'weapons':{'Railgun':1, 'M4 Carbine':1}, 'perks':['Psychic', 'Edge Runner'],
+         'inventory':{'Worm':3, 'Spice':9}, 'location':'Zion'}
+    d = sf._fill_defaults(d)
+    assert d['weapons'] == {'M4 Carbine':1} and d['perks'] == ['Edge Runner']
+    assert d['inventory']['Worm'] == 3 and 'Spice' not in d['inventory']
+    assert d['location'] in NODES and d['life'] == 100
+
+
+def test_migrate_json_refuses_non_objects():
+    with pytest.raises(sf.SaveError):
+        sf.migrate_json([1, 2])
+
+
+# === Rejected saves ===
+def test_checksum_mismatch_is_refused():
+    data = bytearray(sf.encode(stocked()))
+    data[40] ^= 0xFF
+    with pytest.raises(sf.SaveError, match='checksum'):
+        sf.decode(bytes(data))
+
+
+def test_newer_version_is_refused():
+    body = bytearray(sf.encode(stocked())[:-sf.CRC.size])
+    body[4] = sf.VERSION + 1
+    with pytest.raises(sf.SaveError, match='newer than this game'):
+        sf.decode(reseal(body))
+
+
+def test_truncated_body_is_refused():
+    body = sf.encode(stocked())[:-sf.CRC.size]
+    with pytest.raises(sf.SaveError, match='corrupted'):
+        sf.decode(reseal(body[:30]))
+    with pytest.raises(sf.SaveError, match='trailing'):
+        sf.decode(reseal(body + b'\0'))
+
+
+def test_not_a_save(tmp_path):
+    with pytest.raises(sf.SaveError, match='not a MATRIX 1984 save'):
+        sf.decode(b'MX85' + bytes(40))
+    junk = tmp_path / 'junk.json'
+    junk.write_bytes(b'\xff{')
+    with pytest.raises(sf.SaveError, match='corrupted'):
+        sf.load(str(junk))
@@ -0,0 +1,19 @@
+import pytest
+
+from matrix_script import MAX_COMMANDS, ScriptError, compile_script
+
+
+def test_repeats_and_macros_expand():
+    macros = {}
+    assert compile_script('macro trip = J; N\ntrip * 2; Q', macros) == [('jack',), ('next',)] * 2 + [('quit',)]
+    assert macros['trip'] == [('jack',), ('next',)]
+
+
+def test_nested_repeats_are_capped():
+    with pytest.raises(ScriptError, match='expands to over'):
+        compile_script('macro x = N * 100000\nmacro y = x * 100000\ny')
+
+
+def test_many_lines_are_capped():
+    with pytest.raises(ScriptError, match=f'line 11: script expands to over {MAX_COMMANDS}'):
+        compile_script('N * 100000\n' * 11)
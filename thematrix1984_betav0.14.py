@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import curses
-import random
 import sys
 import json
 import os
@@ -19,129 +18,123 @@ TITLE = r"""
 by b145k0 2025
 """
 
-SAVEFILE = 'matrix_1984_save.json'
+SAVEFILE = 'matrix_1984_save.bin'
+DBFILE = 'matrix_1984.db'
+# Turbo skips the pauses and plays each battle out on one screen; toggle
+# with [T], start with --turbo or MATRIX_TURBO=1
+TURBO_STOP_LIFE = 30   # auto-fire hands control back at or below this life
+turbo = os.environ.get('MATRIX_TURBO') == '1'
+REPLAYFILE = 'matrix_1984_replay.json'
 
 # === Game Data ===
-CYCLES = 30.0
-NODES = {
-    'The Train Station': 0.9,
-    'The Construct':     1.0,
-    'Simulatte':1.2,
-    'The Oracles Apartement':        1.1,
-    'The Merovingians Chateau':       1.3
-}
-WAREZ = {
-    'RootKit':   (15000, 28000),
-    'BlackICE':  (2000,  10000),
-    'Datashard': (300,    1000),
-    'Trojan':    (1000,   4200),
-    'Worm':      (18,     75)
-}
-WEAPONS = {
-    'Beretta 92FS': {'price':2000,'acc':0.70,'dmg':15,'ammo':'Beretta Ammo','mag':18},
-    'MP5K SMG':    {'price':5000,'acc':0.50,'dmg':20,'ammo':'MP5K Ammo','mag':40},
-    'M4 Carbine':  {'price':8000,'acc':0.60,'dmg':25,'ammo':'M4 Ammo','mag':30}
-}
-AMMO_PRICES = {'Beretta Ammo':5, 'MP5K Ammo':3, 'M4 Ammo':7}
-USEABLES    = {'Health Pack':50, 'Armor Kit':100}
-PERK_INFO   = {
-    'Heavily Armed':  '20% crit headshot chance',
-    'Edge Runner':    '70% escape chance',
-    'Data Broker':    '10% trade bonus',
-    'Elite Operator': 'Kung Fu crit & bonuses'
-}
+# Content tables and rules live in matrix_engine; this file is the curses front end.
+from matrix_engine import (CYCLES, WAREZ, WEAPONS, AMMO_PRICES, USEABLES, Engine,
+                           new_state, new_game_plus, update_perks, armory_items, is_over,
+                           parse_basket)
+from matrix_autobattle import DEFAULT_POLICY, policy_of, resolve, summary_lines
+from matrix_battle_odds import odds_line
+from matrix_planner import advice_line
+from matrix_journal import Journal, journal_path
+from matrix_profile import profile_game
+from matrix_render import HudRenderer
+from matrix_script import ScriptError, Runner, compile_script, load_macros, run_script, summary
+from matrix_saver import SaveWriter, SAVE_INTERVAL, write_atomic
+from matrix_savefile import SaveError, encode as encode_save, load as load_save, find_save
+from matrix_store import SaveStore, DEFAULT_SLOT, BOARDS, board_lines
+
+# Auto-battle policy for [A]uto in a fight; --auto-battle resolves every
+# ambush with it straight away
+auto_policy = policy_of(os.environ.get('MATRIX_AUTO_POLICY', DEFAULT_POLICY))
+auto_battle = False
+# --profile (or MATRIX_PROFILE=1) times every phase of a turn; [P] shows the
+# numbers and each session writes them to PROFILE_FILE
+PROFILE_FILE = 'matrix_1984_profile.json'
+profiler = None
+# [M]acro runs typed commands (see matrix_script) with no screens in between;
+# macros defined in matrix_1984_macros.txt are there from the start
+macros = {}
 
 # === Player State ===
-state = {
-    'credits':2000,
-    'life':   100,
-    'armor':  0,
-    'inventory':{w:0 for w in WAREZ},
-    'weapons':  {},
-    'ammo':     {k:0 for k in AMMO_PRICES},
-    'useables': {u:0 for u in USEABLES},
-    'location': random.choice(list(NODES)),
-    'cycle':    1.0,
-    'escapes':  0,
-    'profit_start':2000,
-    'people_freed':0,
-    'perks':    []
-}
+state = new_state()
+engine = Engine(state, record=True)
 
 # === Helpers ===
-def clamp(v, lo, hi): return max(lo, min(hi, v))
+# Games live in named slots of the database; saves are written behind the
+# game loop and flush_save() forces the write. open_store() sets them up, so
+# importing this file touches no files.
+store = saver = None
+slot = DEFAULT_SLOT
+
+def open_store(db=DBFILE):
+    global store, saver
+    store = SaveStore(db)
+    saver = SaveWriter(db, SAVE_INTERVAL, encode=encode_save,
+                       write=lambda data: store.put_slot(slot, data))
+    # Every step also goes into the slot's journal (see matrix_journal), so
+    # Continue after a crash picks the run up at the last action taken
+    engine.journal = Journal(journal_path(slot))
 
 def save_game():
-    with open(SAVEFILE,'w') as f:
-        json.dump(state,f)
+    saver.save(state)
+
+def flush_save():
+    saver.flush()
+
+def save_replay():
+    # The last run's seed and actions; matrix_replay.py plays it back
+    write_atomic(REPLAYFILE, json.dumps(engine.record()))
 
 def load_game():
-    if os.path.exists(SAVEFILE):
-        try:
-            with open(SAVEFILE) as f:
-                state.update(json.load(f))
-        except json.JSONDecodeError:
-            print("Save file is corrupted or empty. Starting fresh.")
-            reset_full()
+    flush_save()
+    # A save file from before the database (binary or any older JSON layout)
+    # moves into the default slot
+    path = find_save() if slot == DEFAULT_SLOT else None
+    try:
+        loaded = store.load_slot(slot)
+    except SaveError as e:
+        # Starting fresh writes over the slot, so its bytes are kept aside
+        # under another slot name first
+        print(f"Save slot {slot!r} can't be loaded: {e}")
+        print(f"It was kept as slot {store.backup_slot(slot)!r}. Starting fresh.")
+        loaded = None
     else:
+        try:
+            if loaded is None and path:
+                loaded = load_save(path)
+        except SaveError as e:
+            # The old file stays where it is; only the slot is written
+            print(f"{path} can't be loaded: {e}. Starting fresh.")
+    if loaded is None:
         reset_full()
-    return update_perks()
-
-# === Perks Logic ===
-def update_perks():
-    p = state['perks']
-    new = []
-    if len(state['weapons']) == len(WEAPONS) and 'Heavily Armed' not in p:
-        p.append('Heavily Armed'); new.append('Heavily Armed')
-    if state['escapes'] >= 2 and 'Edge Runner' not in p:
-        p.append('Edge Runner'); new.append('Edge Runner')
-    if state['credits'] > state['profit_start'] * 1.6 and 'Data Broker' not in p:
-        p.append('Data Broker'); new.append('Data Broker')
-    base = ['Heavily Armed','Edge Runner','Data Broker']
-    if all(b in p for b in base) and 'Elite Operator' not in p:
-        p.append('Elite Operator'); new.append('Elite Operator')
-    return new
+    else:
+        state.update(loaded)
+    return update_perks(state)
+
+def nap(ms):
+    if not turbo:
+        curses.napms(ms)
+
+def press_any_key(stdscr, y, x):
+    stdscr.addstr(y, x, 'Press any key...')
+    stdscr.refresh()
+    stdscr.getkey()
 
 # === Draw HUD ===
+hud = None
+
 def draw_screen(stdscr, prices):
-    stdscr.clear()
-    h, w = stdscr.getmaxyx()
-    # Header
-    hdr = f" The MATRIX 1984 | Cyc {state['cycle']:.1f}/{CYCLES} | Life {state['life']}% | Armor {state['armor']}% | {state['location']} "
-    stdscr.addstr(0,0, hdr.ljust(w))
-    # WAREZ Inventory
-    stdscr.addstr(2,2, 'WAREZ')
-    for i,(k,v) in enumerate(state['inventory'].items(), start=3):
-        stdscr.addstr(i,4, f"{k:<12} x{v}")
-    # Health/Armor
-    hy = 4 + len(state['inventory'])
-    stdscr.addstr(hy,2, 'HEALTH / ARMOR')
-    stdscr.addstr(hy+1,4, f"HPacks: {state['useables']['Health Pack']}")
-    stdscr.addstr(hy+2,4, f"AKits:  {state['useables']['Armor Kit']}")
-    # Perks
-    py = hy + 4
-    stdscr.addstr(py, 2, 'PERKS')
-    for idx,pk in enumerate(state['perks'], start=py+1):
-        stdscr.addstr(idx,4, f"{pk}: {PERK_INFO[pk]}")
-    # Minds Freed
-    stdscr.addstr(py+len(state['perks'])+2, 2, f"Minds Freed: {state['people_freed']}")
-    # Market
-    mx = w//3
-    stdscr.addstr(2, mx, 'BLACK MARKET')
-    for i,(k,pr) in enumerate(prices.items(), start=3):
-        stdscr.addstr(i, mx+4, f"{k:<12}{pr}cr")
-    # Weapons & Ammo
-    wx = 2*w//3
-    stdscr.addstr(2, wx, 'WEAPONS')
-    for i,(wp,cnt) in enumerate(state['weapons'].items(), start=3):
-        ammo_cnt = state['ammo'][WEAPONS[wp]['ammo']]
-        stdscr.addstr(i, wx+2, f"{wp:<12} x{cnt} Ammo:{ammo_cnt}")
-    # Footer
-    stdscr.addstr(h-2, 2, '[D]ownload [U]pload [W]eapons [E]quip [J]ack In [N]ext [Q]uit')
-    stdscr.addstr(h-1, 2, f"Credits:{state['credits']} cr")
-    stdscr.refresh()
+    global hud
+    if hud is None or hud.scr is not stdscr:
+        hud = HudRenderer(stdscr)
+    hud.draw(state, prices, '[T]urbo: ' + ('ON' if turbo else 'off'),
+             engine.price_history.stats(state['location']))
+
+def invalidate_screen():
+    if hud is not None:
+        hud.invalidate()
 
 # === Handlers ===
+# Handlers only collect input and return an engine action (None = cancelled).
 def handle_download(stdscr, prices):
     curses.echo()
     y0 = 5
@@ -178,15 +171,13 @@ def handle_download(stdscr, prices):
     q = stdscr.getstr(y0+idx+3, 4).decode().strip()
     curses.noecho()
     try:
-        qty = max(1, min(maxq, int(q)))
-        state['credits'] -= p * qty
-        state['inventory'][key] += qty
-        state['cycle'] += 0.25
-        stdscr.addstr(y0+idx+4, 4, 'Download complete. Press any key...')
-        stdscr.refresh()
-        stdscr.getkey()
+        qty = int(q)
     except ValueError:
-        pass
+        return
+    stdscr.addstr(y0+idx+4, 4, 'Download complete. Press any key...')
+    stdscr.refresh()
+    stdscr.getkey()
+    return ('download', key, qty)
 
 def handle_upload(stdscr, prices):
     curses.echo()
@@ -219,15 +210,43 @@ def handle_upload(stdscr, prices):
     q = stdscr.getstr(y0+idx+3, 4).decode().strip()
     curses.noecho()
     try:
-        qty = max(1, min(maxq, int(q)))
-        state['credits'] += prices[key] * qty
-        state['inventory'][key] -= qty
-        state['cycle'] += 0.25
-        stdscr.addstr(y0+idx+4, 4, 'Upload complete. Press any key...')
+        qty = int(q)
+    except ValueError:
+        return
+    stdscr.addstr(y0+idx+4, 4, 'Upload complete. Press any key...')
+    stdscr.refresh()
+    stdscr.getkey()
+    return ('upload', key, qty)
+
+def handle_bulk(stdscr, prices):
+    # Several trades as one basket: one screen, one confirm, one cycle step
+    curses.echo()
+    y0 = 5
+    stdscr.clear()
+    stdscr.addstr(y0, 2, 'Bulk Order: U<n> [qty|all], D<n> [qty|max], comma separated')
+    for idx, w in enumerate(WAREZ, start=1):
+        stdscr.addstr(y0+idx, 4, f"{idx}. {w} - {prices[w]} cr (You have: {state['inventory'][w]})")
+    y = y0+len(WAREZ)+1
+    stdscr.addstr(y, 4, 'Orders (blank to cancel):')
+    stdscr.refresh()
+    text = stdscr.getstr(y+1, 4, 60).decode().strip()
+    curses.noecho()
+    if not text:
+        return
+    orders = parse_basket(text)
+    fills, reason = engine.check_basket(orders) if orders else (None, 'Could not read that order.')
+    if fills is None:
+        stdscr.addstr(y+3, 4, f'{reason} Press any key...')
         stdscr.refresh()
         stdscr.getkey()
-    except ValueError:
         return
+    for i, (kind, key, qty, p) in enumerate(fills):
+        stdscr.addstr(y+3+i, 4, f"{'Download' if kind == 'download' else 'Upload'} {qty} {key} @ {p} cr")
+    stdscr.addstr(y+4+len(fills), 4, 'Confirm? [Y/N]')
+    stdscr.refresh()
+    if stdscr.getkey().upper() != 'Y':
+        return
+    return ('basket', orders)
 
 def handle_buy_armory(stdscr):
     curses.echo()
@@ -254,35 +273,13 @@ def handle_buy_armory(stdscr):
         choice = int(sel)
     except ValueError:
         return
-    total_items = len(WEAPONS) + len(USEABLES) + len(AMMO_PRICES)
-    if choice < 1 or choice > total_items:
+    items = armory_items()
+    if choice < 1 or choice > len(items):
         return
-    # Process purchase
-    if choice <= len(WEAPONS):
-        key = list(WEAPONS)[choice-1]
-        info = WEAPONS[key]
-        if state['credits'] >= info['price']:
-            state['credits'] -= info['price']
-            state['weapons'][key] = state['weapons'].get(key, 0) + 1
-            state['ammo'][info['ammo']] += info['mag']
-    elif choice <= len(WEAPONS) + len(USEABLES):
-        idx2 = choice - len(WEAPONS) - 1
-        ukey = list(USEABLES)[idx2]
-        price = USEABLES[ukey]
-        if state['credits'] >= price:
-            state['credits'] -= price
-            state['useables'][ukey] += 1
-    else:
-        idx3 = choice - len(WEAPONS) - len(USEABLES) - 1
-        akey = list(AMMO_PRICES)[idx3]
-        price = AMMO_PRICES[akey]
-        if state['credits'] >= price:
-            state['credits'] -= price
-            state['ammo'][akey] += 5
-    state['cycle'] += 0.25
     stdscr.addstr(y0+idx+2, 4, 'Purchase complete. Press any key...')
     stdscr.refresh()
     stdscr.getkey()
+    return ('buy', items[choice-1])
 
 def handle_equip(stdscr):
     curses.echo()
@@ -308,54 +305,46 @@ def handle_equip(stdscr):
         return
     key = list(USEABLES)[choice-1]
     if state['useables'][key] > 0:
-        state['useables'][key] -= 1
-        if key == 'Health Pack':
-            state['life'] = clamp(state['life'] + 15, 0, 100)
-        elif key == 'Armor Kit':
-            state['armor'] = clamp(state['armor'] + 20, 0, 100)
-        state['cycle'] += 0.25
         stdscr.addstr(y0+idx+2, 4, 'Equipped. Press any key...')
         stdscr.refresh()
         stdscr.getkey()
+        return ('equip', key)
 
-def battle_screen(stdscr, trace_amt=None, smith=False):
+def battle_screen(stdscr, trace_amt=None):
     curses.curs_set(0)
     stdscr.clear()
     stdscr.refresh()
     if trace_amt is not None:
         state['credits'] -= trace_amt
         stdscr.addstr(5,5, f"⚠️ AGENT TRACE! -{trace_amt}cr")
-        stdscr.addstr(7,5, 'Press any key...')
-        stdscr.refresh()
-        stdscr.getkey()
+        press_any_key(stdscr, 7, 5)
         return
-    hp = 100 if smith else 50
-    dodge = 0.15 if smith else 0.0
-    while True:
+    if auto_battle:
+        return battle_auto(stdscr)
+    if turbo:
+        return battle_turbo(stdscr)
+    while engine.phase == 'battle':
         stdscr.clear()
-        label = 'SMITH' if smith else 'AGENT'
-        stdscr.addstr(1,2, f"{label} AMBUSH! Life:{state['life']}% HP:{hp}")
-        stdscr.addstr(3,2, "[F]ight [R]un")
+        label = 'SMITH' if engine.battle['smith'] else 'AGENT'
+        stdscr.addstr(1,2, f"{label} AMBUSH! Life:{state['life']}% HP:{engine.battle['hp']}")
+        stdscr.addstr(2,2, odds_line(state, engine.battle['hp'], engine.battle['smith']))
+        stdscr.addstr(3,2, "[F]ight [R]un [A]uto")
         stdscr.refresh()
         ch = stdscr.getkey().upper()
+        if ch == 'A':
+            return battle_auto(stdscr)
         if ch == 'R':
             curses.noecho()
-            if random.random() < 0.35:
-                state['escapes'] += 1
+            if engine.step(('run',))[0]['type'] == 'escaped':
                 stdscr.addstr(5,2,'Escaped safely!')
-                stdscr.refresh(); curses.napms(300)
-                stdscr.addstr(7,2,'Press any key...')
-                stdscr.refresh(); stdscr.getkey()
+                stdscr.refresh(); nap(300)
+                press_any_key(stdscr, 7, 2)
                 return
-            else:
-                stdscr.addstr(5,2,'Escape failed!')
-                stdscr.addstr(7,2,'Press any key...')
-                stdscr.refresh(); stdscr.getkey()
-                # failed escape, enemy turn follows
-
-        opts = list(state['weapons'].keys())
-        if 'Elite Operator' in state['perks']:
-            opts.append('Kung Fu')
+            stdscr.addstr(5,2,'Escape failed!')
+            press_any_key(stdscr, 7, 2)
+            # failed escape, enemy turn follows
+
+        opts = engine.battle_options()
         for i,name in enumerate(opts, start=1):
             stdscr.addstr(5+i,2, f"{i}. {name}")
         stdscr.refresh()
@@ -364,144 +353,282 @@ def battle_screen(stdscr, trace_amt=None, smith=False):
         curses.noecho()
         try:
             choice = opts[int(sel)-1]
-        except:
+        except (ValueError, IndexError):
             continue
-        if choice == 'Kung Fu':
-            dmg = 20
-            hp -= dmg
-            stdscr.addstr(7+len(opts),2, f"Kung Fu! -{dmg} HP")
-        else:
-            info=WEAPONS[choice]
-            ak=info['ammo']
-            if state['ammo'][ak] < 1:
-                stdscr.addstr(7+len(opts),2,'No ammo!')
+        y = 7+len(opts)
+        for e in engine.step(('attack', choice)):
+            t = e['type']
+            if t == 'no_ammo':
+                stdscr.addstr(y,2,'No ammo!')
                 stdscr.refresh()
                 stdscr.getkey()
-                continue
-            state['ammo'][ak] -= 1
-            if random.random() < info['acc']:
-                hp -= info['dmg']
-                stdscr.addstr(7+len(opts),2, f"Hit! -{info['dmg']} HP")
-            else:
-                stdscr.addstr(7+len(opts),2, 'Miss!')
-        stdscr.refresh(); curses.napms(300)
-        if hp <= 0:
-            stdscr.addstr(9+len(opts),2,'Opponent down!')
-            if smith:
-                # Smith drop rewards
-                gain = random.randint(5000,10000)
-                state['credits'] += gain
-                state['inventory']['RootKit'] = state['inventory'].get('RootKit',0) + 1
-                stdscr.addstr(10+len(opts),2, f'Smith defeated! +{gain}cr +1 RootKit')
-            else:
-                drop = random.choice(list(WAREZ.keys()) + list(WEAPONS.keys()) + list(AMMO_PRICES.keys()))
-                if drop in WAREZ:
-                    state['inventory'][drop] += 1
-                elif drop in WEAPONS:
-                    state['weapons'][drop] = state['weapons'].get(drop,0) + 1
+            elif t == 'player_hit':
+                msg = f"Kung Fu! -{e['dmg']} HP" if e['weapon'] == 'Kung Fu' else f"Hit! -{e['dmg']} HP"
+                stdscr.addstr(y,2, msg)
+                stdscr.refresh(); nap(300)
+            elif t == 'player_miss':
+                stdscr.addstr(y,2, 'Miss!')
+                stdscr.refresh(); nap(300)
+            elif t == 'victory':
+                stdscr.addstr(y+2,2,'Opponent down!')
+                if e['smith']:
+                    stdscr.addstr(y+3,2, f"Smith defeated! +{e['gain']}cr +1 RootKit")
                 else:
-                    state['ammo'][drop] = state['ammo'].get(drop,0) + 1
-                gain = random.randint(50,200)
-                state['credits'] += gain
-                stdscr.addstr(10+len(opts),2, f'Found {drop}, +{gain}cr')
-            stdscr.addstr(12+len(opts),2,'Press any key...')
-            stdscr.refresh(); stdscr.getkey()
-            return
-
-        stdscr.addstr(9+len(opts),2,'Opponent fires...')
-        stdscr.refresh(); curses.napms(300)
-        if random.random() > dodge:
-            dmg = random.randint(5,15)
-            # Armor absorbs damage first
-            if state['armor'] > 0:
-                absorbed = min(state['armor'], dmg)
-                state['armor'] -= absorbed
-                dmg -= absorbed
-            # Apply remaining to life
-            if dmg > 0:
-                state['life'] = clamp(state['life'] - dmg, 0, 100)
-
-            stdscr.addstr(11+len(opts),2, f"Hit! -{dmg}% life")
-        else:
-            stdscr.addstr(11+len(opts),2,'Dodged!')
-        stdscr.addstr(13+len(opts),2,'Press any key...')
-        stdscr.refresh(); stdscr.getkey()
-        if state['life'] <= 0:
-            return
+                    stdscr.addstr(y+3,2, f"Found {e['drop']}, +{e['gain']}cr")
+                press_any_key(stdscr, y+5, 2)
+            elif t in ('enemy_hit', 'enemy_dodged'):
+                stdscr.addstr(y+2,2,'Opponent fires...')
+                stdscr.refresh(); nap(300)
+                stdscr.addstr(y+4,2, f"Hit! -{e['dmg']}% life" if t == 'enemy_hit' else 'Dodged!')
+                press_any_key(stdscr, y+6, 2)
+
+def battle_auto(stdscr):
+    lines = summary_lines(resolve(engine, auto_policy))
+    stdscr.clear()
+    for y, line in enumerate(lines, start=1):
+        stdscr.addstr(y,2, line)
+    press_any_key(stdscr, len(lines)+2, 2)
+
+# === Turbo Battle ===
+def battle_lines(events):
+    out = []
+    for e in events:
+        t = e['type']
+        if t == 'escaped': out.append('Escaped safely!')
+        elif t == 'escape_failed': out.append('Escape failed!')
+        elif t == 'no_ammo': out.append('No ammo!')
+        elif t == 'rejected': out.append(e['reason'])
+        elif t == 'player_hit':
+            out.append(f"Kung Fu! -{e['dmg']} HP" if e['weapon'] == 'Kung Fu' else f"Hit! -{e['dmg']} HP")
+        elif t == 'player_miss': out.append('Miss!')
+        elif t == 'enemy_hit': out.append(f"  Opponent fires... Hit! -{e['dmg']}% life")
+        elif t == 'enemy_dodged': out.append('  Opponent fires... Dodged!')
+        elif t == 'victory':
+            out.append('Opponent down!')
+            out.append(f"Smith defeated! +{e['gain']}cr +1 RootKit" if e['smith'] else f"Found {e['drop']}, +{e['gain']}cr")
+        elif t == 'killed': out.append('You were killed.')
+    return out
+
+def battle_turbo(stdscr):
+    # One screen per battle: a picked weapon keeps firing until the fight
+    # ends, ammo runs out or life drops to TURBO_STOP_LIFE, and the log is
+    # acknowledged once at the end
+    log = []
+    while engine.phase == 'battle':
+        h, w = stdscr.getmaxyx()
+        stdscr.clear()
+        label = 'SMITH' if engine.battle['smith'] else 'AGENT'
+        stdscr.addstr(1,2, f"{label} AMBUSH! Life:{state['life']}% HP:{engine.battle['hp']}  [TURBO]")
+        stdscr.addstr(2,2, odds_line(state, engine.battle['hp'], engine.battle['smith']))
+        opts = engine.battle_options()
+        stdscr.addstr(3,2, "[R]un [A]uto  or fire: " + '  '.join(f"{i}.{n}" for i, n in enumerate(opts, start=1)))
+        for y, line in enumerate(log[-(h-7):], start=5):
+            stdscr.addstr(y,2, line[:w-3])
+        stdscr.refresh()
+        ch = stdscr.getkey().upper()
+        if ch == 'A':
+            log += battle_lines(resolve(engine, auto_policy)['events'])
+            break
+        if ch == 'R':
+            log += battle_lines(engine.step(('run',)))
+            continue
+        try:
+            choice = opts[int(ch)-1]
+        except (ValueError, IndexError):
+            continue
+        while engine.phase == 'battle':
+            events = engine.step(('attack', choice))
+            log += battle_lines(events)
+            if events[0]['type'] in ('no_ammo', 'rejected'):
+                break
+            if engine.phase == 'battle' and state['life'] <= TURBO_STOP_LIFE:
+                log.append(f"Life at {state['life']}% - auto-fire stopped")
+                break
+    h, w = stdscr.getmaxyx()
+    stdscr.clear()
+    stdscr.addstr(1,2, 'BATTLE LOG')
+    tail = log[-(h-5):]
+    for y, line in enumerate(tail, start=3):
+        stdscr.addstr(y,2, line[:w-3])
+    press_any_key(stdscr, 4+len(tail), 2)
 
 # === Field Medic ===
-def field_medic(stdscr):
-    if random.random() < 0.01:
-        heal=random.randint(10,15)
-        if random.random() < 0.05:
-            heal=25
-        state['life']=clamp(state['life']+heal,0,100)
-        update_perks()
-        stdscr.clear(); stdscr.addstr(5,5,f'Blasko heals +{heal}% life')
-        stdscr.addstr(7,5,'Press any key...'); stdscr.refresh(); stdscr.getkey()
+def field_medic(stdscr, heal):
+    stdscr.clear(); stdscr.addstr(5,5,f'Blasko heals +{heal}% life')
+    press_any_key(stdscr, 7, 5)
 
 # === Free Civilian ===
 def free_civilian(stdscr):
-    curse=random.randint(1,10)
     curses.echo()
     y0 = 5
     stdscr.clear()
     stdscr.addstr(y0, 2, 'Pick a number 1-10: ')
     stdscr.refresh()
-    try:
-        guess = int(stdscr.getstr(y0, 24).decode().strip())
-    except ValueError:
-        curses.noecho()
-        return
+    guess = stdscr.getstr(y0, 24).decode().strip()
     curses.noecho()
-    if abs(guess - curse) <= 2:
-        state['people_freed'] += 1
+    events = engine.step(('guess', guess))
+    if events[0]['type'] == 'civilian_gone':
+        return
+    if events[0]['type'] == 'freed':
         stdscr.addstr(y0+2, 2, 'Red pill! Mind freed.')
     else:
         stdscr.addstr(y0+2, 2, 'Blue pill! Becomes Agent.')
         stdscr.refresh()
-        curses.napms(500)
-        battle_screen(stdscr, trace_amt=None, smith=True)
-    stdscr.addstr(y0+4, 2, 'Press any key...')
+        nap(500)
+        battle_screen(stdscr)
+    press_any_key(stdscr, y0+4, 2)
+
+def play_events(stdscr, events):
+    for e in events:
+        if e['type'] == 'medic':
+            field_medic(stdscr, e['heal'])
+            invalidate_screen()
+    if engine.phase == 'battle':
+        battle_screen(stdscr)
+        invalidate_screen()
+    elif engine.phase == 'civilian':
+        free_civilian(stdscr)
+        invalidate_screen()
+
+# === Advisor ===
+def show_advice(stdscr):
+    stdscr.clear()
+    stdscr.addstr(2, 2, 'Consulting the Oracle...')
     stdscr.refresh()
-    stdscr.getkey()
+    stdscr.addstr(2, 2, advice_line(state, engine.prices).ljust(40))
+    press_any_key(stdscr, 4, 2)
+
+def start_profiler():
+    global profiler
+    profiler = profile_game(globals())
+
+def show_profile(stdscr):
+    stdscr.clear()
+    stdscr.addstr(1, 2, 'TURN PROFILE')
+    lines = profiler.lines()
+    for y, line in enumerate(lines, start=3):
+        stdscr.addstr(y, 2, line)
+    press_any_key(stdscr, len(lines)+4, 2)
+
+def run_macro(stdscr):
+    curses.echo()
+    stdscr.clear()
+    stdscr.addstr(2, 2, 'Commands or macro (e.g. D Worm max; J; U Worm * 5):')
+    stdscr.refresh()
+    text = stdscr.getstr(3, 2, 70).decode().strip()
+    curses.noecho()
+    if not text:
+        return
+    runner = Runner(engine, auto_policy)
+    try:
+        runner.run(compile_script(text, macros))
+    except ScriptError as e:
+        # A bad pick mid-run stops the macro; the steps before it stand
+        save_game()
+        stdscr.addstr(5, 2, str(e)[:70])
+        press_any_key(stdscr, 7, 2)
+        return
+    save_game()
+    for y, line in enumerate(summary(runner).split(' | '), start=5):
+        stdscr.addstr(y, 2, line)
+    press_any_key(stdscr, 8, 2)
+
+def script_mode(path):
+    # --script: play a command file on the current slot, no curses at all
+    load_game()
+    with open(path) as f:
+        text = f.read()
+    engine.start()
+    was_over = is_over(state)
+    try:
+        runner = run_script(engine, text, macros, auto_policy)
+    except ScriptError as e:
+        sys.exit(f"{path}: {e}")
+    save_game()
+    finish_run(was_over)
+    print(summary(runner))
+
+def finish_run(was_over):
+    # Write the replay and the leaderboard row only for a run that was
+    # played here; reopening a finished save must not record it again
+    flush_save()
+    if was_over:
+        return
+    save_replay()
+    if is_over(state):
+        store.record_run(state, slot, engine.seed)
 
 # === Simulation ===
-def curses_sim(stdscr):
-    load_game(); curses.curs_set(0); curses.start_color(); curses.init_pair(1,curses.COLOR_GREEN,curses.COLOR_BLACK)
-    stdscr.bkgd(' ',curses.color_pair(1)); stdscr.clear()
-    while state['cycle']<=CYCLES and state['life']>0:
-        prices={w:int(random.randint(*rng)*NODES[state['location']]) for w,rng in WAREZ.items()}
-        ev=random.random()
-        if ev<0.30: battle_screen(stdscr)
-        elif ev<0.31: battle_screen(stdscr, smith=True)
-        elif ev<0.32: field_medic(stdscr)
-        elif ev<0.33: free_civilian(stdscr)
-        draw_screen(stdscr,prices)
+# A session is a small state machine: each step plays one screen and names
+# the next, so New Game+ goes back round the loop instead of calling
+# curses_sim again. The stack stays one frame deep and nothing from a
+# finished run is held on to, however many New Game+ loops are played. A
+# step returning None hands back to the menus.
+def play_run(stdscr):
+    global turbo
+    stdscr.clear()
+    if engine.journal.resume(engine):
+        events = []
+    else:
+        load_game()
+        events = engine.start()
+    was_over = is_over(state)
+    while engine.phase != 'over':
+        play_events(stdscr, events)
+        draw_screen(stdscr,engine.prices)
         ch=stdscr.getkey().upper()
-        if ch=='D': handle_download(stdscr,prices)
-        elif ch=='U': handle_upload(stdscr,prices)
-        elif ch=='W': handle_buy_armory(stdscr)
-        elif ch=='E': handle_equip(stdscr)
-        elif ch=='J': state['location']=random.choice(list(NODES)); state['cycle']+=0.5
-        elif ch=='N': state['cycle']+=1.0
-        elif ch=='Q': break
+        action = None
+        if ch=='D': action = handle_download(stdscr,engine.prices)
+        elif ch=='U': action = handle_upload(stdscr,engine.prices)
+        elif ch=='B': action = handle_bulk(stdscr,engine.prices)
+        elif ch=='W': action = handle_buy_armory(stdscr)
+        elif ch=='E': action = handle_equip(stdscr)
+        elif ch=='J': action = ('jack',)
+        elif ch=='N': action = ('next',)
+        elif ch=='Q': action = ('quit',)
+        elif ch=='T':
+            turbo = not turbo; invalidate_screen(); events = []
+            continue
+        elif ch=='A':
+            # Asking the advisor is free: no step, so prices stay put
+            show_advice(stdscr); invalidate_screen(); events = []
+            continue
+        elif ch=='M':
+            run_macro(stdscr); invalidate_screen(); events = []
+            continue
+        elif ch=='P' and profiler is not None:
+            show_profile(stdscr); invalidate_screen(); events = []
+            continue
+        if ch in 'DUBWE': invalidate_screen()
+        events = engine.step(action or ('wait',))
         save_game()
+    finish_run(was_over)
+    return 'summary'
+
+def run_summary(stdscr):
     stdscr.clear(); stdscr.addstr(5,5,'=== SIMULATION COMPLETE ===',curses.A_BOLD)
     stdscr.addstr(7,5,f"Credits:{state['credits']}")
     stdscr.addstr(8,5,f"Life:{state['life']}% Armor:{state['armor']}% Freed:{state['people_freed']}")
     stdscr.addstr(10,5,'[N]ew Game+    [Q]uit')
     stdscr.refresh()
-    ch = stdscr.getkey().upper()
-    if ch == 'N':
-        # Start New Game+ preserving inventory and perks
-        state['cycle'] = 1.0
-        state['profit_start'] = state['credits']
-        state['life'] = 100
-        state['armor'] = 0
-        save_game()
-        curses_sim(stdscr)
-    return
+    return 'ng+' if stdscr.getkey().upper() == 'N' else None
+
+def start_ng_plus(stdscr):
+    new_game_plus(state)
+    save_game()
+    return 'run'
+
+SESSION = {'run':play_run, 'summary':run_summary, 'ng+':start_ng_plus}
+
+def curses_sim(stdscr, step='run'):
+    curses.curs_set(0); curses.start_color(); curses.init_pair(1,curses.COLOR_GREEN,curses.COLOR_BLACK)
+    stdscr.bkgd(' ',curses.color_pair(1))
+    if profiler is not None:
+        stdscr = profiler.screen(stdscr)
+    while step is not None:
+        step = SESSION[step](stdscr)
+    if profiler is not None:
+        profiler.dump(PROFILE_FILE)
 
 
 # === Menus ===
@@ -521,9 +648,16 @@ def show_instructions():
 Instructions:
 - [D]ownload: buy programs.
 - [U]pload: sell contraband.
+- [B]ulk: a basket of trades at once, e.g. U4, D5 max (one trade's time).
 - [W]eapons: purchase arms.
 - [J]ack In: travel (0.5 cycle).
 - [N]ext: advance cycle.
+- [A]dvisor: suggested trade.
+- [T]urbo: no pauses, battles auto-fire on one screen.
+- [A]uto in a battle fights it out for you (--auto-battle: always).
+- [M]acro: type commands to run in one go, e.g. D Worm max; J; U Worm * 5.
+  --script FILE plays a command file without the screens.
+- [P]rofile: turn timings, when started with --profile.
 - [Q]uit: return to menu.
 """)
 
@@ -542,44 +676,56 @@ Acknowledgments:
 -
 """)
 
+def choose_slot():
+    global slot
+    print("\nSave slots:")
+    for name, _ in store.slots():
+        print(f"- {name}")
+    name = input(f"Slot name [{slot}]: ").strip()
+    if name:
+        flush_save()
+        slot = name
+        engine.journal.close()
+        engine.journal = Journal(journal_path(slot))
+        load_game()
+
+def show_leaderboard():
+    for by in BOARDS:
+        print()
+        print('\n'.join(board_lines(store.leaderboard(by, 10), by)))
+
 def game_start_menu():
     load_game()
     while True:
-        print("\n=== The MATRIX 1984 START ===")
+        print(f"\n=== The MATRIX 1984 START === (slot: {slot})")
+        print("S) Switch save slot")
         print("1) New Game")
         print("2) Continue")
         if state['cycle']>CYCLES and 'Elite Operator' not in state['perks'] and state['life']>0:
             print("3) New Game+ (keep your inventory)")
             print("4) Back to Main Menu")
             choice=input('Select: ').strip()
-            if choice=='1': reset_full(); curses.wrapper(curses_sim); return
+            if choice.upper()=='S': choose_slot()
+            elif choice=='1': new_game(); curses.wrapper(curses_sim); return
             elif choice=='2': curses.wrapper(curses_sim); return
             elif choice=='3': state['cycle']=1.0; state['profit_start']=state['credits']; save_game(); curses.wrapper(curses_sim); return
             elif choice=='4': return
         else:
             print("3) Back to Main Menu")
             choice=input('Select: ').strip()
-            if choice=='1': reset_full(); curses.wrapper(curses_sim); return
+            if choice.upper()=='S': choose_slot()
+            elif choice=='1': new_game(); curses.wrapper(curses_sim); return
             elif choice=='2': curses.wrapper(curses_sim); return
             elif choice=='3': return
 
 
+def new_game():
+    # A new game abandons whatever run the journal still has open
+    engine.journal.end(force=True)
+    reset_full()
+
 def reset_full():
-    state.update({
-        'credits': 2000,
-        'life': 100,
-        'armor': 0,
-        'inventory': {w: 0 for w in WAREZ},
-        'weapons': {},
-        'ammo': {k: 0 for k in AMMO_PRICES},
-        'useables': {u: 0 for u in USEABLES},
-        'location': random.choice(list(NODES)),
-        'cycle': 1.0,
-        'escapes': 0,
-        'profit_start': 2000,
-        'people_freed': 0,
-        'perks': []
-    })
+    state.update(new_state())
     save_game()
 
 
@@ -591,14 +737,31 @@ def main_menu():
         print('2) View Story')
         print('3) How to Play')
         print('4) Acknowledgments')
-        print('5) Exit')
+        print('5) Leaderboard')
+        print('6) Exit')
         c=input('Select: ')
         if c=='1': game_start_menu()
         elif c=='2': show_story(); input('\nPress Enter...')
         elif c=='3': show_instructions(); input('\nPress Enter...')
         elif c=='4': show_acknowledgments(); input('\nPress Enter...')
-        elif c=='5': sys.exit(0)
+        elif c=='5': show_leaderboard(); input('\nPress Enter...')
+        elif c=='6': sys.exit(0)
         else: print('Invalid selection.')
 
-if __name__=='__main__':
+def main(argv):
+    global turbo, auto_battle, macros
+    macros = load_macros()
+    open_store()
+    if '--turbo' in argv:
+        turbo = True
+    if '--auto-battle' in argv:
+        auto_battle = True
+    if '--profile' in argv or os.environ.get('MATRIX_PROFILE') == '1':
+        start_profiler()
+    if '--script' in argv[:-1]:
+        script_mode(argv[argv.index('--script') + 1])
+        sys.exit(0)
     main_menu()
+
+if __name__=='__main__':
+    main(sys.argv[1:])